@@ -0,0 +1,5 @@
+"""
+ADS-B Feeder Monitor
+Polling, history and export for adsb.im feeders; the GTK front end lives in
+adsbmon.gui so that everything else can run without a display.
+"""
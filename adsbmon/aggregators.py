@@ -0,0 +1,166 @@
+"""The aggregators a feeder may feed, and what their status means"""
+
+import json
+import os
+import threading
+import time
+
+from .paths import user_cache_dir
+
+# Seconds between probes of aggregators the feeder has not reported as configured
+DISCOVERY_INTERVAL = 900
+# Consecutive empty answers before a configured aggregator stops being polled every refresh
+DISCOVERY_MISS_LIMIT = 3
+
+# Aggregator statuses - adsb.im uses /api/status/{aggregator}
+AGGREGATORS = [
+    ("adsblol", "adsb.lol"),
+    ("flyitaly", "Fly Italy ADSB"),
+    ("avdelphi", "AVDelphi"),
+    ("planespotters", "Planespotters"),
+    ("theairtraffic", "TheAirTraffic"),
+    ("adsbfi", "adsb.fi"),
+    ("adsbx", "ADSBExchange"),
+    ("hpradar", "HPRadar"),
+    ("alive", "airplanes.live"),
+    ("flightradar", "flightradar24"),
+    ("radarbox", "RadarBox"),
+    ("planewatch", "Plane.watch"),
+    ("adsbhub", "ADSBHub"),
+    ("opensky", "OpenSky"),
+    ("radarplane", "RadarPlane"),
+    ("tat", "TheAirTraffic"),
+]
+
+
+class AggregatorDiscovery:
+    """Learns which aggregators each feeder actually has configured
+    
+    Configured aggregators are polled every refresh; the others are only
+    probed every DISCOVERY_INTERVAL seconds. The configured set is saved per
+    feeder URL so the next start goes straight to the short list.
+    """
+    def __init__(self, path=None):
+        self.path = path or os.path.join(user_cache_dir(), 'aggregators.json')
+        self._lock = threading.Lock()
+        self._known = self._load()
+        self._misses = {}
+        self._last_probe = {}
+    
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            return {url: set(ids) for url, ids in saved.items()}
+        except (OSError, ValueError, AttributeError, TypeError):
+            return {}
+    
+    def _save(self):
+        with self._lock:
+            saved = {url: sorted(ids) for url, ids in self._known.items()}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(saved, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+    
+    def plan(self, feeder_url):
+        """Return (aggregator ids to request this refresh, whether that is a full probe)"""
+        now = time.monotonic()
+        with self._lock:
+            known = self._known.get(feeder_url)
+            # A set saved by an earlier run starts its probe schedule now
+            last_probe = self._last_probe.setdefault(feeder_url, now)
+        
+        if known is None or now - last_probe >= DISCOVERY_INTERVAL:
+            return [agg_id for agg_id, agg_name in AGGREGATORS], True
+        return [agg_id for agg_id, agg_name in AGGREGATORS if agg_id in known], False
+    
+    def record(self, feeder_url, statuses, full_probe):
+        """Learn from a refresh's answers
+        
+        statuses maps aggregator id to (answered, info) as returned by
+        FeederPoller._fetch_aggregator_status. Failed requests say
+        nothing about the configuration and are ignored.
+        """
+        changed = False
+        with self._lock:
+            known = self._known.get(feeder_url)
+            learned = set() if known is None else set(known)
+            answered_any = False
+            
+            for agg_id, (answered, info) in statuses.items():
+                if not answered:
+                    continue
+                answered_any = True
+                key = (feeder_url, agg_id)
+                if info is not None:
+                    learned.add(agg_id)
+                    self._misses.pop(key, None)
+                elif agg_id in learned:
+                    self._misses[key] = self._misses.get(key, 0) + 1
+                    if self._misses[key] >= DISCOVERY_MISS_LIMIT:
+                        learned.discard(agg_id)
+                        del self._misses[key]
+            
+            if answered_any and learned != known:
+                self._known[feeder_url] = learned
+                changed = True
+            if full_probe and answered_any:
+                self._last_probe[feeder_url] = time.monotonic()
+        
+        if changed:
+            self._save()
+
+
+def aggregator_indicators(beast_status, mlat_status):
+    """Map adsb.im beast/mlat status strings to (enabled, data, mlat) indicator states"""
+    # Determine overall "Enabled" status (combines beast and mlat)
+    # good + good = good (green check)
+    # good + bad/disconnected = warning (yellow !)
+    # bad/disconnected + anything = bad (red X)
+    beast_good = beast_status == 'good'
+    mlat_good = mlat_status == 'good'
+    mlat_bad = mlat_status in ('disconnected', 'down', 'bad', 'error')
+    
+    if beast_good and mlat_good:
+        enabled = True  # All good - green check
+    elif beast_good and mlat_bad:
+        enabled = "warning"  # Beast ok but MLAT issues - yellow !
+    elif beast_good:
+        enabled = True  # Beast good, MLAT unknown/not applicable
+    else:
+        enabled = False  # Beast not good - red X
+    
+    # Data indicator (based on beast status)
+    if beast_status == 'good':
+        data = True
+    elif beast_status in ('degraded', 'intermittent'):
+        data = "warning"
+    else:
+        data = False
+    
+    # MLAT indicator
+    if mlat_status == 'good':
+        mlat = True
+    elif mlat_status in ('degraded', 'intermittent'):
+        mlat = "warning"
+    elif mlat_bad:
+        mlat = "error"
+    else:
+        mlat = False  # unknown or not applicable
+    
+    return enabled, data, mlat
+
+
+def aggregator_health(aggregators):
+    """Return (fully healthy, total) counts for a list of aggregator status dicts"""
+    good = 0
+    for agg in aggregators:
+        enabled, data, mlat = aggregator_indicators(agg.get('beast', 'unknown'), agg.get('mlat', 'unknown'))
+        if enabled is True:
+            good += 1
+    return good, len(aggregators)
@@ -0,0 +1,114 @@
+"""Aircraft currently seen by a feeder, from tar1090's aircraft.json"""
+
+import math
+import operator
+
+# tar1090 data served by the feeder
+AIRCRAFT_JSON_PATH = "/data/aircraft.json"
+
+# Per-aircraft fields kept, in the order of the tuples built by parse_aircraft_json()
+AIRCRAFT_FIELDS = ('flight', 'squawk', 'altitude', 'speed', 'track', 'vert_rate', 'lat', 'lon', 'rssi')
+
+_get_fields = operator.attrgetter(*AIRCRAFT_FIELDS)
+
+
+def _number(value, digits=0):
+    """Round a JSON number for display, so noise below that precision is no change"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return round(value, digits) if digits else int(round(value))
+    return None
+
+
+def parse_aircraft_json(doc):
+    """Turn an aircraft.json document into {icao hex: field tuple}
+    
+    Values are rounded to what the table shows; comparing the tuples of two
+    polls then tells which aircraft visibly changed. Entries and values of
+    the wrong type are skipped; ValueError if doc is not aircraft.json at all.
+    """
+    if not isinstance(doc, dict) or not isinstance(doc.get('aircraft') or [], list):
+        raise ValueError("not an aircraft.json document")
+    rows = {}
+    for ac in doc.get('aircraft') or ():
+        if not isinstance(ac, dict):
+            continue
+        hex_id = ac.get('hex')
+        if not hex_id or not isinstance(hex_id, str):
+            continue
+        # On the ground alt_baro is the string "ground"
+        altitude = ac.get('alt_baro')
+        if altitude != 'ground':
+            altitude = _number(altitude)
+        flight = ac.get('flight')
+        squawk = ac.get('squawk')
+        rows[hex_id] = (
+            flight.strip() if flight and isinstance(flight, str) else None,
+            squawk if isinstance(squawk, str) else None,
+            altitude,
+            _number(ac.get('gs')),
+            _number(ac.get('track')),
+            _number(ac.get('baro_rate', ac.get('geom_rate'))),
+            _number(ac.get('lat'), 4),
+            _number(ac.get('lon'), 4),
+            _number(ac.get('rssi'), 1),
+        )
+    return rows
+
+
+class Aircraft:
+    """State of one aircraft, updated in place from poll to poll
+    
+    info is the aircraft's (registration, type, operator) from the aircraft
+    database, looked up once when it first appears, or None.
+    """
+    __slots__ = ('hex', 'info') + AIRCRAFT_FIELDS
+    
+    def __init__(self, hex_id, values, info=None):
+        self.hex = hex_id
+        self.info = info
+        self.set(values)
+    
+    def set(self, values):
+        for name, value in zip(AIRCRAFT_FIELDS, values):
+            setattr(self, name, value)
+
+
+class AircraftStore:
+    """The aircraft of one feeder, keyed by ICAO hex
+    
+    Records are created when an aircraft first appears and then updated in
+    place; update() reports which ones were added, changed or removed so a
+    view only has to touch those. With an AircraftDatabase new aircraft get
+    their registration, type and operator.
+    """
+    def __init__(self, database=None):
+        self.records = {}
+        self.database = database
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def update(self, rows):
+        """Apply parsed rows and return (added, changed, removed) lists of hex ids"""
+        records = self.records
+        lookup = self.database.lookup if self.database is not None else None
+        added = []
+        changed = []
+        for hex_id, values in rows.items():
+            record = records.get(hex_id)
+            if record is None:
+                records[hex_id] = Aircraft(hex_id, values, lookup(hex_id) if lookup else None)
+                added.append(hex_id)
+            elif _get_fields(record) != values:
+                record.set(values)
+                changed.append(hex_id)
+        
+        removed = [hex_id for hex_id in records if hex_id not in rows]
+        for hex_id in removed:
+            del records[hex_id]
+        return added, changed, removed
+    
+    def clear(self):
+        removed = list(self.records)
+        self.records.clear()
+        return removed
@@ -0,0 +1,316 @@
+"""Reading a feeder's Beast output directly
+
+Beast is the binary message stream readsb serves on TCP port 30005. Each
+frame is 0x1A, a type byte, a 6-byte MLAT timestamp, a signal level byte and
+the raw Mode A/C or Mode S message; a 0x1A anywhere after the type byte is
+sent twice. Counting the frames gives the message rate as it happens,
+rather than the rounded figure stage2_stats reports every few seconds.
+"""
+
+import collections
+import math
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+BEAST_PORT = 30005
+ESCAPE = 0x1A
+# Frame types and the length of what follows the type byte once unescaped:
+# timestamp, signal level and message
+FRAME_MODE_AC = 0x31
+FRAME_MODE_S_SHORT = 0x32
+FRAME_MODE_S_LONG = 0x33
+FRAME_LENGTHS = {FRAME_MODE_AC: 7 + 2, FRAME_MODE_S_SHORT: 7 + 7, FRAME_MODE_S_LONG: 7 + 14}
+
+# Bytes received at a time
+BEAST_BUFFER_SIZE = 65536
+# Seconds the message rate and signal levels are averaged over
+BEAST_RATE_WINDOW = 10
+# Seconds without data before the connection is taken to be dead
+BEAST_READ_TIMEOUT = 30
+# Seconds to wait before reconnecting, doubled per failure up to the maximum
+BEAST_RECONNECT_DELAY = 2
+BEAST_MAX_RECONNECT_DELAY = 60
+# Signal levels above this are counted as strong, as readsb does
+STRONG_SIGNAL_DBFS = -3.0
+
+# Signal power of each level byte, relative to full scale
+_POWER = [(level / 255) ** 2 for level in range(256)]
+_STRONG_POWER = 10 ** (STRONG_SIGNAL_DBFS / 10)
+# Key of Mode A/C replies in the downlink format counts
+MODE_AC = 'mode_ac'
+
+
+def _dbfs(power):
+    return 10 * math.log10(power) if power > 0 else None
+
+
+class BeastFramer:
+    """Splits a Beast byte stream into frames
+    
+    The framer owns the receive buffer: data is read straight into it and
+    frames() hands out (type, payload) tuples where payload, the unescaped
+    bytes after the type byte, is a memoryview slice of the buffer. Only the
+    rare frames with escaped bytes are copied. Payloads are valid until the
+    next read, and a partial frame at the end is kept for it.
+    """
+    def __init__(self, size=BEAST_BUFFER_SIZE):
+        self.buffer = bytearray(size)
+        self._view = memoryview(self.buffer)
+        # Bytes in the buffer, and where those not framed yet start
+        self._filled = 0
+        self._start = 0
+        # Frames that broke off before their end
+        self.bad_frames = 0
+    
+    def receive(self, sock):
+        """Read from a socket into the buffer; 0 when the peer closed"""
+        self._compact()
+        count = sock.recv_into(self._view[self._filled:])
+        self._filled += count
+        return count
+    
+    def feed(self, data):
+        """Frame bytes from elsewhere than a socket
+        
+        Unlike frames(), the payloads returned are copies, as data larger
+        than the buffer takes more than one pass through it.
+        """
+        data = memoryview(data)
+        frames = []
+        while data:
+            self._compact()
+            count = min(len(data), len(self.buffer) - self._filled)
+            self._view[self._filled:self._filled + count] = data[:count]
+            self._filled += count
+            data = data[count:]
+            frames += [(kind, bytes(payload)) for kind, payload in self.frames()]
+        return frames
+    
+    def frames(self):
+        """Take the complete frames out of the buffer"""
+        buffer = self.buffer
+        view = self._view
+        end = self._filled
+        frames = []
+        
+        pos = buffer.find(ESCAPE, self._start, end)
+        while pos != -1:
+            if pos + 2 > end:
+                break
+            kind = buffer[pos + 1]
+            length = FRAME_LENGTHS.get(kind)
+            if length is None:
+                # An escaped 0x1A or an unknown type: not a frame start
+                pos = buffer.find(ESCAPE, pos + (2 if kind == ESCAPE else 1), end)
+                continue
+            start = pos + 2
+            stop = start + length
+            if stop > end:
+                break
+            if buffer.find(ESCAPE, start, stop) == -1:
+                payload = view[start:stop]
+            else:
+                payload, stop = self._unescape(start, length, end)
+                if payload is None:
+                    break
+                if payload is False:
+                    # A lone 0x1A: the next frame starts before this one ended
+                    self.bad_frames += 1
+                    pos = stop
+                    continue
+            frames.append((kind, payload))
+            pos = buffer.find(ESCAPE, stop, end)
+        
+        # A partial frame at the end waits for the next read
+        self._start = end if pos == -1 else pos
+        return frames
+    
+    def _compact(self):
+        """Move what is left of the last read to the front of the buffer
+        
+        Done just before the next read, as the payloads handed out by
+        frames() point into the buffer until then.
+        """
+        left = self._filled - self._start
+        if left == len(self.buffer):
+            # A buffer full of nothing that frames
+            left = 0
+        elif left:
+            self.buffer[:left] = bytes(self._view[self._start:self._filled])
+        self._filled = left
+        self._start = 0
+    
+    def _unescape(self, start, length, end):
+        """Copy out a frame payload that contains escaped bytes
+        
+        Returns (payload, end of the frame); payload is None if the frame is
+        not complete yet and False if a lone 0x1A cuts it short, with the
+        position of that 0x1A.
+        """
+        buffer = self.buffer
+        payload = bytearray()
+        pos = start
+        while len(payload) < length:
+            if pos >= end:
+                return None, pos
+            byte = buffer[pos]
+            if byte == ESCAPE:
+                if pos + 1 >= end:
+                    return None, pos
+                if buffer[pos + 1] != ESCAPE:
+                    return False, pos
+                pos += 1
+            payload.append(byte)
+            pos += 1
+        return memoryview(payload), pos
+
+
+class BeastStats:
+    """Message counts and signal levels of recent Beast frames
+    
+    Frames are tallied per second; snapshot() sums the last
+    BEAST_RATE_WINDOW seconds. add() is called from the reading thread and
+    snapshot() from the UI, so both only hold the lock briefly.
+    """
+    def __init__(self, window=BEAST_RATE_WINDOW):
+        self.window = window
+        self.total = 0
+        self._lock = threading.Lock()
+        # [second, messages, power sum, peak level, strong, {df: messages}]
+        self._buckets = collections.deque()
+    
+    def add(self, frames, now=None):
+        if not frames:
+            return
+        power = 0.0
+        peak = 0
+        strong = 0
+        formats = collections.Counter()
+        for kind, payload in frames:
+            level = payload[6]
+            power += _POWER[level]
+            if level > peak:
+                peak = level
+            if _POWER[level] > _STRONG_POWER:
+                strong += 1
+            formats[payload[7] >> 3 if kind != FRAME_MODE_AC else MODE_AC] += 1
+        
+        second = int(now if now is not None else time.time())
+        with self._lock:
+            self.total += len(frames)
+            buckets = self._buckets
+            if not buckets or buckets[-1][0] != second:
+                buckets.append([second, 0, 0.0, 0, 0, collections.Counter()])
+                while buckets[0][0] < second - self.window:
+                    buckets.popleft()
+            bucket = buckets[-1]
+            bucket[1] += len(frames)
+            bucket[2] += power
+            bucket[3] = max(bucket[3], peak)
+            bucket[4] += strong
+            bucket[5].update(formats)
+    
+    def snapshot(self, now=None):
+        """Message rate, downlink format shares and signal levels (dBFS) of the last window"""
+        now = now if now is not None else time.time()
+        # The current second is still filling up
+        first = int(now) - self.window
+        with self._lock:
+            buckets = [bucket for bucket in self._buckets if first <= bucket[0] < int(now)]
+            # Right after connecting there is less than a window to go by
+            seconds = int(now) - buckets[0][0] if buckets else self.window
+            total = self.total
+            messages = sum(bucket[1] for bucket in buckets)
+            power = sum(bucket[2] for bucket in buckets)
+            peak = max((bucket[3] for bucket in buckets), default=0)
+            strong = sum(bucket[4] for bucket in buckets)
+            formats = collections.Counter()
+            for bucket in buckets:
+                formats.update(bucket[5])
+        
+        return {
+            'total': total,
+            'rate': messages / seconds,
+            'formats': {df: count / messages for df, count in formats.most_common()},
+            'signal': _dbfs(power / messages) if messages else None,
+            'peak': _dbfs(_POWER[peak]) if messages else None,
+            'strong': strong / messages if messages else None,
+        }
+
+
+class BeastClient:
+    """Reads a feeder's Beast output on a background thread
+    
+    Reconnects with a growing delay when the connection fails or goes
+    quiet. Results are read from `stats`; `connected` and `error` tell how
+    the connection is doing.
+    """
+    def __init__(self, host, port=BEAST_PORT):
+        self.host = host
+        self.port = port
+        self.stats = BeastStats()
+        self.connected = False
+        self.error = None
+        self._stop = threading.Event()
+        self._sock = None
+        self._thread = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="beast", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+    
+    def _run(self):
+        delay = BEAST_RECONNECT_DELAY
+        while not self._stop.is_set():
+            try:
+                self._read_stream()
+                delay = BEAST_RECONNECT_DELAY
+            except OSError as e:
+                self.error = str(e) or type(e).__name__
+            self.connected = False
+            if self._stop.wait(delay):
+                break
+            delay = min(delay * 2, BEAST_MAX_RECONNECT_DELAY)
+    
+    def _read_stream(self):
+        framer = BeastFramer()
+        stats = self.stats
+        with socket.create_connection((self.host, self.port), timeout=BEAST_READ_TIMEOUT) as sock:
+            self._sock = sock
+            try:
+                self.connected = True
+                self.error = None
+                while not self._stop.is_set():
+                    if not framer.receive(sock):
+                        self.error = "connection closed"
+                        return
+                    stats.add(framer.frames())
+            finally:
+                self._sock = None
+
+
+def parse_beast_address(address, feeder_url):
+    """Split 'host', 'host:port' or ':port' into (host, port)
+    
+    The host defaults to the feeder's and the port to BEAST_PORT.
+    """
+    host, sep, port = address.rpartition(':')
+    if not sep:
+        host, port = address, ''
+    if port and not port.isdigit():
+        raise ValueError(f"expected HOST[:PORT], got {address!r}")
+    host = host.strip('[]') or urlsplit(feeder_url).hostname
+    if not host:
+        raise ValueError(f"no Beast host in {address!r}")
+    return host, int(port) if port else BEAST_PORT
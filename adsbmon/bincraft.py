@@ -0,0 +1,157 @@
+"""Decoding of tar1090's binCraft aircraft feed
+
+binCraft is readsb's binary form of aircraft.json: a header followed by
+fixed-size little-endian records, one per aircraft. The record size
+("stride") is in the header and the first record starts one stride into the
+buffer. Field offsets follow tar1090's decoder (wqi() in formatter.js).
+
+Records are decoded in bulk with a NumPy structured dtype laid over the
+received bytes, without copying them. NumPy and a zstd decompressor are
+optional: without NumPy the monitor reads aircraft.json instead, without
+zstd it asks for the uncompressed binCraft file.
+"""
+
+import struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    # Python 3.14+
+    from compression import zstd as _zstd
+except ImportError:
+    try:
+        import zstandard as _zstd
+    except ImportError:
+        _zstd = None
+
+BINCRAFT_PATH = "/data/aircraft.binCraft"
+BINCRAFT_ZSTD_PATH = "/data/aircraft.binCraft.zst"
+
+# Record fields used by the aircraft table: (name, format, byte offset)
+RECORD_FIELDS = [
+    ('addr', '<i4', 0),
+    ('lon', '<i4', 8),
+    ('lat', '<i4', 12),
+    ('baro_rate', '<i2', 16),
+    ('geom_rate', '<i2', 18),
+    ('alt_baro', '<i2', 20),
+    ('squawk', '<u2', 32),
+    ('gs', '<i2', 34),
+    ('track', '<i2', 40),
+    ('airground', 'u1', 68),
+    ('valid', 'u1', 73),
+    ('valid2', 'u1', 74),
+    ('valid3', 'u1', 75),
+    ('valid4', 'u1', 76),
+    ('flight', 'S8', 78),
+    ('rssi', 'u1', 105),
+]
+# Smallest record that holds all of the above
+MIN_STRIDE = 106
+
+# Validity bits of the valid, valid2, valid3 and valid4 bytes
+VALID_FLIGHT = 8
+VALID_ALT_BARO = 16
+VALID_POSITION = 64
+VALID_GS = 128
+VALID2_TRACK = 8
+VALID3_BARO_RATE = 1
+VALID3_GEOM_RATE = 2
+VALID4_SQUAWK = 4
+# Set in addr for addresses that are not ICAO assigned; tar1090 shows them with a '~'
+NON_ICAO_FLAG = 1 << 24
+
+_dtypes = {}
+
+
+def available():
+    return numpy is not None
+
+
+def zstd_available():
+    return _zstd is not None
+
+
+def zstd_decompress(data):
+    """Decompress a zstd frame; ValueError if it is not valid"""
+    try:
+        if hasattr(_zstd, 'ZstdDecompressor'):
+            # zstandard: the frame may not record its decompressed size
+            return _zstd.ZstdDecompressor().decompressobj().decompress(data)
+        return _zstd.decompress(data)
+    except Exception as e:
+        raise ValueError(f"invalid zstd data: {e}") from e
+
+
+def record_dtype(stride):
+    """Structured dtype covering one record of the given size"""
+    dtype = _dtypes.get(stride)
+    if dtype is None:
+        names, formats, offsets = zip(*RECORD_FIELDS)
+        dtype = numpy.dtype({
+            'names': list(names),
+            'formats': list(formats),
+            'offsets': list(offsets),
+            'itemsize': stride,
+        })
+        _dtypes[stride] = dtype
+    return dtype
+
+
+def _where(mask, values):
+    """values as Python objects where mask is set, None elsewhere"""
+    return numpy.where(mask, values.astype(object), None).tolist()
+
+
+def decode_aircraft(buffer):
+    """Decode a binCraft buffer into {icao hex: field tuple}
+    
+    The result has the same form as adsbmon.aircraft.parse_aircraft_json().
+    """
+    if len(buffer) < 12:
+        raise ValueError("binCraft data too short")
+    stride = struct.unpack_from('<I', buffer, 8)[0]
+    if stride < MIN_STRIDE or stride % 4:
+        raise ValueError(f"unsupported binCraft record size {stride}")
+    count = (len(buffer) - stride) // stride
+    if count <= 0:
+        return {}
+    
+    records = numpy.frombuffer(buffer, dtype=record_dtype(stride), count=count, offset=stride)
+    valid = records['valid']
+    valid2 = records['valid2']
+    valid3 = records['valid3']
+    
+    addr = records['addr']
+    hex_ids = numpy.char.mod('%06x', addr & 0xFFFFFF)
+    hex_ids = numpy.where(addr & NON_ICAO_FLAG, numpy.char.add('~', hex_ids), hex_ids)
+    
+    flight = numpy.char.strip(numpy.char.decode(records['flight'], 'ascii', 'replace'))
+    flight = _where((valid & VALID_FLIGHT != 0) & (flight != ''), flight)
+    
+    squawk = _where(records['valid4'] & VALID4_SQUAWK != 0, numpy.char.mod('%04x', records['squawk']))
+    
+    altitude = numpy.where(valid & VALID_ALT_BARO != 0,
+                           records['alt_baro'].astype(numpy.int32) * 25, None)
+    altitude = numpy.where(records['airground'] & 15 == 1, 'ground', altitude).tolist()
+    
+    speed = _where(valid & VALID_GS != 0, numpy.rint(records['gs'] / 10).astype(numpy.int64))
+    track = _where(valid2 & VALID2_TRACK != 0, numpy.rint(records['track'] / 90).astype(numpy.int64))
+    
+    # Barometric rate, or the geometric one where that is all there is
+    has_baro_rate = valid3 & VALID3_BARO_RATE != 0
+    vert_rate = numpy.where(has_baro_rate, records['baro_rate'], records['geom_rate']).astype(numpy.int64) * 8
+    vert_rate = _where(has_baro_rate | (valid3 & VALID3_GEOM_RATE != 0), vert_rate)
+    
+    has_position = valid & VALID_POSITION != 0
+    lat = _where(has_position, numpy.round(records['lat'] / 1e6, 4))
+    lon = _where(has_position, numpy.round(records['lon'] / 1e6, 4))
+    
+    signal = records['rssi'].astype(numpy.float64)
+    rssi = numpy.round(10 * numpy.log10(signal * signal / 65025 + 1.125e-5), 1).tolist()
+    
+    return dict(zip(hex_ids.tolist(),
+                    zip(flight, squawk, altitude, speed, track, vert_rate, lat, lon, rssi)))
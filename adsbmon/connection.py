@@ -0,0 +1,341 @@
+"""Pooled keep-alive HTTP connections to feeders"""
+
+import contextlib
+import http.client
+import socket
+import threading
+import time
+import urllib.parse
+import zlib
+
+try:
+    # Python 3.14+
+    from compression import zstd as _zstd
+except ImportError:
+    try:
+        import zstandard as _zstd
+    except ImportError:
+        _zstd = None
+
+# Upper bound on simultaneous requests to a single feeder
+DEFAULT_MAX_CONCURRENT_REQUESTS = 6
+# Seconds to wait for a connection to a feeder, which answers within
+# milliseconds on a local network unless it is down
+CONNECT_TIMEOUT = 2
+# Seconds to wait for each read of a response once connected
+REQUEST_TIMEOUT = 5
+# Seconds a resolved feeder address (e.g. adsb-feeder.local over mDNS) is reused
+DNS_CACHE_TTL = 60
+# Seconds an idle keep-alive connection is kept before being discarded
+IDLE_CONNECTION_TIMEOUT = 30
+# Compressed bytes read from a response at a time while decoding it
+RESPONSE_CHUNK_SIZE = 65536
+
+# Content codings asked for, in order of preference; zstd only with a decoder
+ACCEPT_ENCODING = ", ".join((["zstd"] if _zstd is not None else []) + ["gzip", "deflate"])
+
+
+class _Lookup:
+    """A host name resolution in progress"""
+    __slots__ = ('done', 'address', 'error')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.address = None
+        self.error = None
+
+
+class DNSCache:
+    """Caches host name resolution for a limited time
+    
+    getaddrinfo() cannot be given a timeout, and an mDNS name such as
+    adsb-feeder.local that does not resolve can take long to fail, so
+    lookups run on a thread of their own that callers wait for up to a
+    timeout. Callers resolving the same name share one lookup.
+    """
+    def __init__(self, ttl=DNS_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+    
+    def resolve(self, host, port, timeout=None):
+        """Return an (address, port) pair for host, resolving it if needed
+        
+        Raises socket.timeout if resolving takes longer than timeout seconds.
+        """
+        key = (host, port)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.monotonic():
+                return entry[0]
+            lookup = self._pending.get(key)
+            if lookup is None:
+                lookup = self._pending[key] = _Lookup()
+                threading.Thread(target=self._lookup, args=(key, lookup), name="adsb-dns", daemon=True).start()
+        
+        if not lookup.done.wait(timeout):
+            raise socket.timeout(f"resolving {host} timed out")
+        if lookup.error is not None:
+            raise lookup.error
+        return lookup.address
+    
+    def _lookup(self, key, lookup):
+        try:
+            infos = socket.getaddrinfo(*key, type=socket.SOCK_STREAM)
+            lookup.address = infos[0][4][:2]
+        except OSError as e:
+            lookup.error = e
+        with self._lock:
+            self._pending.pop(key, None)
+            if lookup.address is not None:
+                self._entries[key] = (lookup.address, time.monotonic() + self.ttl)
+        lookup.done.set()
+    
+    def forget(self, host, port):
+        """Drop a cached address, e.g. after connecting to it failed"""
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+class _ResolvingConnectionMixin:
+    """Opens the connection socket through a DNSCache
+    
+    Resolving the host name and connecting each give up after
+    connect_timeout seconds; reads on the open socket wait up to timeout
+    seconds.
+    """
+    def __init__(self, host, port, resolver, timeout, connect_timeout):
+        super().__init__(host, port, timeout=timeout)
+        self.resolver = resolver
+        self.connect_timeout = connect_timeout
+    
+    def _open_socket(self):
+        address = self.resolver.resolve(self.host, self.port, self.connect_timeout)
+        try:
+            sock = socket.create_connection(address, self.connect_timeout, self.source_address)
+        except OSError:
+            self.resolver.forget(self.host, self.port)
+            raise
+        sock.settimeout(self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+
+class _PooledHTTPConnection(_ResolvingConnectionMixin, http.client.HTTPConnection):
+    def connect(self):
+        self.sock = self._open_socket()
+
+
+class _PooledHTTPSConnection(_ResolvingConnectionMixin, http.client.HTTPSConnection):
+    def connect(self):
+        sock = self._open_socket()
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+class _Decompressor:
+    """Streaming decoder of one response's Content-Encoding"""
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding in ('gzip', 'x-gzip'):
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            self._obj = zlib.decompressobj()
+        elif encoding == 'zstd' and _zstd is not None:
+            if getattr(_zstd, '__name__', '') == 'zstandard':
+                self._obj = _zstd.ZstdDecompressor().decompressobj()
+            else:
+                self._obj = _zstd.ZstdDecompressor()
+        else:
+            raise ValueError(f"unsupported Content-Encoding: {encoding}")
+        self._started = False
+    
+    def decompress(self, chunk):
+        try:
+            data = self._obj.decompress(chunk)
+        except zlib.error as e:
+            # Some servers send "deflate" without the zlib header
+            if self.encoding != 'deflate' or self._started:
+                raise ValueError(f"invalid {self.encoding} data: {e}") from e
+            self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+            self._started = True
+            return self.decompress(chunk)
+        except Exception as e:
+            raise ValueError(f"invalid {self.encoding} data: {e}") from e
+        self._started = True
+        return data
+    
+    def flush(self):
+        """Whatever is left once the body has been read; ValueError if it was cut short"""
+        data = self._obj.flush() if hasattr(self._obj, 'flush') else b''
+        if not getattr(self._obj, 'eof', True):
+            raise ValueError(f"truncated {self.encoding} data")
+        return data
+
+
+class DecodedResponse:
+    """An http.client.HTTPResponse whose body reads decoded
+    
+    The body is decompressed chunk by chunk as it is read, so a compressed
+    response is never held in memory whole next to its decoded form.
+    `wire_bytes` counts what was received, `bytes` what was decoded from it.
+    """
+    def __init__(self, response):
+        self.response = response
+        self.status = response.status
+        encoding = (response.getheader('Content-Encoding') or '').strip().lower()
+        self._decompressor = _Decompressor(encoding) if encoding not in ('', 'identity') else None
+        self._pending = b''
+        self._eof = False
+        self.wire_bytes = 0
+        self.bytes = 0
+    
+    def getheader(self, name, default=None):
+        return self.response.getheader(name, default)
+    
+    def read(self, amt=None):
+        """Read up to amt decoded bytes, or all that is left"""
+        if self._decompressor is None:
+            data = self.response.read(amt)
+            self.wire_bytes += len(data)
+            self.bytes += len(data)
+            return data
+        if amt is None:
+            out = bytearray(self._pending)
+            self._pending = b''
+            while not self._eof:
+                out += self._fill()
+            return out
+        while len(self._pending) < amt and not self._eof:
+            self._pending += self._fill()
+        data, self._pending = self._pending[:amt], self._pending[amt:]
+        return data
+    
+    def _fill(self):
+        chunk = self.response.read(RESPONSE_CHUNK_SIZE)
+        self.wire_bytes += len(chunk)
+        if chunk:
+            data = self._decompressor.decompress(chunk)
+        else:
+            self._eof = True
+            data = self._decompressor.flush()
+        self.bytes += len(data)
+        return data
+
+
+class FeederConnectionPool:
+    """Keeps HTTP/1.1 keep-alive connections to feeder hosts open between refreshes
+    
+    Connections are checked out for a single request and returned once the
+    response body has been read completely. A reused connection that turns
+    out to have been closed by the feeder is replaced transparently.
+    Requests ask for a compressed body, which responses decode as they are
+    read.
+    """
+    def __init__(self, max_idle=DEFAULT_MAX_CONCURRENT_REQUESTS, timeout=REQUEST_TIMEOUT,
+                 connect_timeout=CONNECT_TIMEOUT):
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.resolver = DNSCache()
+        self._idle = {}
+        self._lock = threading.Lock()
+    
+    def _acquire(self, key):
+        """Return (connection, reused) for the given (scheme, host, port)"""
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                conn, idle_since = idle.pop()
+                if now - idle_since < IDLE_CONNECTION_TIMEOUT:
+                    return conn, True
+                conn.close()
+        return self._connection(key), False
+    
+    def _connection(self, key):
+        scheme, host, port = key
+        conn_class = _PooledHTTPSConnection if scheme == "https" else _PooledHTTPConnection
+        return conn_class(host, port, self.resolver, self.timeout, self.connect_timeout)
+    
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+    
+    @staticmethod
+    def _key(url):
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        return (scheme, parts.hostname, port), parts
+    
+    def probe(self, url):
+        """Make sure the feeder behind url accepts connections
+        
+        Always opens a new connection, as idle ones may predate an outage,
+        waiting at most connect_timeout; the connection is then kept for the
+        next request. Raises OSError if the feeder cannot be reached.
+        """
+        key, parts = self._key(url)
+        conn = self._connection(key)
+        try:
+            conn.connect()
+        except BaseException:
+            conn.close()
+            raise
+        self._release(key, conn)
+    
+    @contextlib.contextmanager
+    def open(self, url, headers=None):
+        """Send a GET request and yield its DecodedResponse
+        
+        The connection goes back to the pool if the caller read the whole
+        body; otherwise it is closed. A body in a Content-Encoding that
+        cannot be decoded raises ValueError.
+        """
+        key, parts = self._key(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        headers = {'Accept-Encoding': ACCEPT_ENCODING, **(headers or {})}
+        
+        for attempt in range(2):
+            conn, reused = self._acquire(key)
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+            except (ConnectionError, http.client.BadStatusLine):
+                conn.close()
+                # The feeder closed an idle keep-alive socket, retry on a fresh one
+                if reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            break
+        
+        try:
+            yield DecodedResponse(response)
+        except BaseException:
+            conn.close()
+            raise
+        
+        if not response.isclosed() and response.length == 0:
+            response.read()
+        if response.isclosed() and not response.will_close:
+            self._release(key, conn)
+        else:
+            conn.close()
+    
+    def close(self):
+        """Close all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn, idle_since in connections:
+                conn.close()
@@ -0,0 +1,223 @@
+"""Receiver coverage: the farthest position seen per bearing and altitude band"""
+
+import hashlib
+import math
+import os
+import struct
+import threading
+import time
+from array import array
+
+from .aircraft import AIRCRAFT_FIELDS
+from .paths import user_data_dir
+
+# tar1090's receiver.json holds the feeder's location
+RECEIVER_JSON_PATH = "/data/receiver.json"
+
+# Bearing sectors around the receiver
+COVERAGE_SECTORS = 360
+# Upper edges in feet of the altitude bands; the last band is open-ended
+COVERAGE_BAND_EDGES = (10000, 20000, 30000)
+COVERAGE_BANDS = len(COVERAGE_BAND_EDGES) + 1
+# Positions farther away than this are taken to be bogus
+COVERAGE_MAX_RANGE_KM = 600
+# Seconds between saves of the coverage file
+COVERAGE_SAVE_INTERVAL = 300
+# Degrees the receiver may move before its coverage starts over
+COVERAGE_RECEIVER_TOLERANCE = 0.01
+
+EARTH_RADIUS_KM = 6371.0
+
+_LAT = AIRCRAFT_FIELDS.index('lat')
+_LON = AIRCRAFT_FIELDS.index('lon')
+_ALTITUDE = AIRCRAFT_FIELDS.index('altitude')
+
+# magic, version, receiver lat, receiver lon, day of `today`
+_HEADER = struct.Struct('<4sIddI')
+_MAGIC = b'ADSC'
+_VERSION = 1
+
+# numpy, once looked up; it is slow to import and only needed with aircraft
+_numpy = False
+
+
+def _load_numpy():
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+def _altitude_band(altitude):
+    if not isinstance(altitude, (int, float)):
+        return 0
+    for band, edge in enumerate(COVERAGE_BAND_EDGES):
+        if altitude < edge:
+            return band
+    return len(COVERAGE_BAND_EDGES)
+
+
+class CoverageMap:
+    """Maximum range in km per (altitude band, bearing sector) of one feeder
+    
+    Two grids are kept: `today` starts over every UTC day and `best` holds
+    the all-time maximum, so a shrinking `today` against `best` shows an
+    antenna or cable problem. Each poll only touches the cells its aircraft
+    fall into, so updating costs O(aircraft), and the grids are saved to a
+    small file per feeder under the data directory.
+    """
+    def __init__(self, feeder_url, directory=None):
+        self.directory = directory or os.path.join(user_data_dir(), 'coverage')
+        self._lock = threading.Lock()
+        self._last_save = time.monotonic()
+        self._load(feeder_url)
+    
+    def _path(self, feeder_url):
+        name = hashlib.sha1(feeder_url.encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{name}.bin")
+    
+    def _reset(self, receiver=None):
+        cells = COVERAGE_SECTORS * COVERAGE_BANDS
+        self.receiver = receiver
+        self.day = self._today()
+        self.today = array('d', bytes(8 * cells))
+        self.best = array('d', bytes(8 * cells))
+    
+    @staticmethod
+    def _today():
+        return int(time.time() // 86400)
+    
+    def _load(self, feeder_url):
+        self.feeder_url = feeder_url
+        self._reset()
+        cells = COVERAGE_SECTORS * COVERAGE_BANDS
+        try:
+            with open(self._path(feeder_url), 'rb') as f:
+                header = f.read(_HEADER.size)
+                magic, version, lat, lon, day = _HEADER.unpack(header)
+                if magic != _MAGIC or version != _VERSION:
+                    return
+                today = array('d')
+                best = array('d')
+                today.fromfile(f, cells)
+                best.fromfile(f, cells)
+        except (OSError, EOFError, struct.error):
+            return
+        self.receiver = (lat, lon)
+        self.best = best
+        if day == self._today():
+            self.today = today
+    
+    def save(self):
+        """Write the grids out, replacing the previous file atomically"""
+        with self._lock:
+            if self.receiver is None:
+                return
+            data = (_HEADER.pack(_MAGIC, _VERSION, self.receiver[0], self.receiver[1], self.day)
+                    + self.today.tobytes() + self.best.tobytes())
+            path = self._path(self.feeder_url)
+            self._last_save = time.monotonic()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+    
+    def set_feeder_url(self, feeder_url):
+        """Save this feeder's coverage and switch to another's"""
+        self.save()
+        with self._lock:
+            self._load(feeder_url)
+    
+    def add(self, feeder_url, receiver, rows):
+        """Take the positions of one poll's aircraft rows into account
+        
+        receiver is the feeder's (lat, lon); rows are as returned by
+        parse_aircraft_json(). Rows of another feeder than the current one,
+        from a poll that was running when it changed, are ignored.
+        """
+        positions = [(values[_LAT], values[_LON], values[_ALTITUDE])
+                     for values in rows.values() if values[_LAT] is not None]
+        
+        numpy = _load_numpy()
+        with self._lock:
+            if feeder_url != self.feeder_url:
+                return
+            if self.receiver is None or (
+                abs(receiver[0] - self.receiver[0]) > COVERAGE_RECEIVER_TOLERANCE
+                or abs(receiver[1] - self.receiver[1]) > COVERAGE_RECEIVER_TOLERANCE
+            ):
+                self._reset(receiver)
+            if self.day != self._today():
+                self.day = self._today()
+                self.today = array('d', bytes(8 * len(self.today)))
+            
+            if positions:
+                if numpy is not None:
+                    self._add_vectorized(numpy, receiver, positions)
+                else:
+                    self._add_each(receiver, positions)
+        
+        if time.monotonic() - self._last_save >= COVERAGE_SAVE_INTERVAL:
+            self.save()
+    
+    def _add_vectorized(self, numpy, receiver, positions):
+        lat, lon, altitude = zip(*positions)
+        lat0, lon0 = math.radians(receiver[0]), math.radians(receiver[1])
+        lat = numpy.radians(numpy.array(lat, dtype=numpy.float64))
+        dlon = numpy.radians(numpy.array(lon, dtype=numpy.float64)) - lon0
+        dlat = lat - lat0
+        
+        # Haversine distance and initial bearing from the receiver
+        a = numpy.sin(dlat / 2) ** 2 + math.cos(lat0) * numpy.cos(lat) * numpy.sin(dlon / 2) ** 2
+        distance = 2 * EARTH_RADIUS_KM * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1.0)))
+        bearing = numpy.degrees(numpy.arctan2(
+            numpy.sin(dlon) * numpy.cos(lat),
+            math.cos(lat0) * numpy.sin(lat) - math.sin(lat0) * numpy.cos(lat) * numpy.cos(dlon),
+        )) % 360
+        
+        altitude = numpy.array([value if isinstance(value, (int, float)) else 0 for value in altitude],
+                               dtype=numpy.float64)
+        band = numpy.searchsorted(COVERAGE_BAND_EDGES, altitude, side='right')
+        sector = (bearing * (COVERAGE_SECTORS / 360)).astype(numpy.intp) % COVERAGE_SECTORS
+        cell = band * COVERAGE_SECTORS + sector
+        
+        keep = distance <= COVERAGE_MAX_RANGE_KM
+        cell, distance = cell[keep], distance[keep]
+        # Views onto the arrays, so the maxima land in them directly
+        numpy.maximum.at(numpy.frombuffer(self.today, dtype=numpy.float64), cell, distance)
+        numpy.maximum.at(numpy.frombuffer(self.best, dtype=numpy.float64), cell, distance)
+    
+    def _add_each(self, receiver, positions):
+        lat0, lon0 = math.radians(receiver[0]), math.radians(receiver[1])
+        for lat, lon, altitude in positions:
+            lat, dlon = math.radians(lat), math.radians(lon) - lon0
+            a = math.sin((lat - lat0) / 2) ** 2 + math.cos(lat0) * math.cos(lat) * math.sin(dlon / 2) ** 2
+            distance = 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+            if distance > COVERAGE_MAX_RANGE_KM:
+                continue
+            bearing = math.degrees(math.atan2(
+                math.sin(dlon) * math.cos(lat),
+                math.cos(lat0) * math.sin(lat) - math.sin(lat0) * math.cos(lat) * math.cos(dlon),
+            )) % 360
+            cell = _altitude_band(altitude) * COVERAGE_SECTORS + int(bearing * COVERAGE_SECTORS / 360) % COVERAGE_SECTORS
+            if distance > self.today[cell]:
+                self.today[cell] = distance
+            if distance > self.best[cell]:
+                self.best[cell] = distance
+    
+    def ranges(self, band, grid='today'):
+        """The per-sector ranges of one altitude band, as a list"""
+        values = self.today if grid == 'today' else self.best
+        start = band * COVERAGE_SECTORS
+        return values[start:start + COVERAGE_SECTORS].tolist()
+    
+    def max_range(self, grid='today'):
+        return max(self.today if grid == 'today' else self.best)
@@ -0,0 +1,213 @@
+"""Latency, size and failures of feeder requests
+
+A FeederPoller times every request it sends and records how it went, so
+an empty card can be traced back to a timeout, a DNS failure, an HTTP
+error or a response that did not parse. Shown on the Diagnostics page of
+the settings and served as JSON by the headless /diagnostics endpoint.
+"""
+
+import bisect
+import contextlib
+import http.client
+import socket
+import ssl
+import threading
+import time
+
+# Upper bounds in seconds of the latency histogram buckets; a last bucket
+# takes everything slower
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# The same for the duration of whole refreshes
+CYCLE_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Error classes, in the order they are listed
+ERROR_CLASSES = {
+    'timeout': "timeout",
+    'dns': "DNS failure",
+    'refused': "connection refused",
+    'connection': "connection error",
+    'tls': "TLS error",
+    'protocol': "HTTP protocol error",
+    'http_4xx': "HTTP 4xx",
+    'http_5xx': "HTTP 5xx",
+    'decode': "invalid response",
+    'other': "other error",
+}
+
+
+def classify_error(error):
+    """Error class of an exception raised while fetching from a feeder"""
+    if isinstance(error, (socket.timeout, TimeoutError)):
+        return 'timeout'
+    if isinstance(error, socket.gaierror):
+        return 'dns'
+    if isinstance(error, ConnectionRefusedError):
+        return 'refused'
+    if isinstance(error, ssl.SSLError):
+        return 'tls'
+    if isinstance(error, OSError):
+        return 'connection'
+    if isinstance(error, http.client.HTTPException):
+        return 'protocol'
+    if isinstance(error, ValueError):
+        # json.JSONDecodeError, UnicodeDecodeError and binCraft decoding
+        return 'decode'
+    return 'other'
+
+
+class Histogram:
+    """Counts of values in fixed buckets, plus their number and sum"""
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+    
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given quantile; None when empty
+        
+        Values beyond the last bucket report as infinity.
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+    
+    def snapshot(self):
+        return {
+            'buckets': list(self.buckets),
+            'counts': list(self.counts),
+            'count': self.count,
+            'sum': self.sum,
+        }
+
+
+class EndpointStats:
+    """What is known about requests to one endpoint"""
+    __slots__ = ('latency', 'requests', 'bytes', 'wire_bytes', 'errors', 'last_error')
+    
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.requests = 0
+        # Decoded response bytes, and what they took on the wire compressed
+        self.bytes = 0
+        self.wire_bytes = 0
+        # {error class: count}
+        self.errors = {}
+        # (time, error class, message) of the latest failure
+        self.last_error = None
+    
+    def snapshot(self):
+        return {
+            'requests': self.requests,
+            'bytes': self.bytes,
+            'wire_bytes': self.wire_bytes,
+            'errors': dict(self.errors),
+            'last_error': dict(zip(('time', 'class', 'message'), self.last_error)) if self.last_error else None,
+            'latency': self.latency.snapshot(),
+        }
+
+
+class _Request:
+    """Filled in by the caller of RequestDiagnostics.request()"""
+    __slots__ = ('status', 'bytes', 'wire_bytes')
+    
+    def __init__(self):
+        self.status = None
+        self.bytes = 0
+        self.wire_bytes = 0
+    
+    def record(self, response):
+        """Take the status and byte counts of a connection.DecodedResponse"""
+        self.status = response.status
+        self.bytes = response.bytes
+        self.wire_bytes = response.wire_bytes
+
+
+class RequestDiagnostics:
+    """Per-endpoint request statistics of one feeder
+    
+    Requests run on the engine's worker threads and count their outcome
+    without taking a lock: the counters are plain attributes and list
+    items, so the cost per request is a few increments. Two threads
+    finishing requests to the same endpoint at the very same moment can
+    lose one increment, which diagnostics can live with. Adding an endpoint
+    or an error class changes the size of a dict, though, which a reader
+    iterating it would trip over, so that is done under a lock, and the
+    readers, endpoint_stats(), last_error() and snapshot(), take it too.
+    """
+    def __init__(self):
+        self.started = time.time()
+        self.endpoints = {}
+        self.cycles = Histogram(CYCLE_BUCKETS)
+        self._lock = threading.Lock()
+    
+    @contextlib.contextmanager
+    def request(self, endpoint):
+        """Time one request to an endpoint
+        
+        Yields an object whose `status`, `bytes` and `wire_bytes` the
+        caller sets, or record()s from the response, once it is in. An
+        HTTP status of 400 or above counts as an error; exceptions are
+        classified and raised again.
+        """
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            with self._lock:
+                stats = self.endpoints.setdefault(endpoint, EndpointStats())
+        request = _Request()
+        started = time.perf_counter()
+        error = None
+        try:
+            yield request
+        except Exception as e:
+            error = classify_error(e)
+            message = str(e) or type(e).__name__
+            raise
+        finally:
+            stats.latency.observe(time.perf_counter() - started)
+            stats.requests += 1
+            stats.bytes += request.bytes
+            stats.wire_bytes += request.wire_bytes
+            if error is None and request.status is not None and request.status >= 400:
+                error = 'http_5xx' if request.status >= 500 else 'http_4xx'
+                message = f"HTTP {request.status}"
+            if error is not None:
+                with self._lock:
+                    stats.errors[error] = stats.errors.get(error, 0) + 1
+                    stats.last_error = (time.time(), error, message)
+    
+    def last_error(self, since=0):
+        """(time, error class, message) of the latest failure of any endpoint since a time, or None"""
+        with self._lock:
+            errors = [stats.last_error for stats in self.endpoints.values() if stats.last_error]
+        latest = max(errors, default=None)
+        return latest if latest is not None and latest[0] >= since else None
+    
+    def endpoint_stats(self):
+        """[(endpoint, EndpointStats)] sorted by endpoint"""
+        with self._lock:
+            return sorted(self.endpoints.items())
+    
+    def record_cycle(self, seconds):
+        """Record the duration of a whole refresh"""
+        self.cycles.observe(seconds)
+    
+    def snapshot(self):
+        """Everything recorded so far as a JSON-serializable dict"""
+        with self._lock:
+            return {
+                'since': self.started,
+                'cycles': self.cycles.snapshot(),
+                'endpoints': {endpoint: stats.snapshot() for endpoint, stats in sorted(self.endpoints.items())},
+            }
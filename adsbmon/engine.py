@@ -0,0 +1,387 @@
+"""Scheduling refreshes of any number of feeders"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from .connection import DEFAULT_MAX_CONCURRENT_REQUESTS
+
+# Seconds between refreshes of a feeder unless configured otherwise
+DEFAULT_REFRESH_INTERVAL = 5
+# Seconds a refresh waits for outstanding requests before using what it has
+FETCH_DEADLINE = 6
+# Worker threads shared by all feeders in fleet mode
+FLEET_MAX_CONCURRENCY = 32
+# Requests a single feeder may have in flight in fleet mode
+FLEET_PER_FEEDER_CONCURRENCY = 4
+# Fraction by which fleet refresh intervals are randomly stretched or shortened
+FLEET_JITTER = 0.1
+# Adaptive updates: bounds of the time between refreshes as multiples of the
+# refresh interval, the factor by which it grows while nothing changes, and
+# how many intervals saved by backing off may be spent on quicker refreshes
+ADAPTIVE_MIN_FACTOR = 0.25
+ADAPTIVE_MAX_FACTOR = 3
+ADAPTIVE_BACKOFF = 1.5
+ADAPTIVE_MAX_CREDIT = 4
+
+
+class FixedSchedule:
+    """Refresh every `interval` seconds"""
+    def __init__(self, interval):
+        self.interval = interval
+    
+    def next_delay(self, changed):
+        return self.interval
+
+
+class AdaptiveSchedule:
+    """Refresh sooner while the feeder's data changes and back off while it does not
+    
+    Each refresh that finds nothing changed stretches the delay by
+    ADAPTIVE_BACKOFF, up to ADAPTIVE_MAX_FACTOR times the interval, and the
+    time this saves over the fixed interval is banked. Each one that brings
+    a change halves the delay, down to ADAPTIVE_MIN_FACTOR times the
+    interval, for as long as the bank covers the time by which that falls
+    short of the interval. Changes that come in bursts after a quiet spell
+    are then followed closely, while over time no more requests are sent
+    than at the fixed interval.
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self.delay = interval
+        self.credit = 0.0
+    
+    def next_delay(self, changed):
+        interval = self.interval
+        if changed:
+            delay = max(interval * ADAPTIVE_MIN_FACTOR, min(self.delay, interval) / 2)
+            if interval - delay > self.credit:
+                delay = interval
+        else:
+            delay = min(interval * ADAPTIVE_MAX_FACTOR, max(self.delay, interval) * ADAPTIVE_BACKOFF)
+        self.credit = min(self.credit + delay - interval, interval * ADAPTIVE_MAX_CREDIT)
+        self.delay = delay
+        return delay
+
+
+# How refreshes are timed, by name
+UPDATE_MODES = {
+    'adaptive': AdaptiveSchedule,
+    'fixed': FixedSchedule,
+}
+# Update mode of the window; headless mode keeps to fixed intervals unless told
+# otherwise, as a Prometheus scrape should not find data older than one interval
+DEFAULT_UPDATE_MODE = 'adaptive'
+
+
+class _Feed:
+    """Scheduling state of one FeederPoller inside a PollingEngine"""
+    def __init__(self, poller, schedule):
+        self.poller = poller
+        self.schedule = schedule
+        self.result_callbacks = []
+        self.start_callbacks = []
+        self.due = None
+        self.seq = 0
+        self.first_valid_seq = 1
+        self.cycle = None
+        self.refresh_queued = False
+        # (seq, data, error) of the last refresh delivered
+        self.last_result = None
+
+
+class _Cycle:
+    """One refresh of one feeder in progress"""
+    def __init__(self, feed, seq, deadline):
+        self.feed = feed
+        self.seq = seq
+        self.deadline = deadline
+        self.context = None
+        self.queue = []
+        self.outstanding = 0
+        self.results = {}
+        self.finished = False
+
+
+class PollingEngine:
+    """Refreshes any number of feeders from one shared pool of worker threads
+    
+    Each feeder has at most one refresh in flight, with at most
+    max_concurrency of its requests running at once; the worker pool caps
+    requests across all feeders. Requests are chained through future
+    callbacks, so no thread waits on a refresh, and a single scheduler
+    thread starts refreshes when due and ends those that pass FETCH_DEADLINE.
+    The next refresh of a feeder is scheduled when the previous one
+    completes, after a delay set by the feeder's update mode (see
+    UPDATE_MODES) from whether the poller found its data changed, stretched
+    or shortened at random by up to `jitter` so that many feeders do not all
+    poll at the same moment. While a poller's retry_delay() has a delay of
+    its own, because its feeder is down, that is used instead.
+    
+    Subscribers are called from engine threads with
+    (poller, seq, data, error); results of a refresh started before the
+    last invalidate() are dropped, as are those a poller assembled to None
+    data. A new subscriber is immediately handed
+    the last result, so polling can start before anything subscribes.
+    """
+    def __init__(self, max_workers=DEFAULT_MAX_CONCURRENT_REQUESTS, jitter=0.0):
+        self.jitter = jitter
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="adsb-fetch")
+        self._cond = threading.Condition()
+        self._feeds = {}
+        self._heap = []
+        self._heap_counter = itertools.count()
+        self._cycles = set()
+        self._running = True
+        self._thread = threading.Thread(target=self._scheduler_thread, name="adsb-scheduler", daemon=True)
+        self._thread.start()
+    
+    def add(self, poller, interval, start_delay=0.0, mode='fixed'):
+        """Start polling a feeder every `interval` seconds, or around that in adaptive mode"""
+        with self._cond:
+            feed = _Feed(poller, UPDATE_MODES[mode](interval))
+            self._feeds[poller] = feed
+            self._schedule(feed, time.monotonic() + start_delay)
+    
+    def remove(self, poller):
+        """Stop polling a feeder; a refresh in flight finishes without being delivered"""
+        with self._cond:
+            self._feeds.pop(poller, None)
+    
+    def subscribe(self, poller, on_result, on_start=None):
+        """Register callbacks for a feeder's refresh results and starts
+        
+        The callbacks are called right away, from the calling thread, with
+        the last result and with a refresh that is already running. Returns
+        whether there was either, so a caller that finds neither knows the
+        feeder has not been polled yet.
+        """
+        with self._cond:
+            feed = self._feeds[poller]
+            feed.result_callbacks.append(on_result)
+            if on_start is not None:
+                feed.start_callbacks.append(on_start)
+            last_result = feed.last_result
+            running_seq = feed.cycle.seq if feed.cycle is not None else None
+        
+        if last_result is not None:
+            self._call(on_result, poller, *last_result)
+        if on_start is not None and running_seq is not None:
+            self._call(on_start, poller, running_seq)
+        return last_result is not None or running_seq is not None
+    
+    def unsubscribe(self, poller, on_result, on_start=None):
+        with self._cond:
+            feed = self._feeds.get(poller)
+            if feed is None:
+                return
+            if on_result in feed.result_callbacks:
+                feed.result_callbacks.remove(on_result)
+            if on_start in feed.start_callbacks:
+                feed.start_callbacks.remove(on_start)
+    
+    def refresh(self, poller):
+        """Refresh a feeder now; coalesced into a refresh already in flight"""
+        with self._cond:
+            feed = self._feeds.get(poller)
+            if feed is not None and feed.cycle is None:
+                self._schedule(feed, time.monotonic())
+    
+    def invalidate(self, poller):
+        """Drop the result of a refresh in flight and refresh again once it completes"""
+        with self._cond:
+            feed = self._feeds.get(poller)
+            if feed is None:
+                return
+            feed.first_valid_seq = feed.seq + 1
+            feed.last_result = None
+            if feed.cycle is not None:
+                feed.refresh_queued = True
+    
+    def get_interval(self, poller):
+        with self._cond:
+            return self._feeds[poller].schedule.interval
+    
+    def set_interval(self, poller, interval):
+        with self._cond:
+            feed = self._feeds.get(poller)
+            if feed is None:
+                return
+            # Keeps an adaptive schedule's backoff and banked credit, which
+            # next_delay() scales to the new interval
+            feed.schedule.interval = interval
+            # A refresh in flight picks up the new interval when it completes
+            if feed.cycle is None:
+                self._schedule(feed, time.monotonic() + interval)
+    
+    def get_mode(self, poller):
+        with self._cond:
+            schedule = self._feeds[poller].schedule
+            return next(name for name, cls in UPDATE_MODES.items() if type(schedule) is cls)
+    
+    def set_mode(self, poller, mode):
+        """Switch a feeder to another of UPDATE_MODES, from its next refresh on"""
+        with self._cond:
+            feed = self._feeds.get(poller)
+            if feed is not None:
+                feed.schedule = UPDATE_MODES[mode](feed.schedule.interval)
+    
+    def set_max_workers(self, max_workers):
+        """Resize the worker pool; requests already running finish on the old one"""
+        with self._cond:
+            old_executor = self._executor
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="adsb-fetch")
+        old_executor.shutdown(wait=False)
+    
+    def shutdown(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._executor.shutdown(wait=False)
+    
+    def _schedule(self, feed, due):
+        """Set when a feeder is next refreshed (lock held)"""
+        feed.due = due
+        heapq.heappush(self._heap, (due, next(self._heap_counter), feed))
+        self._cond.notify()
+    
+    def _scheduler_thread(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                now = time.monotonic()
+                
+                expired = [cycle for cycle in self._cycles if cycle.deadline <= now]
+                for cycle in expired:
+                    cycle.finished = True
+                    self._cycles.discard(cycle)
+                
+                starting = []
+                while self._heap and self._heap[0][0] <= now:
+                    due, _, feed = heapq.heappop(self._heap)
+                    # Skip entries superseded by a later _schedule() or removal
+                    if feed.due != due or feed.cycle is not None or self._feeds.get(feed.poller) is not feed:
+                        continue
+                    feed.seq += 1
+                    cycle = _Cycle(feed, feed.seq, now + FETCH_DEADLINE)
+                    feed.cycle = cycle
+                    self._cycles.add(cycle)
+                    starting.append(cycle)
+                
+                if not expired and not starting:
+                    wake_times = [cycle.deadline for cycle in self._cycles]
+                    if self._heap:
+                        wake_times.append(self._heap[0][0])
+                    timeout = max(0, min(wake_times) - now) if wake_times else None
+                    self._cond.wait(timeout)
+                    continue
+            
+            for cycle in expired:
+                self._complete(cycle)
+            for cycle in starting:
+                self._start(cycle)
+    
+    def _start(self, cycle):
+        poller = cycle.feed.poller
+        for callback in list(cycle.feed.start_callbacks):
+            self._call(callback, poller, cycle.seq)
+        
+        try:
+            jobs, cycle.context = poller.plan()
+        except Exception as e:
+            with self._cond:
+                cycle.finished = True
+                self._cycles.discard(cycle)
+            self._complete(cycle, str(e))
+            return
+        
+        with self._cond:
+            # Oldest first: jobs are popped off the end
+            cycle.queue = list(jobs.items())[::-1]
+            batch = [cycle.queue.pop() for _ in range(min(poller.max_concurrency, len(cycle.queue)))]
+            cycle.outstanding = len(batch)
+            if not batch:
+                cycle.finished = True
+                self._cycles.discard(cycle)
+        
+        if not batch:
+            self._complete(cycle)
+        for key, job in batch:
+            self._submit(cycle, key, job)
+    
+    def _submit(self, cycle, key, job):
+        func, *args = job
+        try:
+            future = self._executor.submit(func, *args)
+        except RuntimeError:
+            # The pool was shut down or swapped; count the job as failed
+            self._job_done(cycle, key, None)
+            return
+        future.add_done_callback(lambda future: self._job_done(cycle, key, future))
+    
+    def _job_done(self, cycle, key, future):
+        with self._cond:
+            if cycle.finished:
+                return
+            if future is not None and not future.cancelled() and future.exception() is None:
+                cycle.results[key] = future.result()
+            
+            cycle.outstanding -= 1
+            next_job = cycle.queue.pop() if cycle.queue else None
+            if next_job is not None:
+                cycle.outstanding += 1
+            elif cycle.outstanding == 0:
+                cycle.finished = True
+                self._cycles.discard(cycle)
+        
+        if next_job is not None:
+            self._submit(cycle, *next_job)
+        elif cycle.finished:
+            self._complete(cycle)
+    
+    def _complete(self, cycle, error=None):
+        """Deliver a finished refresh and schedule the next one"""
+        feed = cycle.feed
+        if cycle.context is not None:
+            data, error = feed.poller.assemble(cycle.context, dict(cycle.results))
+        else:
+            data = {}
+        # Nothing to show; the poller asks for the next refresh right away
+        skip = data is None
+        
+        with self._cond:
+            feed.cycle = None
+            registered = self._feeds.get(feed.poller) is feed
+            deliver = registered and cycle.seq >= feed.first_valid_seq and not skip
+            callbacks = list(feed.result_callbacks)
+            previous = feed.last_result[1] if feed.last_result is not None else None
+            if deliver:
+                feed.last_result = (cycle.seq, data, error)
+            if registered:
+                now = time.monotonic()
+                retry_delay = feed.poller.retry_delay()
+                if feed.refresh_queued:
+                    feed.refresh_queued = False
+                    self._schedule(feed, now)
+                elif retry_delay is not None:
+                    self._schedule(feed, now + retry_delay)
+                else:
+                    changed = bool(data) and feed.poller.changed(previous, data)
+                    spread = random.uniform(1 - self.jitter, 1 + self.jitter) if self.jitter else 1
+                    self._schedule(feed, now + feed.schedule.next_delay(changed) * spread)
+        
+        if deliver:
+            for callback in callbacks:
+                self._call(callback, feed.poller, cycle.seq, data, error)
+    
+    @staticmethod
+    def _call(callback, *args):
+        try:
+            callback(*args)
+        except Exception:
+            traceback.print_exc()
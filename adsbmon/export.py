@@ -0,0 +1,284 @@
+"""Exporting refresh results to a time series database or files
+
+A MetricsExporter takes every refresh result from the polling engine,
+queues its metrics and hands them to a sink in batches on a thread of its
+own: InfluxDB's line protocol over HTTP, or rotating CSV or line protocol
+files. The queue is bounded and drops its oldest points when a sink falls
+behind, so exporting never holds up polling.
+"""
+
+import collections
+import csv
+import http.client
+import io
+import math
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from .aggregators import aggregator_health
+from .history import fresh_data, sample_metrics
+
+# Points a batch holds at most; a full batch is written without waiting
+EXPORT_BATCH_SIZE = 500
+# Seconds queued points may wait before being written
+EXPORT_FLUSH_INTERVAL = 10
+# Points queued at most; beyond that the oldest are dropped
+EXPORT_QUEUE_SIZE = 20000
+# Seconds to wait before writing again after a sink failed
+EXPORT_RETRY_DELAY = 30
+# Seconds an HTTP write may take
+EXPORT_HTTP_TIMEOUT = 10
+# Size in bytes at which an export file is rotated, and rotated files kept
+EXPORT_ROTATE_BYTES = 10 * 1024 * 1024
+EXPORT_ROTATE_KEEP = 5
+
+# Measurement name of the exported points
+MEASUREMENT = "adsb_feeder"
+CSV_HEADER = ('timestamp', 'feeder', 'metric', 'value')
+
+
+def export_points(feeder_url, data):
+    """The points of a refresh result as [(timestamp, feeder, {metric: value})]
+    
+    Only values fetched by the refresh are exported, as for the history.
+    """
+    if not data or 'timestamp' not in data:
+        return []
+    fresh = fresh_data(data)
+    metrics = sample_metrics(fresh)
+    if fresh.get('aggregators'):
+        good, total = aggregator_health(fresh['aggregators'])
+        metrics['aggregators_healthy'] = float(good)
+        metrics['aggregators'] = float(total)
+    # Line protocol has no NaN or infinity, and InfluxDB rejects the whole batch over one
+    metrics = {name: value for name, value in metrics.items() if math.isfinite(value)}
+    if not metrics:
+        return []
+    return [(data['timestamp'], feeder_url, metrics)]
+
+
+def _escape_tag(value):
+    return str(value).replace('\\', '\\\\').replace(',', '\\,').replace('=', '\\=').replace(' ', '\\ ')
+
+
+def format_line_protocol(points):
+    """InfluxDB line protocol for points, with nanosecond timestamps"""
+    lines = []
+    for timestamp, feeder, metrics in points:
+        fields = ','.join(f"{_escape_tag(name)}={value!r}" for name, value in metrics.items())
+        lines.append(f"{MEASUREMENT},feeder={_escape_tag(feeder)} {fields} {int(timestamp * 1e9)}")
+    return ''.join(line + '\n' for line in lines)
+
+
+def format_csv(points):
+    """CSV rows (timestamp, feeder, metric, value) for points, without the header"""
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    for timestamp, feeder, metrics in points:
+        for name, value in metrics.items():
+            writer.writerow((f"{timestamp:.3f}", feeder, name, value))
+    return out.getvalue()
+
+
+class InfluxSink:
+    """Writes batches to an InfluxDB write endpoint
+    
+    url is the full write URL, e.g. http://host:8086/api/v2/write?org=o&bucket=b
+    or http://host:8086/write?db=adsb for InfluxDB 1.x, without a precision,
+    as timestamps are sent in nanoseconds. A token is sent as
+    "Authorization: Token ...".
+    """
+    def __init__(self, url, token=None):
+        self.url = url
+        self.token = token
+    
+    def __str__(self):
+        return self.url
+    
+    def write(self, points):
+        request = urllib.request.Request(self.url, data=format_line_protocol(points).encode(), method='POST')
+        request.add_header('Content-Type', 'text/plain; charset=utf-8')
+        if self.token:
+            request.add_header('Authorization', f"Token {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=EXPORT_HTTP_TIMEOUT) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            # 4xx other than rate limiting will not get better by retrying
+            if 400 <= e.code < 500 and e.code != 429:
+                raise ValueError(f"rejected with HTTP {e.code}: {e.read()[:200].decode(errors='replace')}")
+            raise OSError(f"HTTP {e.code}")
+    
+    def close(self):
+        pass
+
+
+class FileSink:
+    """Appends batches to a CSV or line protocol file, rotating it by size
+    
+    The format follows the file name: CSV for .csv, line protocol otherwise.
+    Rotated files are renamed to name.1, name.2, ... up to `keep`.
+    """
+    def __init__(self, path, max_bytes=EXPORT_ROTATE_BYTES, keep=EXPORT_ROTATE_KEEP):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.csv = path.endswith('.csv')
+    
+    def __str__(self):
+        return self.path
+    
+    def write(self, points):
+        text = format_csv(points) if self.csv else format_line_protocol(points)
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size and size + len(text) > self.max_bytes:
+            self._rotate()
+            size = 0
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', newline='') as f:
+            if self.csv and not size:
+                f.write(','.join(CSV_HEADER) + '\n')
+            f.write(text)
+    
+    def _rotate(self):
+        for index in range(self.keep - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        if self.keep:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+    
+    def close(self):
+        pass
+
+
+class MetricsExporter:
+    """Queues refresh results and writes them to a sink in batches
+    
+    update() is a PollingEngine subscriber and only appends to a bounded
+    deque. A writer thread takes a batch once EXPORT_BATCH_SIZE points are
+    queued or the oldest has waited EXPORT_FLUSH_INTERVAL seconds. When the
+    sink fails, the batch goes back to the front of the queue and writing
+    pauses for EXPORT_RETRY_DELAY seconds; points the sink rejects as
+    invalid, or that fail in an unexpected way, are dropped. Either way,
+    points that do not fit in the queue are dropped oldest first and counted
+    in `dropped`.
+    """
+    def __init__(self, sink, batch_size=EXPORT_BATCH_SIZE, flush_interval=EXPORT_FLUSH_INTERVAL,
+                 queue_size=EXPORT_QUEUE_SIZE, retry_delay=EXPORT_RETRY_DELAY):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.written = 0
+        self.dropped = 0
+        self.error = None
+        self._queue = collections.deque(maxlen=queue_size)
+        self._cond = threading.Condition()
+        self._closing = False
+        # Monotonic time the oldest queued point arrived, and before which
+        # a failed sink is not tried again
+        self._oldest = None
+        self._retry_at = 0.0
+        self._writer = threading.Thread(target=self._writer_thread, name="adsb-export", daemon=True)
+        self._writer.start()
+    
+    def update(self, poller, seq, data, error):
+        """PollingEngine subscriber: queue a refresh result's points"""
+        points = export_points(poller.feeder_url, data)
+        if not points:
+            return
+        with self._cond:
+            queue = self._queue
+            overflow = len(queue) + len(points) - queue.maxlen
+            if overflow > 0:
+                self.dropped += overflow
+            queue.extend(points)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            # The writer works out from the queue whether a batch is due
+            self._cond.notify()
+    
+    def close(self, timeout=5):
+        """Write what is still queued and stop the writer thread"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._writer.join(timeout)
+        self.sink.close()
+    
+    def _take_batch(self):
+        """Wait until a batch is due and take it; None once closed and empty"""
+        with self._cond:
+            queue = self._queue
+            while not self._closing:
+                now = time.monotonic()
+                if not queue:
+                    timeout = None
+                else:
+                    due = self._oldest + self.flush_interval if len(queue) < self.batch_size else now
+                    timeout = max(due, self._retry_at) - now
+                    if timeout <= 0:
+                        break
+                self._cond.wait(timeout)
+            if not queue:
+                return None
+            batch = [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+            self._oldest = time.monotonic() if queue else None
+            return batch
+    
+    def _requeue(self, batch):
+        """Put a batch that failed back in front of the queue"""
+        with self._cond:
+            queue = self._queue
+            overflow = len(queue) + len(batch) - queue.maxlen
+            if overflow > 0:
+                # The batch is older than anything queued, so it loses out first
+                self.dropped += overflow
+                batch = batch[overflow:]
+            queue.extendleft(reversed(batch))
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._retry_at = time.monotonic() + self.retry_delay
+            return not self._closing
+    
+    def _writer_thread(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            try:
+                self.sink.write(batch)
+            except ValueError as e:
+                with self._cond:
+                    self.dropped += len(batch)
+                self._report(e)
+            except (OSError, http.client.HTTPException) as e:
+                self._report(e)
+                # Give up on what is left when closing
+                if not self._requeue(batch):
+                    return
+            except Exception as e:
+                # Whatever went wrong, the thread has to keep writing
+                with self._cond:
+                    self.dropped += len(batch)
+                self._report(e)
+            else:
+                self.written += len(batch)
+                self.error = None
+    
+    def _report(self, error):
+        message = str(error) or type(error).__name__
+        if message != self.error:
+            print(f"adsb-monitor: export to {self.sink} failed: {message}", file=sys.stderr)
+        self.error = message
@@ -0,0 +1,1784 @@
+"""GTK front end"""
+
+import gi
+gi.require_version('Gtk', '4.0')
+gi.require_version('Adw', '1')
+
+from gi.repository import Gtk, Adw, GLib, GObject, Gio, Gdk, Pango
+import json
+import math
+import random
+import sqlite3
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+
+from .aircraft import AircraftStore
+from .aggregators import AGGREGATORS, AggregatorDiscovery, aggregator_health, aggregator_indicators
+from .beast import MODE_AC
+from .connection import DEFAULT_MAX_CONCURRENT_REQUESTS
+from .coverage import COVERAGE_BAND_EDGES, COVERAGE_BANDS, COVERAGE_SECTORS, CoverageMap
+from .diagnostics import ERROR_CLASSES
+from .engine import (DEFAULT_REFRESH_INTERVAL, DEFAULT_UPDATE_MODE, FLEET_JITTER, FLEET_MAX_CONCURRENCY,
+                     FLEET_PER_FEEDER_CONCURRENCY, PollingEngine)
+from .history import HistoryStore
+from .icaodb import AircraftDatabase
+from .poller import DEFAULT_URL, FeederPoller, normalize_feeder_url
+from .series import MetricSeries
+from .unique import UNIQUE_WINDOWS, UniqueAircraft
+
+APP_ID = "com.adsb.monitor"
+
+# Seconds of history drawn by a StatCard sparkline
+SPARKLINE_WINDOW = 600
+# Polling while the window is in the background: the refresh interval is
+# multiplied while another window has the focus, and raised to at least
+# HIDDEN_REFRESH_INTERVAL seconds while it is minimized, not shown or the
+# screen is locked
+UNFOCUSED_INTERVAL_FACTOR = 2
+HIDDEN_REFRESH_INTERVAL = 60
+# Seconds between updates of the Diagnostics page while it is shown
+DIAGNOSTICS_UPDATE_INTERVAL = 1
+# Update modes offered in the settings, as (engine mode, title)
+UPDATE_MODE_TITLES = [
+    ('adaptive', "Adaptive"),
+    ('fixed', "Fixed interval"),
+]
+# Names of the downlink formats in the Beast breakdown
+DOWNLINK_FORMATS = {
+    0: "ACAS",
+    4: "altitude reply",
+    5: "identity reply",
+    11: "all-call",
+    16: "ACAS",
+    17: "ADS-B",
+    18: "TIS-B / ADS-R",
+    20: "Comm-B altitude",
+    21: "Comm-B identity",
+}
+# Fill colors of the coverage plot's altitude bands, lowest first
+COVERAGE_COLORS = [
+    (0.863, 0.541, 0.867),
+    (0.384, 0.627, 0.918),
+    (0.341, 0.890, 0.537),
+    (0.973, 0.894, 0.361),
+]
+
+
+APP_CSS = """
+    .stat-card {
+        min-width: 140px;
+    }
+    .success-icon {
+        color: #57e389;
+    }
+    .warning-icon {
+        color: #f8e45c;
+    }
+    .error-icon {
+        color: #ed333b;
+    }
+    .neutral-icon {
+        color: #9a9996;
+    }
+    .link-icon {
+        color: #99c1f1;
+    }
+    .title-big {
+        font-size: 2.5em;
+        font-weight: bold;
+    }
+    .accent-text {
+        color: @accent_color;
+    }
+"""
+
+
+def load_css(display):
+    """Install the app's custom CSS for a display"""
+    css_provider = Gtk.CssProvider()
+    css_provider.load_from_data(APP_CSS.encode())
+    Gtk.StyleContext.add_provider_for_display(
+        display,
+        css_provider,
+        Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
+    )
+
+
+def track_first_frame(window, profile):
+    """Mark the first frame the window paints in a startup profile"""
+    def on_realize(widget):
+        clock = widget.get_frame_clock()
+        
+        def on_after_paint(clock):
+            clock.disconnect(handler)
+            mark_startup(window, profile, "first frame")
+        handler = clock.connect("after-paint", on_after_paint)
+    window.connect("realize", on_realize)
+
+
+def set_text(label, text):
+    """Set a label's text unless it already shows it, sparing GTK the relayout"""
+    if label.get_text() != text:
+        label.set_text(text)
+
+
+def mark_startup(window, profile, name):
+    """Record a startup milestone; report and quit once the first frame and data are in"""
+    if profile is None or profile.has(name):
+        return
+    profile.mark(name)
+    if profile.has("first frame", "first data"):
+        profile.report()
+        window.get_application().quit()
+
+
+class AggregatorRow(Gtk.Box):
+    """A row displaying aggregator status"""
+    def __init__(self, name, enabled=False, data=False, mlat=False, status="unknown"):
+        super().__init__(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
+        self.set_margin_start(12)
+        self.set_margin_end(12)
+        self.set_margin_top(8)
+        self.set_margin_bottom(8)
+        
+        # (icon name, css class, tooltip) currently shown by each indicator
+        self._looks = {}
+        
+        # Name
+        self.name_label = Gtk.Label(label=name)
+        self.name_label.set_halign(Gtk.Align.START)
+        self.name_label.set_hexpand(True)
+        self.name_label.set_width_chars(20)
+        self.append(self.name_label)
+        
+        # Enabled indicator
+        self.enabled_icon = Gtk.Image()
+        self.append(self.enabled_icon)
+        
+        # Data indicator
+        self.data_icon = Gtk.Image()
+        self.data_icon.set_margin_start(24)
+        self.append(self.data_icon)
+        
+        # MLAT indicator
+        self.mlat_icon = Gtk.Image()
+        self.mlat_icon.set_margin_start(24)
+        self.append(self.mlat_icon)
+        
+        # Status/Link icon
+        status_icon = Gtk.Image()
+        status_icon.set_from_icon_name("web-browser-symbolic")
+        status_icon.add_css_class("link-icon")
+        status_icon.set_margin_start(24)
+        self.append(status_icon)
+        
+        self.update(name, enabled, data, mlat)
+    
+    def update(self, name, enabled=False, data=False, mlat=False):
+        """Show new state, only touching the widgets whose state changed"""
+        set_text(self.name_label, name)
+        
+        if enabled == "warning":
+            look = ("dialog-warning-symbolic", "warning-icon", "Degraded")
+        elif enabled:
+            look = ("object-select-symbolic", "success-icon", "Enabled")
+        else:
+            look = ("process-stop-symbolic", "error-icon", "Disabled")
+        self._set_indicator('enabled', self.enabled_icon, look)
+        
+        if data == "warning":
+            look = ("dialog-warning-symbolic", "warning-icon", "Data Degraded")
+        elif data:
+            look = ("list-add-symbolic", "success-icon", "Sending Data")
+        else:
+            look = ("list-remove-symbolic", "neutral-icon", "No Data")
+        self._set_indicator('data', self.data_icon, look)
+        
+        if mlat == "warning":
+            look = ("dialog-warning-symbolic", "warning-icon", "MLAT Degraded")
+        elif mlat == "error":
+            look = ("process-stop-symbolic", "error-icon", "MLAT Down")
+        elif mlat:
+            look = ("list-add-symbolic", "success-icon", "MLAT Active")
+        else:
+            look = ("list-remove-symbolic", "neutral-icon", "MLAT Not Available")
+        self._set_indicator('mlat', self.mlat_icon, look)
+    
+    def _set_indicator(self, key, icon, look):
+        """Apply an (icon name, css class, tooltip) look to an indicator if it differs"""
+        current = self._looks.get(key)
+        if current == look:
+            return
+        
+        icon_name, css_class, tooltip = look
+        if current is None or current[0] != icon_name:
+            icon.set_from_icon_name(icon_name)
+        if current is None or current[1] != css_class:
+            if current is not None:
+                icon.remove_css_class(current[1])
+            icon.add_css_class(css_class)
+        if current is None or current[2] != tooltip:
+            icon.set_tooltip_text(tooltip)
+        self._looks[key] = look
+
+
+class Sparkline(Gtk.DrawingArea):
+    """A small line chart of the recent history of a MetricSeries"""
+    def __init__(self, series, window=SPARKLINE_WINDOW):
+        super().__init__()
+        self.series = series
+        self.window = window
+        self.set_content_height(32)
+        self.set_hexpand(True)
+        self.set_draw_func(self._draw)
+    
+    def _draw(self, area, cr, width, height):
+        samples = self.series.window(self.window)
+        if len(samples) < 2 or width < 2:
+            return
+        
+        # At most one point per pixel column
+        step = max(1, len(samples) // width)
+        samples = samples[::step]
+        
+        values = [value for timestamp, value in samples]
+        low, high = min(values), max(values)
+        span = (high - low) or 1.0
+        t0 = samples[0][0]
+        t_span = (samples[-1][0] - t0) or 1.0
+        
+        def point(sample):
+            x = (sample[0] - t0) / t_span * (width - 1)
+            y = height - 2 - (sample[1] - low) / span * (height - 4)
+            return x, y
+        
+        cr.move_to(*point(samples[0]))
+        for sample in samples[1:]:
+            cr.line_to(*point(sample))
+        cr.set_source_rgba(0.6, 0.757, 0.945, 1.0)
+        cr.set_line_width(1.5)
+        cr.stroke_preserve()
+        
+        cr.line_to(width - 1, height)
+        cr.line_to(0, height)
+        cr.close_path()
+        cr.set_source_rgba(0.6, 0.757, 0.945, 0.2)
+        cr.fill()
+
+
+class StatCard(Gtk.Box):
+    """A card displaying a statistic"""
+    def __init__(self, title, value, subtitle="", icon_name=None, series=None):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=4)
+        self.add_css_class("card")
+        self.add_css_class("stat-card")
+        self.set_margin_start(6)
+        self.set_margin_end(6)
+        self.set_margin_top(6)
+        self.set_margin_bottom(6)
+        
+        inner_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=4)
+        inner_box.set_margin_start(16)
+        inner_box.set_margin_end(16)
+        inner_box.set_margin_top(12)
+        inner_box.set_margin_bottom(12)
+        self.append(inner_box)
+        
+        # Header with icon
+        header_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        inner_box.append(header_box)
+        
+        if icon_name:
+            icon = Gtk.Image(icon_name=icon_name)
+            icon.add_css_class("dim-label")
+            header_box.append(icon)
+        
+        title_label = Gtk.Label(label=title)
+        title_label.add_css_class("dim-label")
+        title_label.add_css_class("caption")
+        title_label.set_halign(Gtk.Align.START)
+        header_box.append(title_label)
+        
+        # Value
+        self.value_label = Gtk.Label(label=value)
+        self.value_label.add_css_class("title-1")
+        self.value_label.set_halign(Gtk.Align.START)
+        inner_box.append(self.value_label)
+        
+        # Subtitle
+        if subtitle:
+            self.subtitle_label = Gtk.Label(label=subtitle)
+            self.subtitle_label.add_css_class("dim-label")
+            self.subtitle_label.add_css_class("caption")
+            self.subtitle_label.set_halign(Gtk.Align.START)
+            inner_box.append(self.subtitle_label)
+        else:
+            self.subtitle_label = None
+        
+        # Trend of recent values
+        self.series = series
+        if series is not None:
+            self.sparkline = Sparkline(series)
+            self.sparkline.set_margin_top(4)
+            inner_box.append(self.sparkline)
+        else:
+            self.sparkline = None
+    
+    def update(self, value, subtitle=None):
+        set_text(self.value_label, str(value))
+        if subtitle and self.subtitle_label:
+            set_text(self.subtitle_label, subtitle)
+    
+    def add_sample(self, timestamp, value):
+        """Record a numeric value in the card's history"""
+        if self.series is None:
+            return
+        try:
+            self.series.add(timestamp, float(value))
+        except (TypeError, ValueError):
+            return
+        self.sparkline.queue_draw()
+
+
+class CoveragePlot(Gtk.DrawingArea):
+    """Polar plot of a CoverageMap: today's range per altitude band, over the best ever"""
+    def __init__(self, coverage):
+        super().__init__()
+        self.coverage = coverage
+        self.set_content_height(160)
+        self.set_hexpand(True)
+        self.set_draw_func(self._draw)
+    
+    def _draw(self, area, cr, width, height):
+        best = [max(ranges) for ranges in zip(*(self.coverage.ranges(band, 'best')
+                                                for band in range(COVERAGE_BANDS)))]
+        outer = max(best)
+        if not outer:
+            return
+        # Range rings every 50 km, or 100 km for large coverage
+        ring_step = 50 if outer <= 250 else 100
+        outer = ring_step * math.ceil(outer / ring_step)
+        cx, cy = width / 2, height / 2
+        scale = (min(width, height) / 2 - 2) / outer
+        
+        def outline(ranges):
+            for sector, distance in enumerate(ranges):
+                # Bearings run clockwise from north
+                angle = math.radians(sector * 360 / COVERAGE_SECTORS) - math.pi / 2
+                x = cx + math.cos(angle) * distance * scale
+                y = cy + math.sin(angle) * distance * scale
+                if sector:
+                    cr.line_to(x, y)
+                else:
+                    cr.move_to(x, y)
+            cr.close_path()
+        
+        cr.set_line_width(1)
+        cr.set_source_rgba(0.604, 0.6, 0.588, 0.4)
+        for ring in range(ring_step, int(outer) + 1, ring_step):
+            cr.new_sub_path()
+            cr.arc(cx, cy, ring * scale, 0, 2 * math.pi)
+        cr.stroke()
+        
+        # Higher bands reach farther, so they go underneath
+        for band in reversed(range(COVERAGE_BANDS)):
+            red, green, blue = COVERAGE_COLORS[band % len(COVERAGE_COLORS)]
+            outline(self.coverage.ranges(band))
+            cr.set_source_rgba(red, green, blue, 0.45)
+            cr.fill()
+        
+        outline(best)
+        cr.set_source_rgba(0.604, 0.6, 0.588, 0.9)
+        cr.stroke()
+
+
+class CoverageCard(Gtk.Box):
+    """A card with the receiver's coverage, today against the best ever seen"""
+    def __init__(self, coverage):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=4)
+        self.coverage = coverage
+        self.add_css_class("card")
+        self.add_css_class("stat-card")
+        self.set_margin_start(6)
+        self.set_margin_end(6)
+        self.set_margin_top(6)
+        self.set_margin_bottom(6)
+        
+        inner_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=4)
+        inner_box.set_margin_start(16)
+        inner_box.set_margin_end(16)
+        inner_box.set_margin_top(12)
+        inner_box.set_margin_bottom(12)
+        self.append(inner_box)
+        
+        header_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        inner_box.append(header_box)
+        
+        icon = Gtk.Image(icon_name="network-wireless-symbolic")
+        icon.add_css_class("dim-label")
+        header_box.append(icon)
+        
+        title_label = Gtk.Label(label="Coverage")
+        title_label.add_css_class("dim-label")
+        title_label.add_css_class("caption")
+        title_label.set_halign(Gtk.Align.START)
+        header_box.append(title_label)
+        
+        self.value_label = Gtk.Label(label="—")
+        self.value_label.add_css_class("title-1")
+        self.value_label.set_halign(Gtk.Align.START)
+        inner_box.append(self.value_label)
+        
+        self.subtitle_label = Gtk.Label(label="max range today")
+        self.subtitle_label.add_css_class("dim-label")
+        self.subtitle_label.add_css_class("caption")
+        self.subtitle_label.set_halign(Gtk.Align.START)
+        inner_box.append(self.subtitle_label)
+        
+        self.plot = CoveragePlot(coverage)
+        self.plot.set_margin_top(4)
+        edges = ", ".join(f"{edge // 1000}k" for edge in COVERAGE_BAND_EDGES)
+        self.plot.set_tooltip_text(f"Range per bearing, split at {edges} ft; outline: best ever")
+        inner_box.append(self.plot)
+        self.update()
+    
+    def update(self):
+        today = self.coverage.max_range()
+        best = self.coverage.max_range('best')
+        if best:
+            set_text(self.value_label, f"{today:.0f} km")
+            set_text(self.subtitle_label, f"max range today · best {best:.0f} km")
+        else:
+            set_text(self.value_label, "—")
+            set_text(self.subtitle_label, "max range today")
+        self.plot.queue_draw()
+
+
+def _format_duration(seconds):
+    if seconds == float('inf'):
+        return "slower"
+    if seconds < 1:
+        return f"{seconds * 1000:g} ms"
+    return f"{seconds:g} s"
+
+
+def _format_quantiles(histogram):
+    """Median and 90th percentile of a diagnostics Histogram, to bucket precision"""
+    return (f"median ≤ {_format_duration(histogram.quantile(0.5))} · "
+            f"90% ≤ {_format_duration(histogram.quantile(0.9))}")
+
+
+class DiagnosticsPage(Adw.PreferencesPage):
+    """Settings page with the request latency and failures of a poller
+    
+    Updated every DIAGNOSTICS_UPDATE_INTERVAL seconds while it is shown.
+    """
+    def __init__(self, poller):
+        super().__init__()
+        self.poller = poller
+        self.set_title("Diagnostics")
+        self.set_icon_name("utilities-system-monitor-symbolic")
+        self._rows = {}
+        self._timer = None
+        
+        refresh_group = Adw.PreferencesGroup()
+        refresh_group.set_title("Refreshes")
+        self.add(refresh_group)
+        
+        self.cycle_row = Adw.ActionRow()
+        self.cycle_row.set_title("Refresh Duration")
+        refresh_group.add(self.cycle_row)
+        
+        self.endpoint_group = Adw.PreferencesGroup()
+        self.endpoint_group.set_title("Requests")
+        self.endpoint_group.set_description("Per endpoint since the monitor started")
+        copy_button = Gtk.Button(icon_name="edit-copy-symbolic")
+        copy_button.set_tooltip_text("Copy as JSON")
+        copy_button.set_valign(Gtk.Align.CENTER)
+        copy_button.add_css_class("flat")
+        copy_button.connect("clicked", self.on_copy_clicked)
+        self.endpoint_group.set_header_suffix(copy_button)
+        self.add(self.endpoint_group)
+        
+        self.connect("map", self.on_map)
+        self.connect("unmap", self.on_unmap)
+        self.update()
+    
+    def on_map(self, widget):
+        self.update()
+        if self._timer is None:
+            self._timer = GLib.timeout_add_seconds(DIAGNOSTICS_UPDATE_INTERVAL, self._on_timer)
+    
+    def on_unmap(self, widget):
+        if self._timer is not None:
+            GLib.source_remove(self._timer)
+            self._timer = None
+    
+    def _on_timer(self):
+        self.update()
+        return GLib.SOURCE_CONTINUE
+    
+    def on_copy_clicked(self, button):
+        snapshot = self.poller.diagnostics.snapshot()
+        self.get_clipboard().set(json.dumps({self.poller.feeder_url: snapshot}, indent=1))
+        root = self.get_root()
+        if isinstance(root, Adw.PreferencesWindow):
+            root.add_toast(Adw.Toast.new("Diagnostics copied"))
+    
+    def update(self):
+        diagnostics = self.poller.diagnostics
+        cycles = diagnostics.cycles
+        if cycles.count:
+            self.cycle_row.set_subtitle(f"{cycles.count} refreshes · {_format_quantiles(cycles)}")
+        else:
+            self.cycle_row.set_subtitle("No refreshes yet")
+        
+        for endpoint, stats in diagnostics.endpoint_stats():
+            row = self._rows.get(endpoint)
+            if row is None:
+                row = Adw.ActionRow()
+                row.set_title(endpoint)
+                row.errors_label = Gtk.Label()
+                row.errors_label.set_valign(Gtk.Align.CENTER)
+                row.add_suffix(row.errors_label)
+                self.endpoint_group.add(row)
+                self._rows[endpoint] = row
+            
+            size = f"{stats.bytes / 1024:.0f} KiB"
+            if stats.wire_bytes != stats.bytes:
+                size += f" ({stats.wire_bytes / 1024:.0f} KiB compressed)"
+            row.set_subtitle(f"{stats.requests} requests · {_format_quantiles(stats.latency)} · {size}")
+            errors = ", ".join(f"{stats.errors[error_class]} × {title}"
+                               for error_class, title in ERROR_CLASSES.items() if error_class in stats.errors)
+            row.errors_label.set_text(errors or "No errors")
+            if errors:
+                row.errors_label.remove_css_class("dim-label")
+                row.errors_label.add_css_class("error")
+            else:
+                row.errors_label.remove_css_class("error")
+                row.errors_label.add_css_class("dim-label")
+            if stats.last_error is not None:
+                when, error_class, message = stats.last_error
+                row.set_tooltip_text(f"Last error at {datetime.fromtimestamp(when):%H:%M:%S}: {message}")
+            else:
+                row.set_tooltip_text(None)
+
+
+def _format_altitude(ac):
+    if ac.altitude == 'ground':
+        return "Ground"
+    return f"{ac.altitude:,} ft" if ac.altitude is not None else ""
+
+
+def _altitude_key(ac):
+    return -1 if ac.altitude == 'ground' else ac.altitude
+
+
+def _format_position(ac):
+    if ac.lat is None or ac.lon is None:
+        return ""
+    return f"{ac.lat:.4f}, {ac.lon:.4f}"
+
+
+def _info(index):
+    """Text of one field of an aircraft's database entry, as cell text and sort key"""
+    def value(ac):
+        return ac.info[index] if ac.info is not None else None
+    return (lambda ac: value(ac) or ""), value
+
+
+def _unit(attr, suffix):
+    def format_value(ac):
+        value = getattr(ac, attr)
+        return f"{value}{suffix}" if value is not None else ""
+    return format_value
+
+
+# (title, text of a cell, sort key, right-aligned)
+AIRCRAFT_COLUMNS = [
+    ("ICAO", lambda ac: ac.hex.upper(), lambda ac: ac.hex, False),
+    ("Callsign", lambda ac: ac.flight or "", lambda ac: ac.flight, False),
+    ("Registration", *_info(0), False),
+    ("Type", *_info(1), False),
+    ("Squawk", lambda ac: ac.squawk or "", lambda ac: ac.squawk, False),
+    ("Altitude", _format_altitude, _altitude_key, True),
+    ("Speed", _unit('speed', " kt"), lambda ac: ac.speed, True),
+    ("Track", _unit('track', "°"), lambda ac: ac.track, True),
+    ("V/S", _unit('vert_rate', " ft/min"), lambda ac: ac.vert_rate, True),
+    ("Position", _format_position, lambda ac: ac.lat, False),
+    ("RSSI", _unit('rssi', " dBFS"), lambda ac: ac.rssi, True),
+    ("Operator", *_info(2), False),
+]
+
+
+def _runs(positions):
+    """Group sorted positions into (start, count) runs of consecutive values"""
+    runs = []
+    for position in positions:
+        if runs and runs[-1][0] + runs[-1][1] == position:
+            runs[-1][1] += 1
+        else:
+            runs.append([position, 1])
+    return runs
+
+
+class AircraftItem(GObject.Object):
+    """List model item for one Aircraft record"""
+    def __init__(self, record):
+        super().__init__()
+        self.record = record
+
+
+class AircraftListModel(GObject.Object, Gio.ListModel):
+    """Gio.ListModel over an AircraftStore
+    
+    New aircraft are appended and departed ones removed. An aircraft whose
+    shown values changed gets a new item, reported with items-changed for
+    its position alone, so the view only rebinds the rows that need it:
+    list items are not rebound to the object they already show.
+    """
+    def __init__(self, database=None):
+        super().__init__()
+        self.store = AircraftStore(database)
+        self._items = []
+        self._positions = {}
+    
+    def do_get_item_type(self):
+        return AircraftItem.__gtype__
+    
+    def do_get_n_items(self):
+        return len(self._items)
+    
+    def do_get_item(self, position):
+        if position < len(self._items):
+            return self._items[position]
+        return None
+    
+    def update(self, rows):
+        """Apply rows parsed by parse_aircraft_json()"""
+        added, changed, removed = self.store.update(rows)
+        
+        # Changes first, while the positions are still current
+        positions = sorted(self._positions[hex_id] for hex_id in changed)
+        for position in positions:
+            self._items[position] = AircraftItem(self._items[position].record)
+        for start, count in _runs(positions):
+            self.items_changed(start, count, count)
+        
+        if removed:
+            self._remove(removed)
+        
+        if added:
+            start = len(self._items)
+            for hex_id in added:
+                self._positions[hex_id] = len(self._items)
+                self._items.append(AircraftItem(self.store.records[hex_id]))
+            self.items_changed(start, 0, len(added))
+    
+    def clear(self):
+        self.store.clear()
+        count = len(self._items)
+        self._items = []
+        self._positions = {}
+        if count:
+            self.items_changed(0, count, 0)
+    
+    def _remove(self, removed):
+        positions = sorted(self._positions.pop(hex_id) for hex_id in removed)
+        # Back to front, so earlier runs keep their positions
+        for start, count in reversed(_runs(positions)):
+            del self._items[start:start + count]
+            self.items_changed(start, count, 0)
+        for index in range(positions[0], len(self._items)):
+            self._positions[self._items[index].record.hex] = index
+    
+    def with_position(self):
+        return sum(1 for item in self._items if item.record.lat is not None)
+
+
+class AircraftTable(Gtk.Box):
+    """Sortable, virtualized table of the aircraft a feeder currently sees"""
+    def __init__(self):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+        
+        # Registrations and types, if an aircraft database has been built
+        self.model = AircraftListModel(AircraftDatabase())
+        
+        self.summary_label = Gtk.Label(label="Waiting for aircraft…")
+        self.summary_label.add_css_class("dim-label")
+        self.summary_label.set_halign(Gtk.Align.START)
+        self.summary_label.set_margin_start(12)
+        self.summary_label.set_margin_top(8)
+        self.summary_label.set_margin_bottom(8)
+        self.append(self.summary_label)
+        
+        column_view = Gtk.ColumnView()
+        column_view.add_css_class("data-table")
+        for title, format_cell, sort_key, numeric in AIRCRAFT_COLUMNS:
+            factory = Gtk.SignalListItemFactory()
+            factory.connect("setup", self._on_cell_setup, numeric)
+            factory.connect("bind", self._on_cell_bind, format_cell)
+            column = Gtk.ColumnViewColumn(title=title, factory=factory)
+            column.set_sorter(Gtk.CustomSorter.new(self._compare, sort_key))
+            column.set_expand(title == "Position")
+            column_view.append_column(column)
+        
+        # Only the rows on screen get widgets
+        sorted_model = Gtk.SortListModel(model=self.model, sorter=column_view.get_sorter())
+        column_view.set_model(Gtk.NoSelection(model=sorted_model))
+        
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_vexpand(True)
+        scrolled.set_child(column_view)
+        self.append(scrolled)
+    
+    def update(self, rows):
+        self.model.update(rows)
+        count = len(self.model.store)
+        set_text(self.summary_label, f"{count} aircraft, {self.model.with_position()} with position")
+    
+    def clear(self):
+        self.model.clear()
+        self.summary_label.set_text("Waiting for aircraft…")
+    
+    @staticmethod
+    def _on_cell_setup(factory, cell, numeric):
+        label = Gtk.Label()
+        label.set_xalign(1 if numeric else 0)
+        if numeric:
+            label.add_css_class("numeric")
+        cell.set_child(label)
+    
+    @staticmethod
+    def _on_cell_bind(factory, cell, format_cell):
+        cell.get_child().set_text(format_cell(cell.get_item().record))
+    
+    @staticmethod
+    def _compare(a, b, sort_key):
+        # Missing values sort last
+        a, b = sort_key(a.record), sort_key(b.record)
+        if a is None or b is None:
+            return (a is None) - (b is None)
+        return (a > b) - (a < b)
+
+
+class ADSBMonitorWindow(Adw.ApplicationWindow):
+    def __init__(self, *args, feeder_url=DEFAULT_URL, engine=None, poller=None, owns_engine=False,
+                 beast=None, profile=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        
+        self.set_title("ADS-B Feeder Monitor")
+        self.set_default_size(900, 700)
+        
+        # Without an engine the window polls its feeder itself. It can also be
+        # handed one that is already polling the feeder: started early by
+        # main() (owns_engine) or shared with the fleet window
+        self.owns_engine = owns_engine or engine is None
+        if engine is None:
+            engine = PollingEngine(max_workers=DEFAULT_MAX_CONCURRENT_REQUESTS)
+            poller = FeederPoller(feeder_url, AggregatorDiscovery(), HistoryStore(),
+                                  coverage=CoverageMap(feeder_url), unique=UniqueAircraft(feeder_url))
+            engine.add(poller, DEFAULT_REFRESH_INTERVAL, mode=DEFAULT_UPDATE_MODE)
+        self.max_concurrent_requests = poller.max_concurrency
+        self.refresh_interval = int(engine.get_interval(poller) * 1000)
+        self.engine = engine
+        self.poller = poller
+        self.feeder_url = poller.feeder_url
+        self.history = poller.history
+        self.profile = profile
+        # BeastClient counting the feeder's messages live, if any
+        self.beast = beast
+        
+        # Refreshes are numbered so late results can be recognised
+        self._applied_seq = 0
+        # The latest result not shown yet, and the frame clock callback
+        # that will show it
+        self._pending_result = None
+        self._tick_id = None
+        # 'visible', 'unfocused' or 'hidden'; polling slows down in the background
+        self._visibility = 'visible'
+        
+        # Create main layout
+        self.main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        self.set_content(self.main_box)
+        
+        # Create header bar
+        self.header = Adw.HeaderBar()
+        self.main_box.append(self.header)
+        
+        # Overview and aircraft pages
+        self.view_stack = Adw.ViewStack()
+        self.view_stack.set_vexpand(True)
+        view_switcher = Adw.ViewSwitcher(stack=self.view_stack, policy=Adw.ViewSwitcherPolicy.WIDE)
+        self.header.set_title_widget(view_switcher)
+        
+        # Refresh button
+        self.refresh_btn = Gtk.Button(icon_name="view-refresh-symbolic")
+        self.refresh_btn.set_tooltip_text("Refresh Now")
+        self.refresh_btn.connect("clicked", self.on_refresh_clicked)
+        self.header.pack_start(self.refresh_btn)
+        
+        # Open in browser button
+        browser_btn = Gtk.Button(icon_name="globe-symbolic")
+        browser_btn.set_tooltip_text("Open in Browser")
+        browser_btn.connect("clicked", self.on_open_browser)
+        self.header.pack_start(browser_btn)
+        
+        # Menu button
+        menu_btn = Gtk.MenuButton(icon_name="open-menu-symbolic")
+        menu_btn.set_tooltip_text("Menu")
+        menu = Gio.Menu()
+        menu.append("Settings", "win.settings")
+        menu.append("About", "win.about")
+        menu_btn.set_menu_model(menu)
+        self.header.pack_end(menu_btn)
+        
+        # Loading spinner
+        self.spinner = Gtk.Spinner()
+        self.header.pack_end(self.spinner)
+        
+        # Create scrolled content
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_vexpand(True)
+        scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        self.view_stack.add_titled_with_icon(scrolled, "overview", "Overview", "utilities-system-monitor-symbolic")
+        self.main_box.append(self.view_stack)
+        
+        # The aircraft table is built the first time its page is shown
+        self.aircraft_page = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        self.aircraft_table = None
+        self.view_stack.add_titled_with_icon(self.aircraft_page, "aircraft", "Aircraft", "airplane-mode-symbolic")
+        self.view_stack.connect("notify::visible-child-name", self.on_page_changed)
+        
+        # Content box
+        content_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+        content_box.set_margin_start(24)
+        content_box.set_margin_end(24)
+        content_box.set_margin_top(12)
+        content_box.set_margin_bottom(24)
+        scrolled.set_child(content_box)
+        self.content_box = content_box
+        
+        # Connection status banner
+        self.status_banner = Adw.Banner()
+        self.status_banner.set_title("Connecting to ADS-B Feeder...")
+        self.status_banner.set_button_label("Retry")
+        self.status_banner.connect("button-clicked", self.on_refresh_clicked)
+        content_box.append(self.status_banner)
+        
+        # Feeder name header
+        self.feeder_name_label = Gtk.Label(label="ADS-B Feeder")
+        self.feeder_name_label.add_css_class("title-1")
+        self.feeder_name_label.set_halign(Gtk.Align.START)
+        self.feeder_name_label.set_margin_top(12)
+        self.feeder_name_label.set_margin_bottom(6)
+        content_box.append(self.feeder_name_label)
+        
+        # Stats cards row
+        stats_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=0)
+        stats_box.set_homogeneous(True)
+        stats_box.set_margin_top(12)
+        stats_box.set_margin_bottom(12)
+        content_box.append(stats_box)
+        
+        # In-memory history of the trending stats
+        self.metric_series = {
+            'planes': MetricSeries(),
+            'mps': MetricSeries(),
+            'pps': MetricSeries(),
+        }
+        
+        self.planes_card = StatCard("Aircraft Now", "—", "tracking", "airplane-mode-symbolic",
+                                    series=self.metric_series['planes'])
+        stats_box.append(self.planes_card)
+        
+        self.planes_today_card = StatCard("Aircraft Today", "—", "total seen", "view-list-symbolic")
+        stats_box.append(self.planes_today_card)
+        
+        self.msg_rate_card = StatCard("Message Rate", "—", "msg/sec", "network-transmit-symbolic",
+                                      series=self.metric_series['mps'])
+        stats_box.append(self.msg_rate_card)
+        
+        self.pos_rate_card = StatCard("Position Rate", "—", "pos/sec", "find-location-symbolic",
+                                      series=self.metric_series['pps'])
+        stats_box.append(self.pos_rate_card)
+        
+        # System stats row - only show what we can get from the API
+        sys_stats_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=0)
+        sys_stats_box.set_homogeneous(True)
+        sys_stats_box.set_margin_bottom(24)
+        content_box.append(sys_stats_box)
+        
+        self.temp_card = StatCard("Temperature", "—", "", "weather-clear-symbolic")
+        sys_stats_box.append(self.temp_card)
+        
+        self.uptime_card = StatCard("Uptime", "—", "", "preferences-system-time-symbolic")
+        sys_stats_box.append(self.uptime_card)
+        
+        # Only feeders polled with a coverage map have one to show
+        if poller.coverage is not None:
+            self.coverage_card = CoverageCard(poller.coverage)
+            sys_stats_box.append(self.coverage_card)
+        else:
+            self.coverage_card = None
+        
+        # Signal levels and the live message rate from the Beast stream
+        if beast is not None:
+            self.signal_card = StatCard("Signal", "—", "connecting", "network-cellular-signal-good-symbolic")
+            sys_stats_box.append(self.signal_card)
+            GLib.timeout_add_seconds(1, self._update_beast)
+        else:
+            self.signal_card = None
+        
+        # Aggregators section, built when the first aggregator shows up
+        self.aggregators_frame = None
+        # AggregatorRow widgets currently shown, keyed by aggregator
+        self.aggregator_rows = {}
+        
+        # Status bar
+        status_bar = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
+        status_bar.set_margin_start(12)
+        status_bar.set_margin_end(12)
+        status_bar.set_margin_top(12)
+        status_bar.set_margin_bottom(6)
+        self.main_box.append(status_bar)
+        
+        self.connection_label = Gtk.Label(label="Connecting...")
+        self.connection_label.add_css_class("dim-label")
+        self.connection_label.set_halign(Gtk.Align.START)
+        self.connection_label.set_hexpand(True)
+        status_bar.append(self.connection_label)
+        
+        self.last_update_label = Gtk.Label(label="")
+        self.last_update_label.add_css_class("dim-label")
+        status_bar.append(self.last_update_label)
+        
+        # Setup actions
+        self.setup_actions()
+        
+        # Apply CSS
+        self.apply_css()
+        
+        # Closing the window flushes the history database
+        self.connect("close-request", self.on_close_request)
+        
+        # Polling slows down while the window is in the background
+        self._watch_visibility()
+        
+        # Stored history for the sparklines
+        thread = threading.Thread(target=self._load_history_thread, args=(self.feeder_url,))
+        thread.daemon = True
+        thread.start()
+        
+        if profile is not None:
+            track_first_frame(self, profile)
+            profile.mark("window built")
+        
+        # Show the first refresh as soon as it is in; it is already running
+        # when main() started the engine
+        self.start_refresh()
+    
+    def _build_aggregators_section(self):
+        """Create the aggregator list, which stays out of the first frame"""
+        agg_header = Gtk.Label(label="Feeding Status")
+        agg_header.add_css_class("title-2")
+        agg_header.set_halign(Gtk.Align.START)
+        agg_header.set_margin_top(12)
+        agg_header.set_margin_bottom(12)
+        self.content_box.append(agg_header)
+        
+        # Aggregators list container
+        self.aggregators_frame = Gtk.Frame()
+        self.aggregators_frame.add_css_class("card")
+        self.content_box.append(self.aggregators_frame)
+        
+        self.aggregators_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+        self.aggregators_frame.set_child(self.aggregators_box)
+        
+        # Column headers for aggregators
+        header_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
+        header_row.set_margin_start(12)
+        header_row.set_margin_end(12)
+        header_row.set_margin_top(12)
+        header_row.set_margin_bottom(8)
+        header_row.add_css_class("dim-label")
+        self.aggregators_box.append(header_row)
+        
+        name_header = Gtk.Label(label="Aggregator")
+        name_header.set_halign(Gtk.Align.START)
+        name_header.set_hexpand(True)
+        name_header.set_width_chars(20)
+        header_row.append(name_header)
+        
+        enabled_header = Gtk.Label(label="Enabled")
+        header_row.append(enabled_header)
+        
+        data_header = Gtk.Label(label="Data")
+        data_header.set_margin_start(24)
+        header_row.append(data_header)
+        
+        mlat_header = Gtk.Label(label="MLAT")
+        mlat_header.set_margin_start(24)
+        header_row.append(mlat_header)
+        
+        status_header = Gtk.Label(label="Link")
+        status_header.set_margin_start(24)
+        header_row.append(status_header)
+        
+        # Separator
+        separator = Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL)
+        self.aggregators_box.append(separator)
+        
+        # Placeholder for aggregator rows
+        self.aggregator_rows_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+        self.aggregators_box.append(self.aggregator_rows_box)
+    
+    def setup_actions(self):
+        """Setup window actions"""
+        settings_action = Gio.SimpleAction.new("settings", None)
+        settings_action.connect("activate", self.on_settings_clicked)
+        self.add_action(settings_action)
+        
+        about_action = Gio.SimpleAction.new("about", None)
+        about_action.connect("activate", self.on_about)
+        self.add_action(about_action)
+    
+    def apply_css(self):
+        """Apply custom CSS styling"""
+        load_css(self.get_display())
+    
+    def _load_history_thread(self, feeder_url):
+        """Background thread to read stored history"""
+        if self.history is None:
+            return
+        try:
+            history = self.history.load(feeder_url, list(self.metric_series))
+        except sqlite3.Error:
+            return
+        GLib.idle_add(self._apply_history, feeder_url, history)
+    
+    def _apply_history(self, feeder_url, history):
+        """Prefill the in-memory series with stored history (called on main thread)"""
+        if feeder_url != self.feeder_url:
+            return False
+        for name, (raw, minutes) in history.items():
+            self.metric_series[name].load(raw, minutes)
+        for card in (self.planes_card, self.msg_rate_card, self.pos_rate_card):
+            card.sparkline.queue_draw()
+        return False
+    
+    def on_close_request(self, window):
+        """Stop polling and write outstanding history before the window goes away"""
+        self.engine.unsubscribe(self.poller, self._on_poll_result, self._on_poll_start)
+        self.poller.track_aircraft = False
+        self.poller.hidden = False
+        if self.owns_engine:
+            self.engine.shutdown()
+            if self.history is not None:
+                self.history.close()
+            if self.poller.coverage is not None:
+                self.poller.coverage.save()
+            if self.poller.unique is not None:
+                self.poller.unique.close()
+        if self.beast is not None:
+            self.beast.stop()
+            self.beast = None
+        return False
+    
+    def _watch_visibility(self):
+        """Follow focus, minimizing and the screen lock"""
+        self.connect("notify::is-active", self.on_visibility_changed)
+        self.connect("realize", self.on_realize)
+        application = self.get_application()
+        if application is not None and application.find_property("screensaver-active") is not None:
+            application.connect("notify::screensaver-active", self.on_visibility_changed)
+    
+    def on_realize(self, widget):
+        self.get_surface().connect("notify::state", self.on_visibility_changed)
+    
+    def _current_visibility(self):
+        surface = self.get_surface()
+        if surface is not None:
+            # SUSPENDED (GTK 4.12) covers other workspaces and fully covered windows
+            hidden = Gdk.ToplevelState.MINIMIZED | getattr(Gdk.ToplevelState, 'SUSPENDED', 0)
+            if surface.get_state() & hidden:
+                return 'hidden'
+        application = self.get_application()
+        if application is not None and application.find_property("screensaver-active") is not None:
+            if application.get_property("screensaver-active"):
+                return 'hidden'
+        return 'visible' if self.is_active() else 'unfocused'
+    
+    def on_visibility_changed(self, *args):
+        """Slow polling down in the background and catch up on coming back"""
+        visibility = self._current_visibility()
+        if visibility == self._visibility:
+            return
+        levels = ['hidden', 'unfocused', 'visible']
+        coming_back = levels.index(visibility) > levels.index(self._visibility)
+        self._visibility = visibility
+        self._apply_interval()
+        self.poller.hidden = visibility == 'hidden'
+        self.poller.track_aircraft = (visibility != 'hidden'
+                                      and self.view_stack.get_visible_child_name() == "aircraft")
+        if coming_back:
+            self.fetch_data()
+    
+    def _apply_interval(self):
+        """Poll at the configured interval, stretched while the window is in the background"""
+        interval = self.refresh_interval / 1000
+        if self._visibility == 'unfocused':
+            interval *= UNFOCUSED_INTERVAL_FACTOR
+        elif self._visibility == 'hidden':
+            interval = max(interval, HIDDEN_REFRESH_INTERVAL)
+        # A fleet engine's feeders are polled for the fleet window too
+        if self.owns_engine:
+            self.engine.set_interval(self.poller, interval)
+    
+    def _update_beast(self):
+        """Show the live message rate and signal levels, once a second"""
+        if self.beast is None:
+            return False
+        if self._visibility == 'hidden':
+            return True
+        if not self.beast.connected:
+            self.signal_card.update("—", self.beast.error or "connecting")
+            return True
+        
+        stats = self.beast.stats.snapshot()
+        self.msg_rate_card.update(f"{stats['rate']:.0f}", "msg/sec · live")
+        self.msg_rate_card.set_tooltip_text("\n".join(
+            f"DF{df} {DOWNLINK_FORMATS.get(df, '')}: {share:.0%}" if df != MODE_AC
+            else f"Mode A/C: {share:.0%}"
+            for df, share in stats['formats'].items()
+        ) or None)
+        if stats['signal'] is not None:
+            self.signal_card.update(f"{stats['signal']:.1f} dBFS",
+                                    f"peak {stats['peak']:.1f} · {stats['strong']:.1%} strong")
+        return True
+    
+    def start_refresh(self):
+        """Follow the feeder's refreshes, starting with the last result if there is one
+        
+        main() has usually polled the feeder before the window appears, and
+        a fleet window has been polling it all along; only a feeder without
+        a result or a refresh running yet is refreshed right away.
+        """
+        if not self.engine.subscribe(self.poller, self._on_poll_result, self._on_poll_start):
+            self.engine.refresh(self.poller)
+    
+    def fetch_data(self):
+        """Refresh now; coalesced into a refresh that is already running"""
+        self.engine.refresh(self.poller)
+    
+    def _on_poll_start(self, poller, seq):
+        """Called from the polling engine when a refresh starts"""
+        GLib.idle_add(self.spinner.start)
+    
+    def _on_poll_result(self, poller, seq, data, error):
+        """Called from the polling engine with a refresh's result"""
+        GLib.idle_add(self._on_cycle_done, seq, data, error)
+    
+    def _on_cycle_done(self, seq, data, error):
+        """Take in a finished refresh's result (called on main thread)
+        
+        Its samples go into the sparklines' history right away; the widgets
+        are updated on the next frame clock tick, once for however many
+        results came in since the last one. A window that is not shown
+        gets no ticks, so it catches up with the latest result when it is.
+        """
+        if seq <= self._applied_seq:
+            # Overtaken by a newer result
+            self.spinner.stop()
+            return False
+        self._applied_seq = seq
+        self._record_samples(data)
+        self._pending_result = (data, error)
+        if self._tick_id is None:
+            self._tick_id = self.add_tick_callback(self._on_tick)
+        return False
+    
+    def _on_tick(self, widget, frame_clock):
+        self._tick_id = None
+        data, error = self._pending_result
+        self._pending_result = None
+        self._update_ui(data, error)
+        return GLib.SOURCE_REMOVE
+    
+    def _record_samples(self, data):
+        """Add a result's values to the sparklines"""
+        stats = data.get('stage2_stats')
+        if not stats:
+            return
+        sampled_at = data.get('timestamp', time.time())
+        for card, key in ((self.planes_card, 'planes'), (self.msg_rate_card, 'mps'), (self.pos_rate_card, 'pps')):
+            if key in stats:
+                card.add_sample(sampled_at, stats[key])
+    
+    def _update_ui(self, data, error):
+        """Update the UI with fetched data (called on main thread)"""
+        self.spinner.stop()
+        mark_startup(self, self.profile, "first data")
+        
+        if error and not data:
+            self.status_banner.set_title(f"Connection failed: {error}")
+            self.status_banner.set_revealed(True)
+            set_text(self.connection_label, "Disconnected")
+            return
+        
+        # Connected successfully
+        self.status_banner.set_revealed(False)
+        set_text(self.connection_label, f"Connected to {self.feeder_url}")
+        set_text(self.last_update_label, f"Updated: {datetime.now().strftime('%H:%M:%S')}")
+        
+        # Feeder name from the homepage
+        if 'feeder_name' in data:
+            set_text(self.feeder_name_label, f"ADS-B Feeder: {data['feeder_name']}")
+        
+        # Update from stage2_stats API (adsb.im specific)
+        if 'stage2_stats' in data:
+            stats = data['stage2_stats']
+            
+            # Aircraft counts
+            if 'planes' in stats:
+                self.planes_card.update(str(stats['planes']), "tracking")
+            if 'tplanes' in stats:
+                unique = data.get('unique_aircraft')
+                week = unique.get('7d') if unique else None
+                self.planes_today_card.update(str(stats['tplanes']),
+                                              f"{week[0]:,} in 7 days" if week else "total seen")
+            
+            # Message rates
+            if 'mps' in stats:
+                # The Beast stream has the more current rate
+                if self.beast is None or not self.beast.connected:
+                    self.msg_rate_card.update(str(stats['mps']), "msg/sec")
+            if 'pps' in stats:
+                self.pos_rate_card.update(str(stats['pps']), "pos/sec")
+            
+            # Uptime
+            if 'uptime' in stats:
+                uptime_secs = stats['uptime']
+                days = uptime_secs // 86400
+                hours = (uptime_secs % 86400) // 3600
+                mins = (uptime_secs % 3600) // 60
+                if days > 0:
+                    uptime_str = f"{days}d {hours}h"
+                elif hours > 0:
+                    uptime_str = f"{hours}h {mins}m"
+                else:
+                    uptime_str = f"{mins}m"
+                self.uptime_card.update(uptime_str, "")
+        
+        # Update temperature
+        if 'temperatures' in data:
+            temps = data['temperatures']
+            if 'cpu' in temps:
+                self.temp_card.update(f"{temps['cpu']}°C", "")
+        
+        # Update aggregators from API data
+        if 'aggregators' in data:
+            self._update_aggregators_from_api(data['aggregators'])
+        
+        if 'aircraft' in data and self.aircraft_table is not None:
+            self.aircraft_table.update(data['aircraft'])
+        if 'aircraft' in data and self.coverage_card is not None:
+            self.coverage_card.update()
+        
+        # The feeder's own count resets daily; these span any window, but
+        # only cover the time this monitor was running
+        if 'unique_aircraft' in data:
+            unique = data['unique_aircraft']
+            lines = [("Today (UTC)", unique['today'])] + [
+                (title, unique[key]) for key, seconds, title in UNIQUE_WINDOWS if key in unique
+            ]
+            self.planes_today_card.set_tooltip_text("Unique aircraft seen by this monitor\n" + "\n".join(
+                f"{title} (since {datetime.fromtimestamp(start):%a %H:%M}): {count:,}"
+                for title, (count, start) in lines
+            ))
+    
+    def _sync_aggregator_rows(self, entries):
+        """Show (key, name, enabled, data, mlat) entries, reusing existing rows
+        
+        Rows are only created or removed when the set of aggregators changes;
+        otherwise the existing rows are updated in place.
+        """
+        if self.aggregators_frame is None:
+            if not entries:
+                return
+            self._build_aggregators_section()
+        
+        wanted = {entry[0] for entry in entries}
+        for key in list(self.aggregator_rows):
+            if key not in wanted:
+                self.aggregator_rows_box.remove(self.aggregator_rows.pop(key))
+        
+        previous = None
+        for key, name, enabled, data, mlat in entries:
+            row = self.aggregator_rows.get(key)
+            if row is None:
+                row = AggregatorRow(name, enabled, data, mlat)
+                self.aggregator_rows[key] = row
+                self.aggregator_rows_box.insert_child_after(row, previous)
+            else:
+                row.update(name, enabled, data, mlat)
+                if row.get_prev_sibling() is not previous:
+                    self.aggregator_rows_box.reorder_child_after(row, previous)
+            previous = row
+    
+    def _update_aggregators_from_api(self, aggregators):
+        """Update aggregators list from adsb.im API data"""
+        entries = []
+        for agg in aggregators:
+            name = agg.get('name', 'Unknown')
+            enabled, data, mlat = aggregator_indicators(
+                agg.get('beast', 'unknown'),
+                agg.get('mlat', 'unknown'),
+            )
+            entries.append((agg.get('id', name), name, enabled, data, mlat))
+        
+        self._sync_aggregator_rows(entries)
+    
+    def on_refresh_clicked(self, button):
+        """Manual refresh"""
+        self.fetch_data()
+    
+    def on_page_changed(self, stack, param):
+        """Fetch the aircraft list only while its page is shown"""
+        showing = stack.get_visible_child_name() == "aircraft"
+        if showing and self.aircraft_table is None:
+            self.aircraft_table = AircraftTable()
+            self.aircraft_table.set_vexpand(True)
+            self.aircraft_page.append(self.aircraft_table)
+        self.poller.track_aircraft = showing
+        if showing:
+            self.fetch_data()
+    
+    def on_open_browser(self, button):
+        """Open the feeder URL in the default browser"""
+        Gtk.show_uri(self, self.feeder_url, Gdk.CURRENT_TIME)
+    
+    def on_settings_clicked(self, action, param=None):
+        """Show settings dialog"""
+        dialog = Adw.PreferencesWindow(transient_for=self)
+        dialog.set_title("Settings")
+        
+        # General page
+        general_page = Adw.PreferencesPage()
+        general_page.set_title("General")
+        general_page.set_icon_name("emblem-system-symbolic")
+        dialog.add(general_page)
+        
+        # Connection group
+        connection_group = Adw.PreferencesGroup()
+        connection_group.set_title("Connection")
+        general_page.add(connection_group)
+        
+        # URL entry
+        url_row = Adw.EntryRow()
+        url_row.set_title("Feeder URL")
+        url_row.set_text(self.feeder_url)
+        if self.owns_engine:
+            # Switching feeders saves and loads per-feeder state, so only on Enter or apply
+            url_row.set_show_apply_button(True)
+            url_row.connect("apply", self.on_url_applied)
+        else:
+            # The poller is shared with the fleet window; a new URL would redirect its polling
+            url_row.set_editable(False)
+            url_row.set_tooltip_text("Add or remove feeders in the fleet window")
+        connection_group.add(url_row)
+        
+        # Refresh interval
+        refresh_row = Adw.SpinRow.new_with_range(1, 60, 1)
+        refresh_row.set_title("Refresh Interval")
+        refresh_row.set_subtitle("Seconds between updates")
+        refresh_row.set_value(self.refresh_interval / 1000)
+        refresh_row.connect("changed", self.on_refresh_interval_changed)
+        connection_group.add(refresh_row)
+        
+        # Update mode
+        mode_row = Adw.ComboRow()
+        mode_row.set_title("Update Mode")
+        mode_row.set_subtitle("Adaptive refreshes sooner while the feeder's stats change "
+                              "and less often while they do not")
+        mode_row.set_model(Gtk.StringList.new([title for mode, title in UPDATE_MODE_TITLES]))
+        modes = [mode for mode, title in UPDATE_MODE_TITLES]
+        mode_row.set_selected(modes.index(self.engine.get_mode(self.poller)))
+        mode_row.connect("notify::selected", self.on_update_mode_changed)
+        connection_group.add(mode_row)
+        
+        # Parallel requests
+        concurrency_row = Adw.SpinRow.new_with_range(1, len(AGGREGATORS) + 3, 1)
+        concurrency_row.set_title("Parallel Requests")
+        concurrency_row.set_subtitle("Maximum simultaneous requests to the feeder")
+        concurrency_row.set_value(self.max_concurrent_requests)
+        concurrency_row.connect("changed", self.on_concurrency_changed)
+        connection_group.add(concurrency_row)
+        
+        dialog.add(DiagnosticsPage(self.poller))
+        
+        dialog.present()
+    
+    def on_url_applied(self, row):
+        """Switch to the feeder URL entered"""
+        if not self.owns_engine:
+            return
+        url = normalize_feeder_url(row.get_text())
+        if not urllib.parse.urlsplit(url).hostname:
+            row.set_text(self.feeder_url)
+            return
+        row.set_text(url)
+        if url == self.feeder_url:
+            return
+        self.feeder_url = url
+        self.poller.set_feeder_url(self.feeder_url)
+        if self.aircraft_table is not None:
+            self.aircraft_table.clear()
+        if self.coverage_card is not None:
+            self.coverage_card.update()
+        
+        # Results of a refresh already running belong to the old URL
+        self.engine.invalidate(self.poller)
+    
+    def on_refresh_interval_changed(self, row):
+        """Handle refresh interval change"""
+        self.refresh_interval = int(row.get_value() * 1000)
+        
+        # Reschedule; a running refresh picks up the new interval when it completes
+        self._apply_interval()
+    
+    def on_update_mode_changed(self, row, param):
+        mode = UPDATE_MODE_TITLES[row.get_selected()][0]
+        self.engine.set_mode(self.poller, mode)
+    
+    def on_concurrency_changed(self, row):
+        """Handle parallel request limit change"""
+        value = int(row.get_value())
+        if value == self.max_concurrent_requests:
+            return
+        self.max_concurrent_requests = value
+        self.poller.set_max_concurrency(value)
+        
+        # The worker pool of a fleet engine is shared with the other feeders
+        if self.owns_engine:
+            self.engine.set_max_workers(value)
+    
+    def on_about(self, action, param=None):
+        """Show about dialog"""
+        about = Adw.AboutWindow(
+            transient_for=self,
+            application_name="ADS-B Feeder Monitor",
+            application_icon="airplane-mode-symbolic",
+            developer_name="ADS-B Community",
+            version="2.0.0",
+            website="https://github.com/adsb-feeder",
+            issue_url="https://github.com/adsb-feeder/issues",
+            copyright="© 2026 ADS-B Monitor",
+            license_type=Gtk.License.GPL_3_0,
+            developers=["ADS-B Community"],
+            comments="A native desktop application for monitoring your ADS-B feeder.\n\nTrack aircraft in your area with ease!"
+        )
+        about.present()
+
+
+class FleetRow(Gtk.ListBoxRow):
+    """A compact summary row of one feeder in the fleet view"""
+    def __init__(self, poller):
+        super().__init__()
+        self.poller = poller
+        
+        box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
+        box.set_margin_start(12)
+        box.set_margin_end(12)
+        box.set_margin_top(8)
+        box.set_margin_bottom(8)
+        self.set_child(box)
+        
+        # Reachability
+        self.status_icon = Gtk.Image.new_from_icon_name("content-loading-symbolic")
+        self.status_icon.add_css_class("neutral-icon")
+        self._status_class = "neutral-icon"
+        box.append(self.status_icon)
+        
+        # Name and URL
+        name_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=2)
+        name_box.set_hexpand(True)
+        box.append(name_box)
+        
+        self.name_label = Gtk.Label(label=poller.feeder_url)
+        self.name_label.set_halign(Gtk.Align.START)
+        self.name_label.set_ellipsize(Pango.EllipsizeMode.END)
+        name_box.append(self.name_label)
+        
+        self.url_label = Gtk.Label(label=poller.feeder_url)
+        self.url_label.add_css_class("dim-label")
+        self.url_label.add_css_class("caption")
+        self.url_label.set_halign(Gtk.Align.START)
+        self.url_label.set_ellipsize(Pango.EllipsizeMode.END)
+        name_box.append(self.url_label)
+        
+        # Aircraft now
+        self.planes_label = Gtk.Label(label="—")
+        self.planes_label.set_width_chars(8)
+        self.planes_label.set_xalign(1)
+        box.append(self.planes_label)
+        
+        # Message rate
+        self.msg_rate_label = Gtk.Label(label="—")
+        self.msg_rate_label.set_width_chars(10)
+        self.msg_rate_label.set_xalign(1)
+        box.append(self.msg_rate_label)
+        
+        # Aggregator health
+        self.health_label = Gtk.Label(label="—")
+        self.health_label.set_width_chars(8)
+        self.health_label.set_xalign(1)
+        box.append(self.health_label)
+        
+        arrow = Gtk.Image.new_from_icon_name("go-next-symbolic")
+        arrow.add_css_class("dim-label")
+        box.append(arrow)
+        
+        # Numbers used for the fleet totals
+        self.online = False
+        self.planes = 0
+        self.mps = 0.0
+    
+    def update(self, data, error):
+        """Show a refresh result"""
+        self.online = bool(data.get('stage2_stats'))
+        if self.online:
+            self._set_status("network-idle-symbolic", "success-icon", "Online")
+        else:
+            self._set_status("network-offline-symbolic", "error-icon", error or "Unreachable")
+        
+        if 'feeder_name' in data:
+            set_text(self.name_label, data['feeder_name'])
+        
+        stats = data.get('stage2_stats') or {}
+        self.planes = stats.get('planes') or 0
+        self.mps = stats.get('mps') or 0.0
+        set_text(self.planes_label, str(stats['planes']) if 'planes' in stats else "—")
+        set_text(self.msg_rate_label, f"{stats['mps']} msg/s" if 'mps' in stats else "—")
+        
+        if 'aggregators' in data:
+            good, total = aggregator_health(data['aggregators'])
+            set_text(self.health_label, f"{good}/{total}")
+            self.health_label.set_tooltip_text(f"{good} of {total} aggregators fully healthy")
+        else:
+            set_text(self.health_label, "—")
+    
+    def _set_status(self, icon_name, css_class, tooltip):
+        self.status_icon.set_from_icon_name(icon_name)
+        if css_class != self._status_class:
+            self.status_icon.remove_css_class(self._status_class)
+            self.status_icon.add_css_class(css_class)
+            self._status_class = css_class
+        self.status_icon.set_tooltip_text(tooltip)
+
+
+class FleetWindow(Adw.ApplicationWindow):
+    """Summary of many feeders, one row each, polled by a shared engine
+    
+    Activating a row opens the regular per-feeder window for that feeder,
+    fed by the same engine.
+    """
+    def __init__(self, feeder_urls, *args, update_mode=DEFAULT_UPDATE_MODE, exporters=(), profile=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        
+        self.set_title("ADS-B Fleet Monitor")
+        self.set_default_size(900, 700)
+        
+        self.refresh_interval = DEFAULT_REFRESH_INTERVAL * 1000
+        self.profile = profile
+        
+        self.history = HistoryStore()
+        self.engine = PollingEngine(max_workers=FLEET_MAX_CONCURRENCY, jitter=FLEET_JITTER)
+        discovery = AggregatorDiscovery()
+        
+        self.rows = {}
+        self.detail_windows = {}
+        
+        # Create main layout
+        main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        self.set_content(main_box)
+        
+        header = Adw.HeaderBar()
+        main_box.append(header)
+        
+        title_label = Gtk.Label(label="ADS-B Fleet Monitor")
+        title_label.add_css_class("heading")
+        header.set_title_widget(title_label)
+        
+        refresh_btn = Gtk.Button(icon_name="view-refresh-symbolic")
+        refresh_btn.set_tooltip_text("Refresh All Now")
+        refresh_btn.connect("clicked", self.on_refresh_clicked)
+        header.pack_start(refresh_btn)
+        
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_vexpand(True)
+        scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        main_box.append(scrolled)
+        
+        content_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+        content_box.set_margin_start(24)
+        content_box.set_margin_end(24)
+        content_box.set_margin_top(12)
+        content_box.set_margin_bottom(24)
+        scrolled.set_child(content_box)
+        
+        # Fleet totals
+        self.summary_label = Gtk.Label(label=f"{len(feeder_urls)} feeders")
+        self.summary_label.add_css_class("title-2")
+        self.summary_label.set_halign(Gtk.Align.START)
+        self.summary_label.set_margin_top(12)
+        self.summary_label.set_margin_bottom(12)
+        content_box.append(self.summary_label)
+        
+        frame = Gtk.Frame()
+        frame.add_css_class("card")
+        content_box.append(frame)
+        
+        list_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+        frame.set_child(list_box)
+        
+        # Column headers
+        header_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
+        header_row.set_margin_start(12)
+        header_row.set_margin_end(12)
+        header_row.set_margin_top(12)
+        header_row.set_margin_bottom(8)
+        header_row.add_css_class("dim-label")
+        list_box.append(header_row)
+        
+        name_header = Gtk.Label(label="Feeder")
+        name_header.set_halign(Gtk.Align.START)
+        name_header.set_hexpand(True)
+        name_header.set_margin_start(28)
+        header_row.append(name_header)
+        
+        for title, width in (("Aircraft", 8), ("Messages", 10), ("Feeding", 8)):
+            label = Gtk.Label(label=title)
+            label.set_width_chars(width)
+            label.set_xalign(1)
+            header_row.append(label)
+        
+        spacer = Gtk.Image.new_from_icon_name("go-next-symbolic")
+        spacer.set_opacity(0)
+        header_row.append(spacer)
+        
+        list_box.append(Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL))
+        
+        self.feeder_list = Gtk.ListBox()
+        self.feeder_list.set_selection_mode(Gtk.SelectionMode.NONE)
+        self.feeder_list.connect("row-activated", self.on_row_activated)
+        list_box.append(self.feeder_list)
+        
+        # Spread the first refreshes over one interval
+        interval = self.refresh_interval / 1000
+        for feeder_url in feeder_urls:
+            poller = FeederPoller(feeder_url, discovery, self.history,
+                                  max_concurrency=FLEET_PER_FEEDER_CONCURRENCY)
+            row = FleetRow(poller)
+            self.rows[poller] = row
+            self.feeder_list.append(row)
+            self.engine.add(poller, interval, start_delay=random.uniform(0, interval), mode=update_mode)
+            self.engine.subscribe(poller, self._on_poll_result)
+            for exporter in exporters:
+                self.engine.subscribe(poller, exporter.update)
+        
+        self.connect("close-request", self.on_close_request)
+        load_css(self.get_display())
+        
+        if profile is not None:
+            track_first_frame(self, profile)
+            profile.mark("window built")
+    
+    def _on_poll_result(self, poller, seq, data, error):
+        """Called from the polling engine with a refresh's result"""
+        GLib.idle_add(self._apply_result, poller, data, error)
+    
+    def _apply_result(self, poller, data, error):
+        """Update a feeder's row and the fleet totals (called on main thread)"""
+        row = self.rows.get(poller)
+        if row is None:
+            return False
+        row.update(data, error)
+        mark_startup(self, self.profile, "first data")
+        
+        rows = self.rows.values()
+        online = sum(1 for row in rows if row.online)
+        planes = sum(row.planes for row in rows if row.online)
+        mps = sum(row.mps for row in rows if row.online)
+        self.summary_label.set_text(
+            f"{online}/{len(self.rows)} feeders online · {planes} aircraft · {mps:.0f} msg/sec"
+        )
+        return False
+    
+    def on_refresh_clicked(self, button):
+        """Refresh every feeder"""
+        for poller in self.rows:
+            self.engine.refresh(poller)
+    
+    def on_row_activated(self, list_box, row):
+        """Open the per-feeder window for a row"""
+        poller = row.poller
+        window = self.detail_windows.get(poller)
+        if window is None:
+            window = ADSBMonitorWindow(application=self.get_application(),
+                                       engine=self.engine, poller=poller)
+            window.connect("close-request", self.on_detail_closed, poller)
+            self.detail_windows[poller] = window
+        window.present()
+    
+    def on_detail_closed(self, window, poller):
+        self.detail_windows.pop(poller, None)
+        return False
+    
+    def on_close_request(self, window):
+        """Stop polling and write outstanding history"""
+        for detail in list(self.detail_windows.values()):
+            detail.close()
+        self.engine.shutdown()
+        self.history.close()
+        return False
+
+
+class ADSBMonitorApp(Adw.Application):
+    def __init__(self, feeder_url=DEFAULT_URL, fleet_urls=None, engine=None, poller=None, beast=None,
+                 update_mode=DEFAULT_UPDATE_MODE, exporters=(), profile=None):
+        super().__init__(
+            application_id=APP_ID,
+            flags=Gio.ApplicationFlags.FLAGS_NONE
+        )
+        self.feeder_url = feeder_url
+        self.fleet_urls = fleet_urls or []
+        # Engine already polling feeder_url, started before GTK was loaded
+        self.engine = engine
+        self.poller = poller
+        self.beast = beast
+        self.update_mode = update_mode
+        # MetricsExporters fed by a fleet window; main() subscribes them to its own engine
+        self.exporters = exporters
+        self.profile = profile
+    
+    def do_activate(self):
+        win = self.props.active_window
+        if not win:
+            if self.fleet_urls:
+                win = FleetWindow(self.fleet_urls, application=self, update_mode=self.update_mode,
+                                  exporters=self.exporters, profile=self.profile)
+            else:
+                win = ADSBMonitorWindow(application=self, feeder_url=self.feeder_url,
+                                        engine=self.engine, poller=self.poller,
+                                        owns_engine=self.engine is not None, beast=self.beast,
+                                        profile=self.profile)
+        win.present()
+    
+    def do_startup(self):
+        Adw.Application.do_startup(self)
+        
+        # Add keyboard shortcuts
+        self.set_accels_for_action("app.quit", ["<Control>q"])
@@ -0,0 +1,65 @@
+"""Polling without a GUI, for running on a server"""
+
+import random
+import signal
+import sys
+
+from .aggregators import AggregatorDiscovery
+from .connection import DEFAULT_MAX_CONCURRENT_REQUESTS
+from .engine import (DEFAULT_REFRESH_INTERVAL, FLEET_JITTER, FLEET_MAX_CONCURRENCY,
+                     FLEET_PER_FEEDER_CONCURRENCY, PollingEngine)
+from .history import HistoryStore
+from .poller import FeederPoller
+from .prometheus import PrometheusExporter
+
+
+def parse_listen(address):
+    """Split 'host:port' (or ':port' for all interfaces) into (host, port)"""
+    host, sep, port = address.rpartition(':')
+    if not sep or not port.isdigit():
+        raise ValueError(f"expected HOST:PORT, got {address!r}")
+    return host.strip('[]'), int(port)
+
+
+def run(feeder_urls, listen, interval=DEFAULT_REFRESH_INTERVAL, record_history=True, mode='fixed',
+        exporters=()):
+    """Poll the feeders and serve /metrics until interrupted
+    
+    Every refresh result is also handed to the MetricsExporters given.
+    """
+    host, port = parse_listen(listen)
+    exporter = PrometheusExporter()
+    server = exporter.make_server(host, port)
+    
+    history = HistoryStore() if record_history else None
+    discovery = AggregatorDiscovery()
+    if len(feeder_urls) > 1:
+        engine = PollingEngine(max_workers=FLEET_MAX_CONCURRENCY, jitter=FLEET_JITTER)
+        per_feeder = FLEET_PER_FEEDER_CONCURRENCY
+    else:
+        engine = PollingEngine(max_workers=DEFAULT_MAX_CONCURRENT_REQUESTS)
+        per_feeder = DEFAULT_MAX_CONCURRENT_REQUESTS
+    
+    for feeder_url in feeder_urls:
+        poller = FeederPoller(feeder_url, discovery, history, max_concurrency=per_feeder)
+        start_delay = random.uniform(0, interval) if len(feeder_urls) > 1 else 0
+        engine.add(poller, interval, start_delay=start_delay, mode=mode)
+        engine.subscribe(poller, exporter.update)
+        for metrics_exporter in exporters:
+            engine.subscribe(poller, metrics_exporter.update)
+    
+    # Stop the same way on SIGTERM (systemd) as on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"adsb-monitor: polling {len(feeder_urls)} feeder(s), serving /metrics on "
+          f"{host or '*'}:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        engine.shutdown()
+        for metrics_exporter in exporters:
+            metrics_exporter.close()
+        if history is not None:
+            history.close()
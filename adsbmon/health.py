@@ -0,0 +1,94 @@
+"""Telling when a feeder is down, and polling it gently while it is"""
+
+import random
+
+# Consecutive refreshes without a single answer after which a feeder is
+# taken to be down
+BREAKER_FAILURE_THRESHOLD = 2
+# Seconds before the first connection probe of a feeder that is down,
+# doubled after every failed probe up to the maximum
+BREAKER_RETRY_DELAY = 5
+BREAKER_MAX_RETRY_DELAY = 300
+# Fraction by which retry delays are randomly stretched or shortened, so
+# that the feeders of a fleet that went down together do not come back
+# into step
+BREAKER_JITTER = 0.2
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Health of one feeder as a circuit breaker
+    
+    Closed, refreshes go out as usual, but one that got no answer is
+    followed by a connection probe before the next full refresh. After
+    BREAKER_FAILURE_THRESHOLD refreshes in a row without an answer the
+    breaker opens: no requests are sent until the retry delay has passed,
+    and then only a connection probe (half-open). A probe that fails reopens
+    the breaker with a longer delay. One that connects lets a full refresh
+    through, but only a refresh that is answered counts as the feeder being
+    back; if it is not, the breaker reopens at once, so a feeder that
+    accepts connections but answers nothing still backs off.
+    """
+    def __init__(self, threshold=BREAKER_FAILURE_THRESHOLD, retry_delay=BREAKER_RETRY_DELAY,
+                 max_retry_delay=BREAKER_MAX_RETRY_DELAY, jitter=BREAKER_JITTER):
+        self.threshold = threshold
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.jitter = jitter
+        self.state = CLOSED
+        # Refreshes in a row without an answer
+        self.failures = 0
+        # Times opened since the feeder last answered
+        self.opened = 0
+        # Monotonic time of the next probe while open
+        self.retry_at = None
+        # Set when a probe got through, for the full refresh it lets through
+        self.probed = False
+    
+    def needs_probe(self):
+        """Whether the next refresh should only be a connection probe
+        
+        That is while open or half-open, and once after a refresh that got
+        no answer, so a feeder that went away costs a connection attempt
+        rather than a full round of requests.
+        """
+        return self.state != CLOSED or (self.failures > 0 and not self.probed)
+    
+    def trial(self):
+        """Start a probe; called when a refresh is planned while not closed"""
+        self.state = HALF_OPEN
+    
+    def probe_succeeded(self):
+        """Let a full refresh through after a probe connected"""
+        self.state = CLOSED
+        self.failures = self.threshold - 1
+        self.probed = True
+    
+    def success(self):
+        self.state = CLOSED
+        self.probed = False
+        self.failures = 0
+        self.opened = 0
+        self.retry_at = None
+    
+    def failure(self, now):
+        """Count a refresh or probe without an answer; True if that opened the breaker"""
+        self.failures += 1
+        self.probed = False
+        if self.state != HALF_OPEN and self.failures < self.threshold:
+            return False
+        delay = min(self.retry_delay * 2 ** self.opened, self.max_retry_delay)
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        self.state = OPEN
+        self.opened += 1
+        self.retry_at = now + delay
+        return True
+    
+    def retry_in(self, now):
+        """Seconds until the next probe while open, else None"""
+        if self.state != OPEN:
+            return None
+        return max(0.0, self.retry_at - now)
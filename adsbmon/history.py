@@ -0,0 +1,256 @@
+"""Metrics history kept in SQLite"""
+
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from .paths import user_data_dir
+from .series import SERIES_RAW_CAPACITY
+
+# Days of raw samples kept in the history database
+HISTORY_RAW_RETENTION_DAYS = 7
+# Days of one-minute rollups and aggregator status changes kept in the history database
+HISTORY_ROLLUP_RETENTION_DAYS = 365
+# Seconds queued samples may wait before being written
+HISTORY_FLUSH_INTERVAL = 10
+# Queued refreshes that trigger a write before the flush interval is up
+HISTORY_BATCH_SIZE = 60
+# Seconds between retention passes over the history database
+HISTORY_COMPACT_INTERVAL = 3600
+# Hours of history loaded into the in-memory series at startup
+HISTORY_LOAD_HOURS = 24
+
+# stage2_stats fields recorded as metrics
+STAGE2_METRICS = ('planes', 'tplanes', 'mps', 'pps', 'uptime')
+
+
+def sample_metrics(data):
+    """Extract the numeric metrics of a refresh's data as {name: float}"""
+    metrics = {}
+    stats = data.get('stage2_stats') or {}
+    for key in STAGE2_METRICS:
+        value = stats.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[key] = float(value)
+    
+    for key, value in (data.get('temperatures') or {}).items():
+        try:
+            metrics[f"temperature_{key}"] = float(value)
+        except (TypeError, ValueError):
+            pass
+    return metrics
+
+
+def fresh_data(data):
+    """The part of a refresh's data that was fetched rather than served from the cache
+    
+    Values a refresh took from the cache were recorded when they were
+    fetched; taking them again would pass them off as new samples. Data
+    without a 'fetched' set of result keys is taken as fetched whole.
+    """
+    fetched = data.get('fetched')
+    if fetched is None:
+        return data
+    fresh = {key: data[key] for key in ('stage2_stats', 'temperatures') if key in data and key in fetched}
+    aggregators = [agg for agg in data.get('aggregators', ()) if ('status', agg['id']) in fetched]
+    if aggregators:
+        fresh['aggregators'] = aggregators
+    return fresh
+
+
+class HistoryStore:
+    """Keeps metric samples and aggregator states in an SQLite database
+    
+    The fetch thread only queues samples; a writer thread stores them in
+    batches, maintains one-minute rollups alongside the raw samples and
+    periodically drops data past its retention. The database runs in WAL
+    mode so loading history at startup does not wait for the writer.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS series (
+            id INTEGER PRIMARY KEY,
+            feeder TEXT NOT NULL,
+            name TEXT NOT NULL,
+            UNIQUE (feeder, name)
+        );
+        CREATE TABLE IF NOT EXISTS samples (
+            series_id INTEGER NOT NULL,
+            ts INTEGER NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (series_id, ts)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS rollup_1m (
+            series_id INTEGER NOT NULL,
+            minute INTEGER NOT NULL,
+            min REAL NOT NULL,
+            max REAL NOT NULL,
+            sum REAL NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (series_id, minute)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS aggregator_status (
+            feeder TEXT NOT NULL,
+            agg_id TEXT NOT NULL,
+            ts INTEGER NOT NULL,
+            beast TEXT NOT NULL,
+            mlat TEXT NOT NULL,
+            PRIMARY KEY (feeder, agg_id, ts)
+        ) WITHOUT ROWID;
+    """
+    
+    def __init__(self, path=None):
+        self.path = path or os.path.join(user_data_dir(), 'history.sqlite3')
+        self._queue = queue.Queue()
+        self._series_ids = {}
+        self._last_status = {}
+        self._last_compact = 0
+        self._failed = False
+        self._writer = threading.Thread(target=self._writer_thread, name="adsb-history", daemon=True)
+        self._writer.start()
+    
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        # Must be set before the first table exists to take effect
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.executescript(self.SCHEMA)
+        return conn
+    
+    def record(self, feeder_url, timestamp, data):
+        """Queue a refresh's data for writing; never blocks"""
+        if self._failed:
+            return
+        self._queue.put((feeder_url, int(timestamp), sample_metrics(data), data.get('aggregators') or []))
+    
+    def close(self, timeout=2):
+        """Write what is still queued and stop the writer thread"""
+        self._queue.put(None)
+        self._writer.join(timeout)
+    
+    def _writer_thread(self):
+        try:
+            conn = self._connect()
+        except (OSError, sqlite3.Error) as e:
+            print(f"adsb-monitor: history disabled: {e}", file=sys.stderr)
+            self._failed = True
+            return
+        
+        running = True
+        while running:
+            batch = []
+            deadline = time.monotonic() + HISTORY_FLUSH_INTERVAL
+            while len(batch) < HISTORY_BATCH_SIZE:
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            
+            try:
+                if batch:
+                    self._write_batch(conn, batch)
+                if time.monotonic() - self._last_compact >= HISTORY_COMPACT_INTERVAL:
+                    self._compact(conn)
+            except sqlite3.Error as e:
+                print(f"adsb-monitor: history write failed: {e}", file=sys.stderr)
+        conn.close()
+    
+    def _series_id(self, conn, feeder_url, name):
+        key = (feeder_url, name)
+        series_id = self._series_ids.get(key)
+        if series_id is None:
+            conn.execute("INSERT OR IGNORE INTO series (feeder, name) VALUES (?, ?)", key)
+            series_id = conn.execute(
+                "SELECT id FROM series WHERE feeder = ? AND name = ?", key
+            ).fetchone()[0]
+            self._series_ids[key] = series_id
+        return series_id
+    
+    def _write_batch(self, conn, batch):
+        samples = []
+        status_changes = []
+        with conn:
+            for feeder_url, timestamp, metrics, aggregators in batch:
+                for name, value in metrics.items():
+                    samples.append((self._series_id(conn, feeder_url, name), timestamp, value))
+                
+                # Aggregator states are only stored when they change
+                for agg in aggregators:
+                    state = (agg.get('beast', 'unknown'), agg.get('mlat', 'unknown'))
+                    key = (feeder_url, agg.get('id'))
+                    if self._last_status.get(key) != state:
+                        self._last_status[key] = state
+                        status_changes.append((feeder_url, agg.get('id'), timestamp) + state)
+            
+            # The first sample of a second is kept, and only samples actually
+            # stored go into the rollups, so they always match the samples
+            inserted = [sample for sample in samples
+                        if conn.execute("INSERT OR IGNORE INTO samples VALUES (?, ?, ?)", sample).rowcount]
+            conn.executemany(
+                """INSERT INTO rollup_1m VALUES (?, ?, ?, ?, ?, 1)
+                   ON CONFLICT (series_id, minute) DO UPDATE SET
+                       min = min(min, excluded.min),
+                       max = max(max, excluded.max),
+                       sum = sum + excluded.sum,
+                       count = count + 1""",
+                [(series_id, ts - ts % 60, value, value, value) for series_id, ts, value in inserted],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO aggregator_status VALUES (?, ?, ?, ?, ?)",
+                status_changes,
+            )
+    
+    def _compact(self, conn):
+        """Drop data past its retention and give the space back"""
+        now = int(time.time())
+        raw_cutoff = now - HISTORY_RAW_RETENTION_DAYS * 86400
+        rollup_cutoff = now - HISTORY_ROLLUP_RETENTION_DAYS * 86400
+        with conn:
+            conn.execute("DELETE FROM samples WHERE ts < ?", (raw_cutoff,))
+            conn.execute("DELETE FROM rollup_1m WHERE minute < ?", (rollup_cutoff,))
+            conn.execute("DELETE FROM aggregator_status WHERE ts < ?", (rollup_cutoff,))
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._last_compact = time.monotonic()
+    
+    def load(self, feeder_url, names, raw_limit=SERIES_RAW_CAPACITY, hours=HISTORY_LOAD_HOURS):
+        """Read recent history as {name: (raw samples, minute averages)}, oldest first
+        
+        Both reads are range scans on the primary keys, so this stays fast
+        however much history the database holds.
+        """
+        if not os.path.exists(self.path):
+            return {}
+        since = int(time.time()) - hours * 3600
+        history = {}
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            for name in names:
+                row = conn.execute(
+                    "SELECT id FROM series WHERE feeder = ? AND name = ?", (feeder_url, name)
+                ).fetchone()
+                if row is None:
+                    continue
+                raw = conn.execute(
+                    """SELECT ts, value FROM samples
+                       WHERE series_id = ? AND ts >= ? ORDER BY ts DESC LIMIT ?""",
+                    (row[0], since, raw_limit),
+                ).fetchall()
+                raw.reverse()
+                minutes = conn.execute(
+                    """SELECT minute, sum / count FROM rollup_1m
+                       WHERE series_id = ? AND minute >= ? ORDER BY minute""",
+                    (row[0], since),
+                ).fetchall()
+                history[name] = (raw, minutes)
+        finally:
+            conn.close()
+        return history
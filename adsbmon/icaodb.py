@@ -0,0 +1,208 @@
+"""Registration, type and operator of aircraft by ICAO address
+
+The database is a prebuilt file that is memory-mapped rather than loaded:
+a header, the sorted 24-bit addresses as little-endian uint32s, then one
+fixed-width record per address in the same order. A lookup binary-searches
+the address array in place, so only the pages it touches are ever read and
+opening the file costs next to nothing. Recent lookups are cached.
+
+The file is built from tar1090-db's aircraft.csv or OpenSky's
+aircraftDatabase.csv:
+
+    python3 -m adsbmon.icaodb build aircraft.csv.gz
+"""
+
+import argparse
+import bisect
+import csv
+import functools
+import gzip
+import itertools
+import mmap
+import os
+import struct
+import sys
+
+from .paths import user_data_dir
+
+# magic, version, number of aircraft
+_HEADER = struct.Struct('<4sII')
+_MAGIC = b'ICAO'
+_VERSION = 1
+
+# Fields of a record and their width in bytes, NUL padded
+ICAODB_FIELDS = (('registration', 12), ('type', 4), ('operator', 40))
+ICAODB_RECORD = struct.Struct('<' + ''.join(f"{width}s" for name, width in ICAODB_FIELDS))
+# Lookups kept in the cache
+ICAODB_CACHE_SIZE = 4096
+
+
+def default_path():
+    return os.path.join(user_data_dir(), 'aircraft-db.bin')
+
+
+class AircraftDatabase:
+    """Read-only lookups in a memory-mapped aircraft database
+    
+    The file is mapped on the first lookup. Without a database every lookup
+    returns None.
+    """
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        self._map = None
+        self._keys = None
+        self._records = 0
+        self.lookup = functools.lru_cache(maxsize=ICAODB_CACHE_SIZE)(self._lookup)
+    
+    def __len__(self):
+        return len(self._keys) if self._open() else 0
+    
+    def _open(self):
+        if self._keys is not None:
+            return True
+        if self._map is False:
+            return False
+        try:
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, count = _HEADER.unpack_from(self._map)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError("not an aircraft database")
+            self._records = _HEADER.size + 4 * count
+            if len(self._map) < self._records + ICAODB_RECORD.size * count:
+                raise ValueError("aircraft database is truncated")
+        except (OSError, ValueError, struct.error):
+            self._map = False
+            return False
+        
+        keys = memoryview(self._map)[_HEADER.size:self._records]
+        if sys.byteorder == 'little':
+            self._keys = keys.cast('I')
+        else:
+            # Big-endian machines pay for a swapped copy
+            from array import array
+            self._keys = array('I', keys)
+            self._keys.byteswap()
+        return True
+    
+    def _lookup(self, hex_id):
+        """(registration, type, operator) of an ICAO hex address, or None
+        
+        Fields the database has no value for are None.
+        """
+        if not self._open():
+            return None
+        try:
+            address = int(hex_id, 16)
+        except ValueError:
+            # Addresses that are not ICAO assigned start with '~'
+            return None
+        keys = self._keys
+        index = bisect.bisect_left(keys, address)
+        if index == len(keys) or keys[index] != address:
+            return None
+        fields = ICAODB_RECORD.unpack_from(self._map, self._records + index * ICAODB_RECORD.size)
+        return tuple([field.rstrip(b'\0').decode('utf-8', 'replace') or None for field in fields])
+    
+    def close(self):
+        self.lookup.cache_clear()
+        if self._keys is not None:
+            if isinstance(self._keys, memoryview):
+                self._keys.release()
+            self._map.close()
+        self._keys = None
+        self._map = None
+
+
+def _encode(value, width):
+    """UTF-8 bytes of value cut to width without splitting a character"""
+    data = value.strip().encode()
+    if len(data) > width:
+        data = data[:width].decode('utf-8', 'ignore').encode()
+    return data
+
+
+def read_csv(f):
+    """Yield (address, registration, type, operator) rows from a text file
+    
+    OpenSky's aircraftDatabase.csv has a header row with icao24; tar1090-db's
+    aircraft.csv has none and is separated by semicolons (hex, registration,
+    type, flags, description, year, owner/operator).
+    """
+    first = f.readline()
+    lines = itertools.chain([first], f)
+    if 'icao24' in first:
+        for row in csv.DictReader(lines):
+            yield (row.get('icao24'), row.get('registration'), row.get('typecode'),
+                   row.get('operator') or row.get('owner'))
+    else:
+        for row in csv.reader(lines, delimiter=';'):
+            row += [''] * (7 - len(row))
+            yield row[0], row[1], row[2], row[6]
+
+
+def build(rows, path):
+    """Write rows from read_csv() to a database file, replacing it atomically
+    
+    Returns the number of aircraft written.
+    """
+    records = {}
+    for address, *fields in rows:
+        address = (address or '').strip()
+        # Non-ICAO addresses ('~' prefixed) are never looked up, and without
+        # the prefix they would take the place of the ICAO address
+        if address.startswith('~'):
+            continue
+        try:
+            key = int(address, 16)
+        except ValueError:
+            continue
+        if not 0 <= key < 1 << 24 or not any(field and field.strip() for field in fields):
+            continue
+        records[key] = ICAODB_RECORD.pack(*(_encode(field or '', width)
+                                            for field, (name, width) in zip(fields, ICAODB_FIELDS)))
+    
+    keys = sorted(records)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(keys)))
+        f.write(struct.pack(f'<{len(keys)}I', *keys))
+        for key in keys:
+            f.write(records[key])
+    os.replace(tmp_path, path)
+    return len(keys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python3 -m adsbmon.icaodb",
+                                     description="Build or query the aircraft database")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help="build the database from a CSV file")
+    build_parser.add_argument('csv', help="aircraft.csv(.gz) from tar1090-db or aircraftDatabase.csv from OpenSky")
+    build_parser.add_argument('-o', '--output', default=default_path(),
+                              help=f"database file (default: {default_path()})")
+    lookup_parser = commands.add_parser('lookup', help="look up ICAO hex addresses")
+    lookup_parser.add_argument('hex', nargs='+')
+    lookup_parser.add_argument('-d', '--database', default=default_path())
+    args = parser.parse_args(argv)
+    
+    if args.command == 'build':
+        opener = gzip.open if args.csv.endswith('.gz') else open
+        try:
+            with opener(args.csv, 'rt', encoding='utf-8', errors='replace', newline='') as f:
+                count = build(read_csv(f), args.output)
+        except OSError as e:
+            parser.error(f"cannot build from {args.csv}: {e}")
+        print(f"{count} aircraft written to {args.output}")
+    else:
+        database = AircraftDatabase(args.database)
+        if not len(database):
+            parser.error(f"no aircraft database at {args.database}")
+        for hex_id in args.hex:
+            info = database.lookup(hex_id.lower())
+            print(hex_id, *(value or '-' for value in info) if info else ['not found'])
+
+
+if __name__ == "__main__":
+    main()
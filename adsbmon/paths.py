@@ -0,0 +1,15 @@
+"""Per-user directories"""
+
+import os
+
+
+def user_cache_dir():
+    """Directory for data the monitor can rebuild, such as discovery results"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'adsb-monitor')
+
+
+def user_data_dir():
+    """Directory for data worth keeping, such as the metrics history"""
+    base = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    return os.path.join(base, 'adsb-monitor')
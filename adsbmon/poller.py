@@ -0,0 +1,520 @@
+"""Fetching and assembling the data of one feeder"""
+
+import http.client
+import json
+import re
+import time
+
+from .aggregators import AGGREGATORS
+from .aircraft import AIRCRAFT_JSON_PATH, parse_aircraft_json
+from .connection import DEFAULT_MAX_CONCURRENT_REQUESTS, FeederConnectionPool
+from .coverage import RECEIVER_JSON_PATH
+from .diagnostics import ERROR_CLASSES, RequestDiagnostics
+from .health import CircuitBreaker
+from .history import fresh_data
+
+DEFAULT_URL = "http://adsb-feeder.local"
+
+# Seconds between checks of the feeder homepage, which only provides the feeder name
+HOMEPAGE_REFRESH_INTERVAL = 600
+# Bytes read from the homepage at a time while looking for the feeder name
+HOMEPAGE_CHUNK_SIZE = 4096
+
+# Relative change of the message or position rate that counts as a change
+# for adaptive updates
+CHANGE_RATE_TOLERANCE = 0.2
+
+# Responses in a row that an aircraft feed format fails to decode before
+# it is given up on; a single bad one is more likely cut short in transit
+AIRCRAFT_FORMAT_FAILURES = 3
+
+# Seconds between checks of the receiver location, once it is known
+RECEIVER_REFRESH_INTERVAL = 3600
+
+# Seconds a response is used for before it is fetched again, per result key
+# of FeederPoller.plan(); 0 fetches it on every refresh. Slow-moving values
+# are served from the cache in between, and a failed fetch is retried on the
+# next refresh.
+ENDPOINT_CADENCES = {
+    'stage2_stats': 0,
+    'aircraft': 0,
+    'temperatures': 30,
+    'status': 60,
+    'feeder_name': HOMEPAGE_REFRESH_INTERVAL,
+    'receiver': RECEIVER_REFRESH_INTERVAL,
+    # The aircraft list while nothing shows it, when it only feeds the
+    # coverage map and unique aircraft counts
+    'aircraft_collect': 60,
+}
+
+# The homepage is scanned as bytes, where \w is ASCII only: the name is
+# taken with any non-ASCII (UTF-8) bytes and then cut to its word
+# characters once decoded
+FEEDER_NAME_PATTERN = re.compile(rb'Homepage for ([\w\x80-\xff]+)')
+FEEDER_NAME_WORD = re.compile(r'\w+')
+# Diagnostics name of the aggregator status requests, which are counted together
+AGGREGATOR_STATUS_ENDPOINT = "/api/status/*"
+# Diagnostics name of the connection probes sent while a feeder is down
+PROBE_ENDPOINT = "(connection probe)"
+
+
+def normalize_feeder_url(url):
+    """Turn user input like 'feeder.local/' into 'http://feeder.local'"""
+    url = url.strip().rstrip('/')
+    if '://' not in url:
+        url = f"http://{url}"
+    return url
+
+
+class ResponseCache:
+    """The last good result of each request, with when it was fetched"""
+    def __init__(self):
+        # {key: (value, monotonic time of the refresh that fetched it)}
+        self._entries = {}
+    
+    def due(self, key, ttl, now):
+        """Whether key has to be fetched again, being older than ttl seconds or missing"""
+        entry = self._entries.get(key)
+        return entry is None or now - entry[1] >= ttl
+    
+    def get(self, key, default=None):
+        """The last value stored for key, however old"""
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else default
+    
+    def put(self, key, value, fetched):
+        self._entries[key] = (value, fetched)
+
+
+class FeederPoller:
+    """Fetches the data of one feeder
+    
+    Holds what is kept per feeder between refreshes (connection pool,
+    response cache, circuit breaker). A refresh is split into plan(), which
+    lists the requests that are due by their cadence, and assemble(), which
+    turns their results and the cached responses of the rest into the data
+    dict shown by the UI; running the requests is up to a PollingEngine.
+    While the breaker is open, a refresh is only a connection probe.
+    """
+    def __init__(self, feeder_url, discovery, history=None,
+                 max_concurrency=DEFAULT_MAX_CONCURRENT_REQUESTS, coverage=None, unique=None, cadences=None):
+        self.feeder_url = feeder_url
+        self.discovery = discovery
+        self.history = history
+        # CoverageMap fed with every poll's aircraft positions, if any
+        self.coverage = coverage
+        # UniqueAircraft fed with every poll's aircraft addresses, if any
+        self.unique = unique
+        self.max_concurrency = max_concurrency
+        self.http_pool = FeederConnectionPool(max_idle=max_concurrency)
+        self.diagnostics = RequestDiagnostics()
+        # Seconds between fetches per result key, see ENDPOINT_CADENCES
+        self.cadences = dict(ENDPOINT_CADENCES, **(cadences or {}))
+        self._responses = ResponseCache()
+        self._homepage_validators = self._new_homepage_validators()
+        self.breaker = CircuitBreaker()
+        # Set when a probe got through, for a full refresh right away
+        self._recovered = False
+        # The aircraft list is fetched on every refresh while something
+        # shows it; for the coverage map and unique aircraft counts alone,
+        # every ENDPOINT_CADENCES['aircraft_collect'] seconds
+        self.track_aircraft = False
+        # Set while the feeder is not on screen at all; the aircraft list is
+        # then not fetched, whatever would take it
+        self.hidden = False
+        self._aircraft_format = 0
+        self._aircraft_failures = 0
+    
+    def set_feeder_url(self, feeder_url):
+        self.feeder_url = feeder_url
+        self._responses = ResponseCache()
+        self._homepage_validators = self._new_homepage_validators()
+        self.breaker = CircuitBreaker()
+        self._recovered = False
+        self._aircraft_format = 0
+        self._aircraft_failures = 0
+        if self.coverage is not None:
+            self.coverage.set_feeder_url(feeder_url)
+        if self.unique is not None:
+            self.unique.set_feeder_url(feeder_url)
+    
+    def set_max_concurrency(self, value):
+        self.max_concurrency = value
+        self.http_pool.max_idle = value
+    
+    def plan(self):
+        """Return (jobs, context) for one refresh
+        
+        jobs maps a result key to a (function, *args) tuple; context is
+        handed back to assemble() together with the results.
+        """
+        feeder_url = self.feeder_url
+        responses = self._responses
+        breaker = self.breaker
+        now = time.monotonic()
+        context = {
+            'feeder_url': feeder_url,
+            'started': time.time(),
+            'cycle_started': time.perf_counter(),
+            'planned': now,
+            'breaker': breaker,
+        }
+        
+        if breaker.needs_probe():
+            # The feeder is down or did not answer: only see whether it takes connections
+            breaker.trial()
+            context['probe'] = True
+            return {'probe': (self._probe, feeder_url)}, context
+        
+        candidates = {
+            # Stage2 stats contains planes, message rate, position rate
+            'stage2_stats': (self._fetch_json, feeder_url, "/api/stage2_stats"),
+            'temperatures': (self._fetch_json, feeder_url, "/api/get_temperatures.json"),
+            # Feeder name from the homepage
+            'feeder_name': (self._fetch_feeder_name, feeder_url, self._homepage_validators, responses),
+        }
+        if not self.hidden and (self.track_aircraft or self.coverage is not None or self.unique is not None):
+            candidates['aircraft'] = (self._fetch_aircraft, feeder_url)
+        if self.coverage is not None:
+            candidates['receiver'] = (self._fetch_receiver, feeder_url)
+        # Only aggregators the feeder is known to have, plus the rest
+        # on the occasional full probe, which ignores the cache
+        agg_ids, full_probe = self.discovery.plan(feeder_url)
+        for agg_id in agg_ids:
+            candidates[('status', agg_id)] = (self._fetch_aggregator_status, feeder_url, agg_id)
+        
+        jobs = {}
+        cached = set()
+        for key, job in candidates.items():
+            cadence = self.cadences[key[0] if isinstance(key, tuple) else key]
+            if key == 'aircraft' and not self.track_aircraft:
+                cadence = self.cadences['aircraft_collect']
+            if responses.due(key, cadence, now) or (full_probe and isinstance(key, tuple)):
+                jobs[key] = job
+            else:
+                cached.add(key)
+        
+        context.update({
+            'responses': responses,
+            'due': set(jobs),
+            'cached': cached,
+            'agg_ids': agg_ids,
+            'full_probe': full_probe,
+        })
+        return jobs, context
+    
+    def assemble(self, context, results):
+        """Build (data, error) from the results of the jobs returned by plan()
+        
+        data is None after a connection probe that got through, as there is
+        nothing to show until the refresh that follows right away.
+        """
+        data = {}
+        error = None
+        feeder_url = context['feeder_url']
+        breaker = context['breaker']
+        if context.get('probe'):
+            self.diagnostics.record_cycle(time.perf_counter() - context['cycle_started'])
+            if results.get('probe'):
+                breaker.probe_succeeded()
+                self._recovered = True
+                return None, None
+            breaker.failure(time.monotonic())
+            return {}, self._failure_message(context)
+        
+        responses = context['responses']
+        due = context['due']
+        
+        # Cache this refresh's good results; failed fetches are retried on
+        # the next refresh
+        answered = not due
+        for key in due:
+            value = results.get(key)
+            if value is not None and not (isinstance(key, tuple) and not value[0]):
+                responses.put(key, value, context['planned'])
+                answered = True
+        
+        if not answered:
+            # Cached values would make a feeder that is down look fine
+            self.diagnostics.record_cycle(time.perf_counter() - context['cycle_started'])
+            breaker.failure(time.monotonic())
+            return {}, self._failure_message(context)
+        breaker.success()
+        
+        def result(key):
+            if key in due:
+                return results.get(key)
+            return responses.get(key) if key in context['cached'] else None
+        
+        try:
+            stage2_stats = result('stage2_stats')
+            if stage2_stats and len(stage2_stats) > 0:
+                data['stage2_stats'] = stage2_stats[0]
+            
+            temps = result('temperatures')
+            if temps:
+                data['temperatures'] = temps
+            
+            statuses = {
+                agg_id: result(('status', agg_id)) or (False, None)
+                for agg_id in context['agg_ids']
+            }
+            # Discovery only learns from the aggregators asked this time
+            self.discovery.record(feeder_url, {
+                agg_id: status for agg_id, status in statuses.items() if ('status', agg_id) in due
+            }, context['full_probe'])
+            
+            agg_data = []
+            for agg_id, agg_name in AGGREGATORS:
+                agg_info = statuses.get(agg_id, (False, None))[1]
+                if agg_info is not None:
+                    agg_data.append({
+                        'id': agg_id,
+                        'name': agg_name,
+                        'beast': agg_info.get('beast', 'unknown'),
+                        'mlat': agg_info.get('mlat', 'unknown'),
+                    })
+            
+            if agg_data:
+                data['aggregators'] = agg_data
+            
+            feeder_name = result('feeder_name')
+            if feeder_name:
+                data['feeder_name'] = feeder_name
+            
+            # Only a fresh list: a cached one was already taken into account
+            aircraft = results.get('aircraft') if 'aircraft' in due else None
+            if aircraft is not None:
+                data['aircraft'] = aircraft
+                # The last known location, even if checking it failed
+                receiver = responses.get('receiver')
+                if self.coverage is not None and receiver is not None:
+                    self.coverage.add(feeder_url, receiver, aircraft)
+                if self.unique is not None:
+                    self.unique.add(feeder_url, aircraft, context['started'])
+            if self.unique is not None:
+                unique = self.unique.counts(feeder_url, context['started'])
+                if unique is not None:
+                    data['unique_aircraft'] = unique
+        
+        except Exception as e:
+            error = str(e)
+        
+        self.diagnostics.record_cycle(time.perf_counter() - context['cycle_started'])
+        if data:
+            data['timestamp'] = context['started']
+            # Result keys fetched by this refresh, see fresh_data()
+            data['fetched'] = frozenset(due)
+            if self.history is not None:
+                self.history.record(feeder_url, context['started'], fresh_data(data))
+        
+        return data, error
+    
+    def _failure_message(self, context):
+        """Why a refresh got no answer, and when the next attempt is due"""
+        last_error = self.diagnostics.last_error(since=context['started'])
+        reason = ERROR_CLASSES[last_error[1]] if last_error else "no answer"
+        retry_in = context['breaker'].retry_in(time.monotonic())
+        if retry_in is None:
+            return f"No answer from the feeder ({reason})"
+        # A time rather than a delay, as the banner is not updated while waiting
+        retry_at = time.strftime('%H:%M:%S', time.localtime(time.time() + retry_in))
+        return f"Feeder unreachable ({reason}), next retry at {retry_at}"
+    
+    def retry_delay(self):
+        """Seconds until the next refresh as the circuit breaker has it, else None
+        
+        While the feeder is down, that is when the next probe is due; right
+        after a probe got through, it is now.
+        """
+        if self._recovered:
+            self._recovered = False
+            return 0.0
+        return self.breaker.retry_in(time.monotonic())
+    
+    def changed(self, previous, data):
+        """Whether data differs from the previous refresh's in a way worth showing
+        
+        Counts, aggregator states and the feeder name count, as do swings of
+        the message and position rates beyond CHANGE_RATE_TOLERANCE;
+        uptime, temperatures and rate noise do not.
+        """
+        if not previous:
+            return True
+        if self._summary(previous) != self._summary(data):
+            return True
+        old = previous.get('stage2_stats') or {}
+        new = data.get('stage2_stats') or {}
+        for key in ('mps', 'pps'):
+            before, after = old.get(key), new.get(key)
+            if isinstance(before, (int, float)) and isinstance(after, (int, float)):
+                if abs(after - before) > max(abs(before), 1) * CHANGE_RATE_TOLERANCE:
+                    return True
+        return False
+    
+    @staticmethod
+    def _summary(data):
+        stats = data.get('stage2_stats') or {}
+        aggregators = tuple((agg['id'], agg['beast'], agg['mlat']) for agg in data.get('aggregators', ()))
+        return (stats.get('planes'), stats.get('tplanes'), aggregators, data.get('feeder_name'))
+    
+    def _probe(self, feeder_url):
+        """Whether the feeder accepts connections"""
+        try:
+            with self.diagnostics.request(PROBE_ENDPOINT):
+                self.http_pool.probe(feeder_url)
+        except OSError:
+            return False
+        return True
+    
+    def _fetch_json(self, feeder_url, endpoint):
+        """Fetch JSON from an endpoint; None if that fails for any reason"""
+        try:
+            url = f"{feeder_url}{endpoint}"
+            with self.diagnostics.request(endpoint) as request:
+                with self.http_pool.open(url, {'Accept': 'application/json'}) as response:
+                    body = response.read()
+                request.record(response)
+                if response.status != 200:
+                    return None
+                return json.loads(body)
+        except (OSError, http.client.HTTPException, ValueError):
+            return None
+    
+    def _fetch_aircraft(self, feeder_url):
+        """Fetch tar1090's aircraft list as {icao hex: field tuple}
+        
+        The compact binCraft feed is preferred, zstd-compressed if possible,
+        with aircraft.json as the fallback. A format the feeder does not
+        serve, or that AIRCRAFT_FORMAT_FAILURES responses in a row could not
+        be decoded from, is skipped from then on.
+        """
+        # Loaded on first use, as numpy is slow to import
+        from . import bincraft
+        
+        formats = []
+        if bincraft.available():
+            if bincraft.zstd_available():
+                formats.append((bincraft.BINCRAFT_ZSTD_PATH, 'zstd'))
+            formats.append((bincraft.BINCRAFT_PATH, 'bincraft'))
+        formats.append((AIRCRAFT_JSON_PATH, 'json'))
+        
+        while self._aircraft_format < len(formats):
+            path, kind = formats[self._aircraft_format]
+            try:
+                with self.diagnostics.request(path) as request:
+                    with self.http_pool.open(f"{feeder_url}{path}") as response:
+                        body = response.read()
+                    request.record(response)
+                    status = response.status
+                    if status == 200:
+                        if kind == 'json':
+                            aircraft = parse_aircraft_json(json.loads(body))
+                        else:
+                            if kind == 'zstd':
+                                body = bincraft.zstd_decompress(body)
+                            aircraft = bincraft.decode_aircraft(body)
+                        self._aircraft_failures = 0
+                        return aircraft
+            except (OSError, http.client.HTTPException):
+                return None
+            except ValueError:
+                self._aircraft_failures += 1
+                if self._aircraft_failures < AIRCRAFT_FORMAT_FAILURES:
+                    return None
+                status = None
+            
+            if status is not None and status != 404:
+                return None
+            self._aircraft_failures = 0
+            # Not served, or not in a form we understand
+            if kind == 'json':
+                return None
+            self._aircraft_format += 1
+        return None
+    
+    def _fetch_receiver(self, feeder_url):
+        """Get the receiver's (lat, lon) from tar1090, or None if it has none"""
+        receiver = self._fetch_json(feeder_url, RECEIVER_JSON_PATH)
+        try:
+            return (float(receiver['lat']), float(receiver['lon']))
+        except (TypeError, KeyError, ValueError):
+            return None
+    
+    def _fetch_aggregator_status(self, feeder_url, agg_id):
+        """Fetch one aggregator's status as (answered, info)
+        
+        answered is False if the feeder could not be reached; info is None
+        when the feeder answered but does not have the aggregator configured.
+        """
+        try:
+            url = f"{feeder_url}/api/status/{agg_id}"
+            with self.diagnostics.request(AGGREGATOR_STATUS_ENDPOINT) as request:
+                with self.http_pool.open(url, {'Accept': 'application/json'}) as response:
+                    body = response.read()
+                request.record(response)
+                if response.status != 200:
+                    return True, None
+                status = json.loads(body)
+        except (OSError, http.client.HTTPException):
+            return False, None
+        except ValueError:
+            return True, None
+        
+        if isinstance(status, dict) and isinstance(status.get("0"), dict):
+            return True, status["0"]
+        return True, None
+    
+    def _fetch_feeder_name(self, feeder_url, validators, responses):
+        """Get the feeder name from the homepage
+        
+        The page is requested conditionally when the feeder sent an ETag or
+        Last-Modified, with the name in responses standing in on a 304, and
+        is only read up to the point where the name appears. Returns '' for
+        a page without a name, so that is cached like a name, and None if
+        the page could not be fetched.
+        """
+        headers = {}
+        if validators['etag']:
+            headers['If-None-Match'] = validators['etag']
+        if validators['last_modified']:
+            headers['If-Modified-Since'] = validators['last_modified']
+        
+        try:
+            with self.diagnostics.request("/") as request, self.http_pool.open(feeder_url, headers) as response:
+                request.status = response.status
+                if response.status == 304:
+                    return responses.get('feeder_name')
+                if response.status != 200:
+                    return None
+                
+                name = self._scan_feeder_name(response)
+                request.record(response)
+                validators['etag'] = response.getheader('ETag')
+                validators['last_modified'] = response.getheader('Last-Modified')
+                return name or ''
+        except (OSError, http.client.HTTPException, ValueError):
+            return None
+    
+    @staticmethod
+    def _new_homepage_validators():
+        return {'etag': None, 'last_modified': None}
+    
+    @staticmethod
+    def _scan_feeder_name(response):
+        """Read the homepage in chunks until the feeder name shows up; None if it does not"""
+        window = b''
+        while True:
+            chunk = response.read(HOMEPAGE_CHUNK_SIZE)
+            window += chunk
+            match = FEEDER_NAME_PATTERN.search(window)
+            if match:
+                # A match at the very end may continue in the next chunk
+                if match.end() < len(window) or not chunk:
+                    name = FEEDER_NAME_WORD.match(match.group(1).decode('utf-8', 'replace'))
+                    return name.group() if name else None
+                window = window[match.start():]
+            elif not chunk:
+                return None
+            else:
+                window = window[-len(FEEDER_NAME_PATTERN.pattern):]
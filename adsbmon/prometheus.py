@@ -0,0 +1,138 @@
+"""Prometheus text exposition of the latest feeder data"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DIAGNOSTICS_CONTENT_TYPE = "application/json"
+
+# (metric name, help text, stage2_stats field)
+STAGE2_GAUGES = [
+    ("adsb_feeder_aircraft", "Aircraft currently tracked", 'planes'),
+    ("adsb_feeder_aircraft_today", "Aircraft seen today", 'tplanes'),
+    ("adsb_feeder_messages_per_second", "Mode S messages received per second", 'mps'),
+    ("adsb_feeder_positions_per_second", "Positions decoded per second", 'pps'),
+    ("adsb_feeder_uptime_seconds", "Feeder uptime", 'uptime'),
+]
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    return ','.join(f'{key}="{escape_label(value)}"' for key, value in labels)
+
+
+def format_value(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshot):
+    """Render {feeder_url: (data, error)} in the Prometheus text format"""
+    families = {}
+    
+    def sample(name, help_text, labels, value):
+        family = families.setdefault(name, (help_text, []))
+        family[1].append(f"{name}{{{format_labels(labels)}}} {format_value(value)}")
+    
+    for feeder_url, (data, error) in snapshot.items():
+        feeder = [('feeder', feeder_url)]
+        stats = data.get('stage2_stats') or {}
+        sample("adsb_feeder_up", "Whether the last refresh of the feeder returned stats",
+               feeder, bool(stats))
+        if 'feeder_name' in data:
+            sample("adsb_feeder_info", "Feeder name from the feeder homepage",
+                   feeder + [('name', data['feeder_name'])], 1)
+        if 'timestamp' in data:
+            sample("adsb_feeder_last_update_timestamp_seconds", "Time of the last successful refresh",
+                   feeder, data['timestamp'])
+        
+        for name, help_text, key in STAGE2_GAUGES:
+            value = stats.get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                sample(name, help_text, feeder, value)
+        
+        for sensor, value in (data.get('temperatures') or {}).items():
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            sample("adsb_feeder_temperature_celsius", "Temperatures reported by the feeder",
+                   feeder + [('sensor', sensor)], value)
+        
+        # One series per aggregator with the current state as a label
+        for agg in data.get('aggregators') or []:
+            labels = feeder + [('aggregator', agg.get('id')), ('aggregator_name', agg.get('name'))]
+            sample("adsb_feeder_aggregator_beast_status", "Beast feed state per aggregator",
+                   labels + [('status', agg.get('beast', 'unknown'))], 1)
+            sample("adsb_feeder_aggregator_mlat_status", "MLAT state per aggregator",
+                   labels + [('status', agg.get('mlat', 'unknown'))], 1)
+    
+    lines = []
+    for name, (help_text, samples) in families.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(samples)
+    return ('\n'.join(lines) + '\n').encode()
+
+
+class PrometheusExporter:
+    """Serves the latest result of each feeder at /metrics
+    
+    The exposition is rendered once per refresh result and kept as bytes,
+    so a scrape only writes out the cached body and never reaches a feeder.
+    The request diagnostics of each feeder are served as JSON at
+    /diagnostics.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = {}
+        self._pollers = {}
+        self._body = render({})
+    
+    def update(self, poller, seq, data, error):
+        """PollingEngine subscriber: take a refresh result into the snapshot"""
+        with self._lock:
+            self._snapshot[poller.feeder_url] = (data, error)
+            self._pollers[poller.feeder_url] = poller
+            self._body = render(self._snapshot)
+    
+    def body(self):
+        return self._body
+    
+    def diagnostics(self):
+        with self._lock:
+            pollers = dict(self._pollers)
+        snapshot = {feeder_url: poller.diagnostics.snapshot() for feeder_url, poller in pollers.items()}
+        return json.dumps(snapshot, indent=1).encode()
+    
+    def make_server(self, host, port):
+        """Return a ThreadingHTTPServer serving the metrics; the caller runs it"""
+        exporter = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    body, content_type = exporter.body(), CONTENT_TYPE
+                elif path == '/diagnostics':
+                    body, content_type = exporter.diagnostics(), DIAGNOSTICS_CONTENT_TYPE
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        return server
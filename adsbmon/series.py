@@ -0,0 +1,127 @@
+"""In-memory metric history"""
+
+import time
+from array import array
+
+# Raw samples kept per metric (an hour at a 1 second refresh interval)
+SERIES_RAW_CAPACITY = 3600
+# One-minute averages kept per metric (24 hours)
+SERIES_MINUTE_CAPACITY = 1440
+
+
+class RingBuffer:
+    """Fixed-size circular buffer of (timestamp, value) samples
+    
+    Samples live in two preallocated arrays of doubles, so memory use is set
+    by the capacity alone. Timestamps must be appended in increasing order.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self._start = 0
+        self._count = 0
+    
+    def __len__(self):
+        return self._count
+    
+    def append(self, timestamp, value):
+        index = (self._start + self._count) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+        self.times[index] = timestamp
+        self.values[index] = value
+    
+    def first_time(self):
+        """Timestamp of the oldest sample, or None when empty"""
+        return self.times[self._start] if self._count else None
+    
+    def since(self, timestamp):
+        """Yield (timestamp, value) samples at or after timestamp, oldest first"""
+        capacity, start, times = self.capacity, self._start, self.times
+        # Binary search for the first sample in range
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if times[(start + middle) % capacity] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        for offset in range(low, self._count):
+            index = (start + offset) % capacity
+            yield times[index], self.values[index]
+
+
+class MetricSeries:
+    """History of one metric at two resolutions: raw samples and one-minute averages"""
+    def __init__(self, raw_capacity=SERIES_RAW_CAPACITY, minute_capacity=SERIES_MINUTE_CAPACITY):
+        self.raw = RingBuffer(raw_capacity)
+        self.minutes = RingBuffer(minute_capacity)
+        self._minute = None
+        self._minute_sum = 0.0
+        self._minute_count = 0
+    
+    def add(self, timestamp, value):
+        self.raw.append(timestamp, value)
+        
+        minute = timestamp - timestamp % 60
+        if minute != self._minute:
+            self._close_minute()
+            self._minute = minute
+        self._minute_sum += value
+        self._minute_count += 1
+    
+    def load(self, raw_samples, minute_samples):
+        """Prefill with stored (timestamp, value) samples, oldest first
+        
+        Samples already in the series are kept and stay the newest ones.
+        """
+        live = list(self.raw.since(float('-inf')))
+        if live:
+            cutoff = live[0][0]
+            raw_samples = [sample for sample in raw_samples if sample[0] < cutoff]
+            minute_samples = [sample for sample in minute_samples if sample[0] < cutoff - cutoff % 60]
+        
+        self.raw = RingBuffer(self.raw.capacity)
+        self.minutes = RingBuffer(self.minutes.capacity)
+        self._minute = None
+        self._minute_sum = 0.0
+        self._minute_count = 0
+        
+        # The newest stored minute is still open and is rebuilt from the raw samples
+        open_minute = None
+        if raw_samples:
+            open_minute = raw_samples[-1][0] - raw_samples[-1][0] % 60
+        for minute, value in minute_samples:
+            if open_minute is None or minute < open_minute:
+                self.minutes.append(minute, value)
+        for timestamp, value in raw_samples:
+            if open_minute is not None and timestamp >= open_minute:
+                self.add(timestamp, value)
+            else:
+                self.raw.append(timestamp, value)
+        for timestamp, value in live:
+            self.add(timestamp, value)
+    
+    def _close_minute(self):
+        if self._minute_count:
+            self.minutes.append(self._minute, self._minute_sum / self._minute_count)
+        self._minute_sum = 0.0
+        self._minute_count = 0
+    
+    def window(self, seconds, now=None):
+        """Samples of the last `seconds`, from the raw ring if it reaches back far enough"""
+        if now is None:
+            now = time.time()
+        start = now - seconds
+        first_raw = self.raw.first_time()
+        if first_raw is not None and first_raw <= start or not len(self.minutes):
+            return list(self.raw.since(start))
+        
+        samples = list(self.minutes.since(start))
+        if first_raw is not None:
+            samples = [sample for sample in samples if sample[0] < first_raw]
+            samples.extend(self.raw.since(first_raw))
+        return samples
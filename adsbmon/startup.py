@@ -0,0 +1,40 @@
+"""Startup timing for --profile-startup"""
+
+import os
+import sys
+import time
+
+
+def process_start_time():
+    """time.monotonic() value at which the process started, or None if unknown
+    
+    Read from /proc so the interpreter's own startup is included.
+    """
+    try:
+        with open('/proc/self/stat') as f:
+            # Fields after the command name, which may itself contain spaces
+            fields = f.read().rpartition(')')[2].split()
+        started = int(fields[19]) / os.sysconf('SC_CLK_TCK')
+        return time.monotonic() - (time.clock_gettime(time.CLOCK_BOOTTIME) - started)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupProfile:
+    """Records when startup milestones are first reached"""
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.monotonic()
+        self.marks = {}
+    
+    def mark(self, name):
+        """Record a milestone; only the first time counts"""
+        self.marks.setdefault(name, time.monotonic())
+    
+    def has(self, *names):
+        return all(name in self.marks for name in names)
+    
+    def report(self, file=None):
+        file = file or sys.stderr
+        print("adsb-monitor startup (ms since process start):", file=file)
+        for name, at in sorted(self.marks.items(), key=lambda item: item[1]):
+            print(f"  {(at - self.started) * 1000:8.1f}  {name}", file=file)
@@ -0,0 +1,322 @@
+"""Unique aircraft seen over time windows, from one bit per ICAO address
+
+Each hour and each UTC day has a bitset with one bit for every 24-bit ICAO
+address, 2 MiB as a file that is memory-mapped and only written where bits
+get set, so on most filesystems it takes up far less disk. Counting the
+aircraft of a window ORs the bitsets of its buckets together and counts the
+set bits, which costs the same however busy the feeder was.
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import re
+import threading
+import time
+
+from .paths import user_data_dir
+
+# One bit per 24-bit ICAO address
+BITSET_BYTES = (1 << 24) // 8
+# Hourly bitsets kept; older windows are counted in whole days
+UNIQUE_HOURLY_RETENTION = 48
+# Daily bitsets kept
+UNIQUE_DAILY_RETENTION = 35
+# Seconds between flushes of the mapped bitsets to disk
+UNIQUE_SAVE_INTERVAL = 300
+
+# Windows counted on every refresh: (key, seconds, title); each is rounded
+# out to whole buckets, so "1h" is the current hour
+UNIQUE_WINDOWS = (
+    ('1h', 3600, "This hour"),
+    ('6h', 6 * 3600, "Last 6 hours"),
+    ('24h', 86400, "Last 24 hours"),
+    ('7d', 7 * 86400, "Last 7 days"),
+    ('30d', 30 * 86400, "Last 30 days"),
+)
+
+_BUCKET_FILE = re.compile(r'([hd])(\d+)\.bits$')
+
+# int.bit_count() is Python 3.10+
+if hasattr(int, 'bit_count'):
+    def _popcount(value):
+        return value.bit_count()
+else:
+    def _popcount(value):
+        return bin(value).count('1')
+
+
+def _read_bits(path):
+    """A bucket file's bits as one int; 0 if it is missing or unreadable"""
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size != BITSET_BYTES:
+                return 0
+            with mmap.mmap(f.fileno(), BITSET_BYTES, access=mmap.ACCESS_READ) as bits:
+                return int.from_bytes(bits, 'little')
+    except (OSError, ValueError):
+        return 0
+
+
+class _Bitset:
+    """A bitset over a writable buffer, with the number of bits set"""
+    def __init__(self, bits, count):
+        self.bits = bits
+        self.count = count
+    
+    def add(self, address):
+        """Set an address's bit; True if it was not set yet"""
+        index = address >> 3
+        mask = 1 << (address & 7)
+        byte = self.bits[index]
+        if byte & mask:
+            return False
+        self.bits[index] = byte | mask
+        self.count += 1
+        return True
+    
+    def value(self):
+        return int.from_bytes(self.bits, 'little')
+
+
+class _Bucket(_Bitset):
+    """The bitset of the current hour or day, mapped for writing
+    
+    Falls back to anonymous memory when the file cannot be mapped, so
+    counting still works for the session.
+    """
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+                if os.fstat(f.fileno()).st_size != BITSET_BYTES:
+                    # Extends sparsely; a file of another size is not ours
+                    f.truncate(0)
+                    f.truncate(BITSET_BYTES)
+                bits = mmap.mmap(f.fileno(), BITSET_BYTES)
+        except (OSError, ValueError):
+            bits = mmap.mmap(-1, BITSET_BYTES)
+        super().__init__(bits, 0)
+        self.count = _popcount(self.value())
+    
+    def flush(self):
+        try:
+            self.bits.flush()
+        except (OSError, ValueError):
+            pass
+    
+    def close(self):
+        self.flush()
+        self.bits.close()
+
+
+class UniqueAircraft:
+    """Counts the distinct aircraft one feeder saw, over any recent window
+    
+    add() sets the bits of a poll's aircraft in the current hour's and
+    day's bitsets. counts() counts whole buckets: hours for windows within
+    UNIQUE_HOURLY_RETENTION and days beyond, reaching back
+    UNIQUE_DAILY_RETENTION days, and reports where each window starts. Only
+    aircraft seen while the monitor was polling are counted.
+    
+    The union of a window's finished buckets is read from disk once per
+    hour, on a thread of its own, and then kept up to date by add(), which
+    only has to look at aircraft new to the current hour. That takes 2 MiB
+    of memory per window but makes counting it again cost next to nothing.
+    """
+    def __init__(self, feeder_url, directory=None):
+        self.root = directory or os.path.join(user_data_dir(), 'unique')
+        self._lock = threading.Lock()
+        self._last_save = time.monotonic()
+        self._hour = self._day = None
+        # Bumped whenever the buckets change, so unions of older ones are dropped
+        self._generation = 0
+        self._building = False
+        self._open(feeder_url)
+    
+    def _open(self, feeder_url):
+        self.feeder_url = feeder_url
+        self.directory = os.path.join(self.root, hashlib.sha1(feeder_url.encode()).hexdigest()[:16])
+        self._hour = self._day = None
+        # {window seconds: _Bitset of its finished buckets' union with the current hour}
+        self._unions = {}
+        self._generation += 1
+    
+    def _path(self, kind, index):
+        return os.path.join(self.directory, f"{kind}{index}.bits")
+    
+    def _roll(self, now):
+        """Switch to the buckets of the current hour and day"""
+        hour, day = int(now // 3600), int(now // 86400)
+        if self._hour is not None and self._hour.path == self._path('h', hour):
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError:
+            pass
+        if self._hour is not None:
+            self._hour.close()
+        self._hour = _Bucket(self._path('h', hour))
+        if self._day is None or self._day.path != self._path('d', day):
+            if self._day is not None:
+                self._day.close()
+            self._day = _Bucket(self._path('d', day))
+        self._unions = {}
+        self._generation += 1
+        self._expire(hour, day)
+    
+    def _expire(self, hour, day):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            match = _BUCKET_FILE.match(name)
+            if not match:
+                continue
+            kind, index = match.group(1), int(match.group(2))
+            if (kind == 'h' and index <= hour - UNIQUE_HOURLY_RETENTION
+                    or kind == 'd' and index <= day - UNIQUE_DAILY_RETENTION):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+    
+    def add(self, feeder_url, rows, now=None):
+        """Take one poll's aircraft rows, keyed by ICAO hex, into account
+        
+        Rows of another feeder than the current one, from a poll that was
+        running when it changed, are ignored, as are non-ICAO addresses.
+        """
+        addresses = []
+        for hex_id in rows:
+            if hex_id.startswith('~'):
+                continue
+            try:
+                addresses.append(int(hex_id, 16) & 0xFFFFFF)
+            except ValueError:
+                pass
+        
+        now = time.time() if now is None else now
+        with self._lock:
+            if feeder_url != self.feeder_url:
+                return
+            self._roll(now)
+            hour, day = self._hour, self._day
+            unions = list(self._unions.values())
+            for address in addresses:
+                day.add(address)
+                if hour.add(address):
+                    for union in unions:
+                        union.add(address)
+        
+        if time.monotonic() - self._last_save >= UNIQUE_SAVE_INTERVAL:
+            self.save()
+    
+    def _window(self, seconds, now):
+        """(finished bucket files, start time) of the window of `seconds` ending at now
+        
+        A window is made of whole buckets: the current hour and as many
+        before it as it takes to cover `seconds`, so it reaches back to the
+        start of an hour, or of a UTC day beyond the hourly retention.
+        """
+        hour_now = int(now // 3600)
+        start_hour = hour_now - max(1, math.ceil(seconds / 3600)) + 1
+        first_hour = hour_now - UNIQUE_HOURLY_RETENTION + 1
+        if start_hour >= first_hour:
+            return [self._path('h', hour) for hour in range(start_hour, hour_now)], start_hour * 3600
+        # Whole days up to where the hourly buckets take over
+        split_day = -(-first_hour // 24)
+        first_day = max(start_hour // 24, int(now // 86400) - UNIQUE_DAILY_RETENTION + 1)
+        finished = ([self._path('d', day) for day in range(first_day, split_day)]
+                    + [self._path('h', hour) for hour in range(split_day * 24, hour_now)])
+        return finished, first_day * 86400
+    
+    def _build_unions(self, generation, now):
+        """Work out the unions of the windows' finished buckets, reading each file once"""
+        unions = {}
+        value = 0
+        included = set()
+        for key, seconds, title in sorted(UNIQUE_WINDOWS, key=lambda window: window[1]):
+            finished, start = self._window(seconds, now)
+            if not finished:
+                continue
+            # Windows mostly contain the shorter ones, whose union carries over
+            if not included <= set(finished):
+                value = 0
+                included = set()
+            for path in finished:
+                if path not in included:
+                    value |= _read_bits(path)
+            included = set(finished)
+            unions[seconds] = value
+        
+        with self._lock:
+            self._building = False
+            # The hour changed, or the feeder was switched or closed meanwhile
+            if generation != self._generation:
+                return
+            hour = self._hour.value()
+            for seconds, value in unions.items():
+                value |= hour
+                self._unions[seconds] = _Bitset(bytearray(value.to_bytes(BITSET_BYTES, 'little')), _popcount(value))
+    
+    def counts(self, feeder_url, now=None, wait=False):
+        """{window key: (distinct aircraft, start time)} for UNIQUE_WINDOWS, plus 'today'
+        
+        The start time is that of the first bucket counted, see _window().
+        Past buckets are not read on the caller's thread: a window whose
+        union is not ready yet is left out and worked out on a thread of its
+        own, unless `wait` is set. None for another feeder than the current
+        one, from a poll that was running when it changed.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if feeder_url != self.feeder_url:
+                return None
+            self._roll(now)
+            generation = self._generation
+            result = {'today': (self._day.count, int(now // 86400) * 86400)}
+            missing = False
+            for key, seconds, title in UNIQUE_WINDOWS:
+                finished, start = self._window(seconds, now)
+                if not finished:
+                    result[key] = (self._hour.count, start)
+                elif seconds in self._unions:
+                    result[key] = (self._unions[seconds].count, start)
+                else:
+                    missing = True
+            if not missing or (self._building and not wait):
+                return result
+            self._building = True
+        
+        if wait:
+            self._build_unions(generation, now)
+            return self.counts(feeder_url, now)
+        threading.Thread(target=self._build_unions, args=(generation, now), name="adsb-unique",
+                         daemon=True).start()
+        return result
+    
+    def save(self):
+        """Flush the mapped bitsets to disk"""
+        with self._lock:
+            self._last_save = time.monotonic()
+            for bucket in (self._hour, self._day):
+                if bucket is not None:
+                    bucket.flush()
+    
+    def close(self):
+        with self._lock:
+            for bucket in (self._hour, self._day):
+                if bucket is not None:
+                    bucket.close()
+            self._hour = self._day = None
+            self._unions = {}
+            self._generation += 1
+    
+    def set_feeder_url(self, feeder_url):
+        """Close this feeder's bitsets and switch to another's"""
+        self.close()
+        with self._lock:
+            self._open(feeder_url)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Compare the aircraft.json and binCraft decoding paths
+
+Builds a synthetic feed of N aircraft in both formats and reports the size
+on the wire and the time to turn each into the rows the aircraft table uses.
+
+    python3 benchmarks/aircraft_decode.py [--aircraft 600] [--rounds 50]
+"""
+
+import argparse
+import gzip
+import json
+import math
+import os
+import random
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from adsbmon import bincraft
+from adsbmon.aircraft import parse_aircraft_json
+
+STRIDE = 112
+
+
+def make_aircraft(count, seed=1):
+    """Aircraft as readsb writes them to aircraft.json"""
+    rng = random.Random(seed)
+    aircraft = []
+    for i in range(count):
+        on_ground = rng.random() < 0.05
+        ac = {
+            'hex': f"{rng.randrange(1 << 24):06x}",
+            'type': 'adsb_icao',
+            'flight': f"{rng.choice(['DLH', 'RYR', 'BAW', 'EZY'])}{rng.randrange(10000):<5}",
+            'alt_baro': 'ground' if on_ground else rng.randrange(0, 1600) * 25,
+            'alt_geom': rng.randrange(0, 1600) * 25,
+            'gs': round(rng.uniform(0, 520), 1),
+            'ias': rng.randrange(0, 350),
+            'tas': rng.randrange(0, 500),
+            'mach': round(rng.uniform(0, 0.85), 3),
+            'track': round(rng.uniform(0, 360), 2),
+            'track_rate': round(rng.uniform(-3, 3), 2),
+            'roll': round(rng.uniform(-30, 30), 2),
+            'mag_heading': round(rng.uniform(0, 360), 2),
+            'baro_rate': rng.randrange(-500, 500) * 8,
+            'geom_rate': rng.randrange(-500, 500) * 8,
+            'squawk': f"{rng.randrange(8 ** 4):04o}",
+            'emergency': 'none',
+            'category': 'A3',
+            'nav_qnh': 1013.2,
+            'nav_altitude_mcp': 36000,
+            'lat': round(rng.uniform(45, 55), 6),
+            'lon': round(rng.uniform(0, 15), 6),
+            'nic': 8,
+            'rc': 186,
+            'seen_pos': round(rng.uniform(0, 5), 1),
+            'version': 2,
+            'nic_baro': 1,
+            'nac_p': 9,
+            'nac_v': 1,
+            'sil': 3,
+            'sil_type': 'perhour',
+            'gva': 2,
+            'sda': 2,
+            'mlat': [],
+            'tisb': [],
+            'messages': rng.randrange(100000),
+            'seen': round(rng.uniform(0, 5), 1),
+            'rssi': round(rng.uniform(-30, -3), 1),
+        }
+        if i % 10 == 0:
+            # Some aircraft without a position
+            del ac['lat'], ac['lon']
+        aircraft.append(ac)
+    return aircraft
+
+
+def encode_json(aircraft):
+    return json.dumps({'now': time.time(), 'messages': 1, 'aircraft': aircraft}).encode()
+
+
+def encode_bincraft(aircraft):
+    """Pack aircraft into binCraft records at the offsets tar1090 reads"""
+    now_ms = int(time.time() * 1000)
+    header = bytearray(STRIDE)
+    struct.pack_into('<IIII', header, 0, now_ms & 0xFFFFFFFF, now_ms >> 32, STRIDE, len(aircraft))
+    out = [bytes(header)]
+    for ac in aircraft:
+        record = bytearray(STRIDE)
+        struct.pack_into('<i', record, 0, int(ac['hex'], 16))
+        valid = bincraft.VALID_FLIGHT | bincraft.VALID_GS
+        if 'lat' in ac:
+            struct.pack_into('<ii', record, 8, round(ac['lon'] * 1e6), round(ac['lat'] * 1e6))
+            valid |= bincraft.VALID_POSITION
+        struct.pack_into('<hh', record, 16, ac['baro_rate'] // 8, ac['geom_rate'] // 8)
+        if ac['alt_baro'] == 'ground':
+            record[68] = 1
+        else:
+            struct.pack_into('<h', record, 20, ac['alt_baro'] // 25)
+            valid |= bincraft.VALID_ALT_BARO
+        struct.pack_into('<H', record, 32, int(ac['squawk'], 16))
+        struct.pack_into('<h', record, 34, round(ac['gs'] * 10))
+        struct.pack_into('<h', record, 40, round(ac['track'] * 90))
+        record[73] = valid
+        record[74] = bincraft.VALID2_TRACK
+        record[75] = bincraft.VALID3_BARO_RATE | bincraft.VALID3_GEOM_RATE
+        record[76] = bincraft.VALID4_SQUAWK
+        record[78:86] = ac['flight'].encode().ljust(8, b'\0')[:8]
+        record[105] = min(255, round(math.sqrt(10 ** (ac['rssi'] / 10) * 65025)))
+        out.append(bytes(record))
+    return b''.join(out)
+
+
+def zstd_compress(data):
+    try:
+        from compression import zstd
+        return zstd.compress(data)
+    except ImportError:
+        import zstandard
+        return zstandard.ZstdCompressor().compress(data)
+
+
+def timed(func, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--aircraft", type=int, default=600)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    
+    if not bincraft.available():
+        sys.exit("numpy is needed for the binCraft path")
+    
+    aircraft = make_aircraft(args.aircraft)
+    json_body = encode_json(aircraft)
+    bincraft_body = encode_bincraft(aircraft)
+    
+    json_rows = parse_aircraft_json(json.loads(json_body))
+    bincraft_rows = bincraft.decode_aircraft(bincraft_body)
+    assert json_rows.keys() == bincraft_rows.keys()
+    
+    print(f"{args.aircraft} aircraft, best of {args.rounds} rounds\n")
+    print(f"{'format':<20}{'bytes':>10}{'decode ms':>12}")
+    json_time = timed(lambda: parse_aircraft_json(json.loads(json_body)), args.rounds)
+    print(f"{'aircraft.json':<20}{len(json_body):>10}{json_time * 1000:>12.2f}")
+    print(f"{'aircraft.json gzip':<20}{len(gzip.compress(json_body)):>10}{'':>12}")
+    bincraft_time = timed(lambda: bincraft.decode_aircraft(bincraft_body), args.rounds)
+    print(f"{'binCraft':<20}{len(bincraft_body):>10}{bincraft_time * 1000:>12.2f}")
+    if bincraft.zstd_available():
+        compressed = zstd_compress(bincraft_body)
+        zstd_time = timed(lambda: bincraft.decode_aircraft(bincraft.zstd_decompress(compressed)),
+                          args.rounds)
+        print(f"{'binCraft zstd':<20}{len(compressed):>10}{zstd_time * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
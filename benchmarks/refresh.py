@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Measure feeder refreshes end to end against a local fake feeder
+
+Starts tools/fake_feeder.py in-process and runs back-to-back refreshes of a
+FeederPoller on a PollingEngine, reporting refresh latency percentiles,
+requests per refresh, threads alive and, with --ui, the main-thread time of
+applying each result to the window. Warm refreshes fetch what is due by
+ENDPOINT_CADENCES and take the rest from the response cache, as the app
+does; cold ones, on a second poller with every cadence at 0, fetch every
+endpoint each time and show the fan-out of a full refresh.
+    
+    python3 benchmarks/refresh.py [--cycles 50] [--latency 30] [--error-rate 0.05] [--ui]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+
+import fake_feeder
+from adsbmon.aggregators import AggregatorDiscovery
+from adsbmon.connection import DEFAULT_MAX_CONCURRENT_REQUESTS
+from adsbmon.engine import PollingEngine
+from adsbmon.poller import ENDPOINT_CADENCES, FeederPoller
+
+# Seconds a refresh may take before the benchmark gives up on it
+CYCLE_TIMEOUT = 30
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def make_window(engine, poller):
+    """The GTK window, for timing _update_ui; None without GTK or a display"""
+    try:
+        from adsbmon import gui
+        from gi.repository import Gtk
+        if not Gtk.init_check():
+            return None
+        return gui.ADSBMonitorWindow(engine=engine, poller=poller)
+    except (ImportError, ValueError, RuntimeError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENT_REQUESTS,
+                        help="parallel requests per refresh")
+    parser.add_argument("--aircraft-feed", action="store_true", help="fetch the aircraft list too")
+    parser.add_argument("--ui", action="store_true", help="time applying results to the window (needs GTK)")
+    fake_feeder.add_arguments(parser)
+    args = parser.parse_args()
+    
+    feeder = fake_feeder.feeder_from_arguments(args, seed=1)
+    server = fake_feeder.make_server(feeder)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    feeder_url = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        engine = PollingEngine(max_workers=args.concurrency)
+        # A fresh discovery, so the first refresh probes every aggregator
+        discovery = AggregatorDiscovery(os.path.join(cache_dir, 'aggregators.json'))
+        results = []
+        done = threading.Event()
+        
+        def on_result(poller, seq, data, error):
+            results.append((time.perf_counter(), data, error, threading.active_count()))
+            done.set()
+        
+        def add_poller(cadences=None):
+            poller = FeederPoller(feeder_url, discovery, max_concurrency=args.concurrency, cadences=cadences)
+            poller.track_aircraft = args.aircraft_feed
+            # Refreshes are only started by run_refresh()
+            engine.add(poller, 3600, start_delay=3600)
+            engine.subscribe(poller, on_result)
+            return poller
+        
+        def received(poller):
+            """(decoded, on the wire) response bytes received so far"""
+            endpoints = [stats for endpoint, stats in poller.diagnostics.endpoint_stats()]
+            return sum(stats.bytes for stats in endpoints), sum(stats.wire_bytes for stats in endpoints)
+        
+        def run_refresh(poller):
+            """Refresh once; return (seconds, requests sent, data, error, threads alive)"""
+            done.clear()
+            before = feeder.requests
+            started = time.perf_counter()
+            engine.refresh(poller)
+            if not done.wait(CYCLE_TIMEOUT):
+                sys.exit(f"a refresh did not finish within {CYCLE_TIMEOUT} s")
+            finished, data, error, alive = results[-1]
+            return finished - started, feeder.requests - before, data, error, alive
+        
+        def run_cycles(poller, window=None):
+            """Run args.cycles refreshes and collect what is reported of them"""
+            bytes_before = received(poller)
+            cycles = {'latencies': [], 'requests': [], 'threads': [], 'ui_times': [], 'failed': 0}
+            for cycle in range(args.cycles):
+                latency, sent, data, error, alive = run_refresh(poller)
+                cycles['latencies'].append(latency)
+                cycles['requests'].append(sent)
+                cycles['threads'].append(alive)
+                if error or not data.get('stage2_stats'):
+                    cycles['failed'] += 1
+                if window is not None:
+                    ui_started = time.perf_counter()
+                    window._update_ui(data, error)
+                    cycles['ui_times'].append(time.perf_counter() - ui_started)
+            cycles['decoded'], cycles['wire'] = (now - before for now, before in zip(received(poller), bytes_before))
+            return cycles
+        
+        poller = add_poller()
+        # The first refresh probes every aggregator, so it is reported apart
+        first_latency, first_requests, *_ = run_refresh(poller)
+        
+        window = make_window(engine, poller) if args.ui else None
+        if args.ui and window is None:
+            print("--ui: skipped, GTK or a display is not available\n")
+        warm = run_cycles(poller, window)
+        
+        cold_poller = add_poller({key: 0 for key in ENDPOINT_CADENCES})
+        # Only to open its connections
+        run_refresh(cold_poller)
+        cold = run_cycles(cold_poller)
+        
+        engine.shutdown()
+        server.shutdown()
+    
+    print(f"{args.cycles} refreshes each, {args.latency:g}±{args.jitter:g} ms latency, "
+          f"{args.error_rate:.0%} errors, {args.concurrency} parallel requests\n")
+    print(f"{'':<26}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+    rows = [("warm refresh ms", [value * 1000 for value in warm['latencies']]),
+            ("cold refresh ms", [value * 1000 for value in cold['latencies']])]
+    if warm['ui_times']:
+        rows.append(("_update_ui ms", [value * 1000 for value in warm['ui_times']]))
+    for name, values in rows:
+        print(f"{name:<26}" + "".join(f"{percentile(values, fraction):>9.1f}" for fraction in (0.5, 0.9, 0.99))
+              + f"{max(values):>9.1f}")
+    print()
+    print(f"first refresh             {first_latency * 1000:.1f} ms, {first_requests} requests")
+    for name, cycles in (("warm", warm), ("cold", cold)):
+        print()
+        print(f"{name + ' requests/refresh':<26}mean {statistics.mean(cycles['requests']):.1f}, "
+              f"max {max(cycles['requests'])}")
+        print(f"{name + ' KiB/refresh':<26}{cycles['wire'] / args.cycles / 1024:.1f} on the wire, "
+              f"{cycles['decoded'] / args.cycles / 1024:.1f} decoded")
+        print(f"{name + ' threads alive':<26}max {max(cycles['threads'])}, last {cycles['threads'][-1]}")
+        print(f"{name + ' without stats':<26}{cycles['failed']}")
+
+
+if __name__ == "__main__":
+    main()
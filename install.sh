@@ -18,16 +18,17 @@ install_dependencies() {
         sudo apt install -y python3-gi python3-gi-cairo gir1.2-gtk-4.0 gir1.2-adw-1
     elif command -v dnf &> /dev/null; then
         # Fedora
-        sudo dnf install -y python3-gobject gtk4 libadwaita
+        sudo dnf install -y python3-gobject python3-cairo gtk4 libadwaita
     elif command -v pacman &> /dev/null; then
         # Arch Linux
-        sudo pacman -S --noconfirm python-gobject gtk4 libadwaita
+        sudo pacman -S --noconfirm python-gobject python-cairo gtk4 libadwaita
     elif command -v zypper &> /dev/null; then
         # openSUSE
-        sudo zypper install -y python3-gobject gtk4 libadwaita
+        sudo zypper install -y python3-gobject python3-gobject-cairo gtk4 libadwaita
     else
         echo "❌ Unsupported package manager. Please install dependencies manually:"
         echo "   - python3-gi (PyGObject)"
+        echo "   - pycairo with PyGObject cairo support"
         echo "   - GTK 4"
         echo "   - libadwaita"
         exit 1
@@ -44,6 +45,8 @@ install_app() {
     
     # Copy files
     sudo cp adsb_monitor.py /opt/adsb-monitor/
+    sudo rm -rf /opt/adsb-monitor/adsbmon
+    sudo cp -r adsbmon /opt/adsb-monitor/
     sudo chmod +x /opt/adsb-monitor/adsb_monitor.py
     
     # Install desktop file
@@ -0,0 +1,47 @@
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+# The fake servers double as frame and data generators
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+
+
+@pytest.fixture
+def serve_feeder():
+    """Start fake feeders: serve_feeder(**FakeFeeder settings) -> (feeder, url)"""
+    import fake_feeder
+    servers = []
+    
+    def serve(**settings):
+        feeder = fake_feeder.FakeFeeder(seed=1, **settings)
+        server = fake_feeder.make_server(feeder)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        servers.append(server)
+        return feeder, f"http://127.0.0.1:{server.server_address[1]}"
+    
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def discovery(tmp_path):
+    from adsbmon.aggregators import AggregatorDiscovery
+    return AggregatorDiscovery(str(tmp_path / 'aggregators.json'))
+
+
+def run_refresh(poller):
+    """Run one refresh of a FeederPoller on the calling thread; (data, error)"""
+    jobs, context = poller.plan()
+    results = {key: func(*args) for key, (func, *args) in jobs.items()}
+    return poller.assemble(context, results)
+
+
+@pytest.fixture
+def refresh():
+    return run_refresh
@@ -0,0 +1,65 @@
+from adsbmon import aggregators
+from adsbmon.aggregators import AGGREGATORS, DISCOVERY_MISS_LIMIT, AggregatorDiscovery, aggregator_health
+from adsbmon.poller import FeederPoller
+
+FEEDER = "http://feeder"
+ALL = [agg_id for agg_id, name in AGGREGATORS]
+
+
+def answers(configured, asked=ALL):
+    """Statuses as FeederPoller._fetch_aggregator_status returns them"""
+    return {agg_id: (True, {'beast': 'good'} if agg_id in configured else None) for agg_id in asked}
+
+
+def test_learns_the_configured_aggregators(tmp_path):
+    path = str(tmp_path / 'aggregators.json')
+    discovery = AggregatorDiscovery(path)
+    assert discovery.plan(FEEDER) == (ALL, True)
+    discovery.record(FEEDER, answers({'adsblol', 'opensky'}), True)
+    assert discovery.plan(FEEDER) == (['adsblol', 'opensky'], False)
+    
+    # The next start goes straight to the short list
+    assert AggregatorDiscovery(path).plan(FEEDER) == (['adsblol', 'opensky'], False)
+
+
+def test_unanswered_requests_teach_nothing(discovery):
+    discovery.record(FEEDER, answers({'adsblol'}), True)
+    discovery.record(FEEDER, {'adsblol': (False, None)}, False)
+    assert discovery.plan(FEEDER) == (['adsblol'], False)
+
+
+def test_forgets_after_repeated_misses(discovery):
+    discovery.record(FEEDER, answers({'adsblol', 'opensky'}), True)
+    for _ in range(DISCOVERY_MISS_LIMIT - 1):
+        discovery.record(FEEDER, answers({'opensky'}, ['adsblol', 'opensky']), False)
+    assert discovery.plan(FEEDER)[0] == ['adsblol', 'opensky']
+    # An answer in between starts the count over
+    discovery.record(FEEDER, answers({'adsblol', 'opensky'}, ['adsblol', 'opensky']), False)
+    for _ in range(DISCOVERY_MISS_LIMIT):
+        discovery.record(FEEDER, answers({'opensky'}, ['adsblol', 'opensky']), False)
+    assert discovery.plan(FEEDER)[0] == ['opensky']
+
+
+def test_probes_everything_again_after_the_interval(discovery, monkeypatch):
+    discovery.record(FEEDER, answers({'adsblol'}), True)
+    monkeypatch.setattr(aggregators, 'DISCOVERY_INTERVAL', 0)
+    assert discovery.plan(FEEDER) == (ALL, True)
+
+
+def test_poller_asks_only_configured_aggregators(serve_feeder, discovery, refresh):
+    feeder, url = serve_feeder(aggregators=("adsbfi", "flightradar"))
+    poller = FeederPoller(url, discovery, cadences={'status': 0})
+    data, error = refresh(poller)
+    assert [agg['id'] for agg in data['aggregators']] == ["adsbfi", "flightradar"]
+    
+    jobs, context = poller.plan()
+    assert sorted(key[1] for key in jobs if isinstance(key, tuple)) == ["adsbfi", "flightradar"]
+
+
+def test_aggregator_health():
+    assert aggregator_health([
+        {'beast': 'good', 'mlat': 'good'},
+        {'beast': 'good', 'mlat': 'unknown'},
+        {'beast': 'good', 'mlat': 'disconnected'},
+        {'beast': 'disconnected', 'mlat': 'good'},
+    ]) == (2, 4)
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from adsbmon.aircraft import parse_aircraft_json
+
+
+def test_parse_aircraft_json():
+    doc = json.loads('''{"now": 1, "aircraft": [
+        {"hex": "4840d6", "flight": "KLM1234 ", "squawk": "7700", "alt_baro": 35012, "gs": 450.4,
+         "track": 179.6, "baro_rate": -640, "lat": 52.308611, "lon": 4.763889, "rssi": -12.34},
+        {"hex": "~abcdef", "alt_baro": "ground", "geom_rate": 64},
+        {"hex": "000001", "flight": 7, "squawk": 1200, "gs": NaN, "track": Infinity, "lat": "52"},
+        {"flight": "NOHEX"},
+        "not an aircraft",
+        {"hex": 123}
+    ]}''')
+    assert parse_aircraft_json(doc) == {
+        '4840d6': ('KLM1234', '7700', 35012, 450, 180, -640, 52.3086, 4.7639, -12.3),
+        '~abcdef': (None, None, 'ground', None, None, 64, None, None, None),
+        '000001': (None, None, None, None, None, None, None, None, None),
+    }
+
+
+@pytest.mark.parametrize('doc', [[], "aircraft", None, {'aircraft': {'hex': '4840d6'}}])
+def test_not_aircraft_json(doc):
+    with pytest.raises(ValueError):
+        parse_aircraft_json(doc)
+
+
+def test_no_aircraft():
+    assert parse_aircraft_json({'now': 1}) == {}
+    assert parse_aircraft_json({'aircraft': None}) == {}
@@ -0,0 +1,76 @@
+import random
+
+from adsbmon.beast import ESCAPE, FRAME_MODE_AC, FRAME_MODE_S_LONG, FRAME_MODE_S_SHORT, BeastFramer
+from fake_beast import encode_frame, random_frame
+
+
+def payload(timestamp, signal, message):
+    return timestamp.to_bytes(6, 'big') + bytes([signal]) + message
+
+
+# Frames with 0x1A in the timestamp, the signal level and the message
+ESCAPED = [
+    (FRAME_MODE_S_LONG, 0x1a1a00001a00, 0x1a, bytes.fromhex('8d1a1a1a0000000000000000001a')),
+    (FRAME_MODE_S_SHORT, 1234, 0x1a, bytes.fromhex('5d1a2b3c4d5e1a')),
+    (FRAME_MODE_AC, 0x1a, 40, b'\x1a\x1a'),
+]
+
+
+def test_frames_with_escapes():
+    data = b''.join(encode_frame(*frame) for frame in ESCAPED)
+    assert BeastFramer().feed(data) == [(kind, payload(*rest)) for kind, *rest in ESCAPED]
+
+
+def test_escapes_split_across_reads():
+    data = b''.join(encode_frame(*frame) for frame in ESCAPED)
+    expected = [(kind, payload(*rest)) for kind, *rest in ESCAPED]
+    # Every split point, including between the two bytes of an escaped 0x1A
+    for split in range(1, len(data)):
+        framer = BeastFramer()
+        assert framer.feed(data[:split]) + framer.feed(data[split:]) == expected, split
+    
+    framer = BeastFramer()
+    assert [frame for byte in data for frame in framer.feed(bytes([byte]))] == expected
+
+
+def test_random_stream_through_a_small_buffer():
+    rng = random.Random(1)
+    frames = [random_frame(rng, timestamp) for timestamp in range(2000)]
+    data = b''.join(frames)
+    framer = BeastFramer(size=64)
+    received = []
+    pos = 0
+    while pos < len(data):
+        count = rng.randint(1, 100)
+        received += framer.feed(data[pos:pos + count])
+        pos += count
+    
+    assert len(received) == len(frames)
+    assert [kind for kind, _ in received] == [frame[1] for frame in frames]
+    assert [encode_frame(kind, int.from_bytes(body[:6], 'big'), body[6], body[7:])
+            for kind, body in received] == frames
+    assert framer.bad_frames == 0
+
+
+def test_resync_after_garbage():
+    frame = encode_frame(FRAME_MODE_S_SHORT, 99, 50, bytes(range(7)))
+    # Garbage without 0x1A, then an escaped 0x1A and an unknown frame type
+    garbage = b'\x00\xffgarbage' + bytes([ESCAPE, ESCAPE, ESCAPE, 0x7f])
+    assert BeastFramer().feed(garbage + frame + garbage + frame) == [(FRAME_MODE_S_SHORT, payload(99, 50, bytes(range(7))))] * 2
+
+
+def test_resync_after_a_frame_cut_short():
+    long_frame = encode_frame(FRAME_MODE_S_LONG, 1, 2, bytes(14))
+    short_frame = encode_frame(FRAME_MODE_S_SHORT, 3, 4, bytes(7))
+    framer = BeastFramer()
+    frames = framer.feed(long_frame[:10] + short_frame + short_frame)
+    
+    assert frames == [(FRAME_MODE_S_SHORT, payload(3, 4, bytes(7)))] * 2
+    assert framer.bad_frames == 1
+
+
+def test_partial_frame_waits_for_the_next_read():
+    frame = encode_frame(FRAME_MODE_S_LONG, 5, 6, bytes(range(14)))
+    framer = BeastFramer()
+    assert framer.feed(frame[:-1]) == []
+    assert framer.feed(frame[-1:]) == [(FRAME_MODE_S_LONG, payload(5, 6, bytes(range(14))))]
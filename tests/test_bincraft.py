@@ -0,0 +1,64 @@
+import struct
+
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+from adsbmon import bincraft
+
+STRIDE = 112
+
+
+def make_buffer(records):
+    """A binCraft buffer: a header stride followed by the given records"""
+    array = numpy.zeros(len(records), dtype=bincraft.record_dtype(STRIDE))
+    for index, fields in enumerate(records):
+        for name, value in fields.items():
+            array[index][name] = value
+    header = bytearray(STRIDE)
+    struct.pack_into('<I', header, 8, STRIDE)
+    return bytes(header) + array.tobytes()
+
+
+def test_decode_aircraft():
+    data = make_buffer([
+        {
+            'addr': 0x4840d6,
+            'flight': b'KLM1234 ',
+            'squawk': 0x7700,
+            'alt_baro': 1400,
+            'gs': 4505,
+            'track': 90 * 180,
+            'baro_rate': -80,
+            'lat': 52308611,
+            'lon': 4763889,
+            'rssi': 255,
+            'valid': bincraft.VALID_FLIGHT | bincraft.VALID_ALT_BARO | bincraft.VALID_GS | bincraft.VALID_POSITION,
+            'valid2': bincraft.VALID2_TRACK,
+            'valid3': bincraft.VALID3_BARO_RATE,
+            'valid4': bincraft.VALID4_SQUAWK,
+        },
+        {
+            'addr': 0xabcdef | bincraft.NON_ICAO_FLAG,
+            'geom_rate': 10,
+            'airground': 1,
+            'valid3': bincraft.VALID3_GEOM_RATE,
+        },
+    ])
+    aircraft = bincraft.decode_aircraft(data)
+    
+    assert aircraft['4840d6'] == ('KLM1234', '7700', 35000, 450, 180, -640, 52.3086, 4.7639, 0.0)
+    flight, squawk, altitude, speed, track, vert_rate, lat, lon, rssi = aircraft['~abcdef']
+    assert (flight, squawk, altitude, speed, track, vert_rate, lat, lon) == (
+        None, None, 'ground', None, None, 80, None, None)
+    assert rssi < -40
+
+
+def test_decode_empty_and_invalid():
+    assert bincraft.decode_aircraft(make_buffer([])) == {}
+    with pytest.raises(ValueError):
+        bincraft.decode_aircraft(b'short')
+    header = bytearray(STRIDE)
+    struct.pack_into('<I', header, 8, 50)
+    with pytest.raises(ValueError):
+        bincraft.decode_aircraft(bytes(header))
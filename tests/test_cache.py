@@ -0,0 +1,50 @@
+from adsbmon.poller import FeederPoller, ResponseCache
+
+
+def test_response_cache():
+    cache = ResponseCache()
+    assert cache.due('stats', 30, 100)
+    assert cache.get('stats', 'none') == 'none'
+    cache.put('stats', {'planes': 3}, 100)
+    assert not cache.due('stats', 30, 129)
+    assert cache.due('stats', 30, 130)
+    # A value is kept however old, until it is replaced
+    assert cache.get('stats') == {'planes': 3}
+    assert cache.due('stats', 0, 100)
+
+
+def test_slow_endpoints_come_from_the_cache(serve_feeder, discovery, refresh):
+    feeder, url = serve_feeder(aggregators=("adsblol",))
+    poller = FeederPoller(url, discovery)
+    first, error = refresh(poller)
+    requests = feeder.requests
+    second, error = refresh(poller)
+    
+    # Only the stats are due on every refresh
+    assert feeder.requests - requests == 1
+    assert error is None
+    for key in ('temperatures', 'aggregators', 'feeder_name'):
+        assert second[key] == first[key]
+    assert second['stage2_stats'] is not first['stage2_stats']
+
+
+def test_cadences_can_be_overridden(serve_feeder, discovery, refresh):
+    feeder, url = serve_feeder(aggregators=("adsblol",))
+    poller = FeederPoller(url, discovery, cadences={'temperatures': 0, 'status': 0})
+    refresh(poller)
+    requests = feeder.requests
+    refresh(poller)
+    # Stats, temperatures and the one configured aggregator
+    assert feeder.requests - requests == 3
+
+
+def test_failed_fetch_is_retried_next_refresh(serve_feeder, discovery, refresh):
+    feeder, url = serve_feeder(aggregators=("adsblol",))
+    poller = FeederPoller(url, discovery)
+    feeder.error_rate = 1.0
+    data, error = refresh(poller)
+    assert 'temperatures' not in data
+    
+    feeder.error_rate = 0.0
+    jobs, context = poller.plan()
+    assert 'temperatures' in jobs
@@ -0,0 +1,81 @@
+import gzip
+import io
+import zlib
+
+import pytest
+
+from adsbmon import connection
+from adsbmon.connection import DecodedResponse, _Decompressor
+
+BODY = b'{"aircraft": [' + b','.join(b'{"hex": "%06x", "rssi": -20.5}' % i for i in range(2000)) + b']}'
+
+
+class FakeResponse:
+    """Just enough of http.client.HTTPResponse, reading in small chunks"""
+    def __init__(self, body, encoding=None, chunk=100):
+        self.status = 200
+        self.headers = {'Content-Encoding': encoding} if encoding else {}
+        self._body = io.BytesIO(body)
+        self._chunk = chunk
+    
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+    
+    def read(self, amt=None):
+        return self._body.read() if amt is None else self._body.read(min(amt, self._chunk))
+
+
+def encodings():
+    yield 'gzip', gzip.compress(BODY)
+    yield 'deflate', zlib.compress(BODY)
+    raw = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    yield 'deflate', raw.compress(BODY) + raw.flush()
+    if connection._zstd is not None:
+        if hasattr(connection._zstd, 'ZstdCompressor') and hasattr(connection._zstd.ZstdCompressor(), 'compress'):
+            yield 'zstd', connection._zstd.ZstdCompressor().compress(BODY)
+        else:
+            yield 'zstd', connection._zstd.compress(BODY)
+
+
+@pytest.mark.parametrize('encoding, data', list(encodings()))
+def test_decoded_read_all(encoding, data):
+    response = DecodedResponse(FakeResponse(data, encoding))
+    assert bytes(response.read()) == BODY
+    assert response.wire_bytes == len(data)
+    assert response.bytes == len(BODY)
+
+
+@pytest.mark.parametrize('encoding, data', list(encodings()))
+def test_decoded_read_in_parts(encoding, data):
+    response = DecodedResponse(FakeResponse(data, encoding))
+    parts = []
+    while True:
+        part = response.read(1000)
+        if not part:
+            break
+        assert len(part) <= 1000
+        parts.append(part)
+    assert b''.join(parts) == BODY
+
+
+def test_identity():
+    response = DecodedResponse(FakeResponse(BODY))
+    assert response.read() == BODY
+    assert response.wire_bytes == response.bytes == len(BODY)
+
+
+@pytest.mark.parametrize('encoding, data', list(encodings()))
+def test_truncated(encoding, data):
+    response = DecodedResponse(FakeResponse(data[:len(data) // 2], encoding))
+    with pytest.raises(ValueError):
+        response.read()
+
+
+def test_invalid_data():
+    with pytest.raises(ValueError):
+        DecodedResponse(FakeResponse(b'not gzip at all', 'gzip')).read()
+
+
+def test_unsupported_encoding():
+    with pytest.raises(ValueError):
+        _Decompressor('br')
@@ -0,0 +1,75 @@
+import socket
+import threading
+
+import pytest
+
+from adsbmon.diagnostics import RequestDiagnostics, classify_error
+
+
+class Response:
+    def __init__(self, status, size):
+        self.status = status
+        self.bytes = size
+        self.wire_bytes = size // 2
+
+
+def test_request_outcomes():
+    diagnostics = RequestDiagnostics()
+    with diagnostics.request("/api/stage2_stats") as request:
+        request.record(Response(200, 1000))
+    with diagnostics.request("/api/stage2_stats") as request:
+        request.record(Response(503, 10))
+    with pytest.raises(socket.timeout):
+        with diagnostics.request("/api/stage2_stats"):
+            raise socket.timeout("timed out")
+    
+    stats = diagnostics.snapshot()['endpoints']["/api/stage2_stats"]
+    assert (stats['requests'], stats['bytes'], stats['wire_bytes']) == (3, 1010, 505)
+    assert stats['errors'] == {'http_5xx': 1, 'timeout': 1}
+    assert stats['last_error']['message'] == "timed out"
+    assert diagnostics.last_error()[1] == 'timeout'
+    assert diagnostics.last_error(since=stats['last_error']['time'] + 1) is None
+
+
+def test_classify_error():
+    assert classify_error(ConnectionRefusedError()) == 'refused'
+    assert classify_error(socket.gaierror()) == 'dns'
+    assert classify_error(ValueError()) == 'decode'
+    assert classify_error(KeyError()) == 'other'
+
+
+def test_readers_while_requests_add_endpoints():
+    diagnostics = RequestDiagnostics()
+    done = threading.Event()
+    failures = []
+    
+    def work(worker):
+        for index in range(2000):
+            try:
+                with diagnostics.request(f"/{worker}/{index}") as request:
+                    request.status = 500 + index % 5
+            except Exception as e:
+                failures.append(e)
+    
+    workers = [threading.Thread(target=work, args=(worker,)) for worker in range(4)]
+    for thread in workers:
+        thread.start()
+    
+    def read():
+        while not done.is_set():
+            try:
+                diagnostics.snapshot()
+                diagnostics.endpoint_stats()
+                diagnostics.last_error()
+            except RuntimeError as e:
+                failures.append(e)
+                return
+    
+    reader = threading.Thread(target=read)
+    reader.start()
+    for thread in workers:
+        thread.join()
+    done.set()
+    reader.join()
+    assert failures == []
+    assert len(diagnostics.endpoint_stats()) == 8000
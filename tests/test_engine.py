@@ -0,0 +1,204 @@
+import threading
+import time
+
+from adsbmon import engine as engine_module
+from adsbmon.engine import PollingEngine
+from adsbmon.poller import FeederPoller
+
+# Seconds a test waits for something the engine should do at once
+TIMEOUT = 5
+
+
+class FakePoller:
+    """A poller whose jobs are the given functions, assembled as {key: result}"""
+    def __init__(self, jobs, max_concurrency=2):
+        self.jobs = jobs
+        self.max_concurrency = max_concurrency
+        self.plans = 0
+    
+    def plan(self):
+        self.plans += 1
+        return {key: (func,) for key, func in self.jobs.items()}, {}
+    
+    def assemble(self, context, results):
+        return dict(results), None
+    
+    def retry_delay(self):
+        return None
+    
+    def changed(self, previous, data):
+        return True
+
+
+class Results:
+    """Collects what a subscriber is handed"""
+    def __init__(self):
+        self.items = []
+        self._cond = threading.Condition()
+    
+    def __call__(self, poller, seq, data, error):
+        with self._cond:
+            self.items.append((seq, data, error))
+            self._cond.notify_all()
+    
+    def wait(self, count):
+        with self._cond:
+            assert self._cond.wait_for(lambda: len(self.items) >= count, TIMEOUT), self.items
+        return self.items
+
+
+def start(poller, **kwargs):
+    """An engine polling poller only when refreshed, and its results"""
+    engine = PollingEngine(**kwargs)
+    engine.add(poller, 3600, start_delay=3600)
+    results = Results()
+    engine.subscribe(poller, results)
+    return engine, results
+
+
+def test_results_in_sequence():
+    poller = FakePoller({'a': lambda: 1})
+    engine = PollingEngine()
+    results = Results()
+    engine.add(poller, 0.01)
+    engine.subscribe(poller, results)
+    items = results.wait(5)
+    engine.shutdown()
+    seqs = [seq for seq, data, error in items]
+    assert seqs == sorted(seqs) and len(set(seqs)) == len(seqs)
+    assert all(data == {'a': 1} for seq, data, error in items)
+
+
+def test_one_refresh_in_flight():
+    release = threading.Event()
+    poller = FakePoller({'slow': lambda: release.wait(TIMEOUT)})
+    engine, results = start(poller)
+    engine.refresh(poller)
+    time.sleep(0.1)
+    # Coalesced into the refresh in flight
+    for _ in range(5):
+        engine.refresh(poller)
+    time.sleep(0.1)
+    assert poller.plans == 1
+    release.set()
+    assert results.wait(1) == [(1, {'slow': True}, None)]
+    time.sleep(0.1)
+    engine.shutdown()
+    assert poller.plans == 1
+
+
+def test_concurrency_per_feeder():
+    lock = threading.Lock()
+    running = []
+    peak = []
+    
+    def job():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+        return True
+    
+    poller = FakePoller({key: job for key in range(6)}, max_concurrency=2)
+    engine, results = start(poller, max_workers=8)
+    engine.refresh(poller)
+    seq, data, error = results.wait(1)[0]
+    engine.shutdown()
+    assert data == {key: True for key in range(6)}
+    assert max(peak) == 2
+
+
+def test_deadline_delivers_what_answered(monkeypatch):
+    monkeypatch.setattr(engine_module, 'FETCH_DEADLINE', 0.3)
+    release = threading.Event()
+    poller = FakePoller({'fast': lambda: 'ok', 'stuck': lambda: release.wait(TIMEOUT)})
+    engine, results = start(poller)
+    started = time.monotonic()
+    engine.refresh(poller)
+    seq, data, error = results.wait(1)[0]
+    elapsed = time.monotonic() - started
+    release.set()
+    engine.shutdown()
+    assert data == {'fast': 'ok'}
+    assert 0.25 < elapsed < 2
+
+
+def test_invalidate_drops_the_refresh_in_flight():
+    release = threading.Event()
+    values = iter(['stale', 'fresh'])
+    
+    def job():
+        release.wait(TIMEOUT)
+        return next(values)
+    
+    poller = FakePoller({'value': job})
+    engine, results = start(poller)
+    engine.refresh(poller)
+    time.sleep(0.1)
+    engine.invalidate(poller)
+    release.set()
+    # The dropped refresh is followed by another right away
+    assert results.wait(1) == [(2, {'value': 'fresh'}, None)]
+    engine.shutdown()
+
+
+def test_subscriber_gets_the_last_result():
+    poller = FakePoller({'a': lambda: 1})
+    engine, results = start(poller)
+    engine.refresh(poller)
+    results.wait(1)
+    late = Results()
+    engine.subscribe(poller, late)
+    engine.shutdown()
+    assert late.items == [(1, {'a': 1}, None)]
+
+
+def test_refresh_against_a_fake_feeder(serve_feeder, discovery):
+    feeder, url = serve_feeder(aggregators=("adsblol", "opensky"), latency=0.01)
+    poller = FeederPoller(url, discovery)
+    engine, results = start(poller)
+    engine.refresh(poller)
+    seq, data, error = results.wait(1)[0]
+    engine.shutdown()
+    
+    assert error is None
+    assert data['feeder_name'] == "fakefeeder"
+    assert set(data['stage2_stats']) >= {'planes', 'mps', 'pps'}
+    assert set(data['temperatures']) == {'cpu', 'ext'}
+    assert [agg['id'] for agg in data['aggregators']] == ["adsblol", "opensky"]
+
+
+def test_refreshes_survive_errors(serve_feeder, discovery):
+    feeder, url = serve_feeder(error_rate=0.3)
+    poller = FeederPoller(url, discovery)
+    engine, results = start(poller, max_workers=4)
+    started = time.monotonic()
+    while len(results.items) < 10 and time.monotonic() - started < TIMEOUT:
+        engine.refresh(poller)
+        time.sleep(0.02)
+    engine.shutdown()
+    
+    assert feeder.errors > 0
+    seqs = [seq for seq, data, error in results.items]
+    # Probes after a refresh without an answer are not delivered
+    assert len(seqs) >= 10 and seqs == sorted(set(seqs))
+    # A 500 from the stats endpoint only leaves that part out
+    assert any(data.get('stage2_stats') for seq, data, error in results.items)
+    assert any('stage2_stats' not in data for seq, data, error in results.items)
+
+
+def test_subscribe_tells_whether_there_was_anything():
+    release = threading.Event()
+    poller = FakePoller({'a': lambda: release.wait(TIMEOUT)})
+    engine, results = start(poller)
+    assert not engine.subscribe(poller, Results())
+    engine.refresh(poller)
+    time.sleep(0.1)
+    # A refresh is running
+    assert engine.subscribe(poller, Results(), lambda poller, seq: None)
+    release.set()
+    results.wait(1)
+    assert engine.subscribe(poller, Results())
+    engine.shutdown()
@@ -0,0 +1,161 @@
+import threading
+import time
+
+from adsbmon.export import InfluxSink, MetricsExporter, export_points, format_csv, format_line_protocol
+from adsbmon.poller import FeederPoller
+from fake_influx import FakeInflux, make_server
+
+DATA = {
+    'timestamp': 1700000000.5,
+    'stage2_stats': {'planes': 12, 'mps': 250.5, 'pps': float('nan'), 'uptime': True},
+    'temperatures': {'cpu': '48.5', 'ext': 'inf', 'board': 'n/a'},
+    'aggregators': [
+        {'beast': 'good', 'mlat': 'good'},
+        {'beast': 'disconnected', 'mlat': 'unknown'},
+    ],
+}
+
+
+def test_export_points():
+    points = export_points("http://feeder", DATA)
+    assert len(points) == 1
+    timestamp, feeder, metrics = points[0]
+    assert (timestamp, feeder) == (1700000000.5, "http://feeder")
+    # NaN and infinity are dropped, as are values that are not numbers
+    assert metrics == {
+        'planes': 12.0,
+        'mps': 250.5,
+        'temperature_cpu': 48.5,
+        'aggregators_healthy': 1.0,
+        'aggregators': 2.0,
+    }
+
+
+def test_export_points_only_fetched_values():
+    data = dict(DATA, fetched=frozenset({'stage2_stats', ('status', 'adsblol')}))
+    data['aggregators'] = [{'id': 'adsblol', 'beast': 'good', 'mlat': 'good'},
+                           {'id': 'adsbfi', 'beast': 'good', 'mlat': 'good'}]
+    timestamp, feeder, metrics = export_points("http://feeder", data)[0]
+    # Temperatures and the other aggregator came from the cache
+    assert metrics == {'planes': 12.0, 'mps': 250.5, 'aggregators_healthy': 1.0, 'aggregators': 1.0}
+
+
+def test_refresh_exports_cached_values_once(serve_feeder, discovery, refresh):
+    feeder, url = serve_feeder(aggregators=("adsblol",))
+    poller = FeederPoller(url, discovery)
+    first = export_points(url, refresh(poller)[0])[0][2]
+    second = export_points(url, refresh(poller)[0])[0][2]
+    assert {'temperature_cpu', 'aggregators'} <= set(first)
+    assert set(second) == {'planes', 'tplanes', 'mps', 'pps', 'uptime'}
+
+
+def test_export_points_without_data():
+    assert export_points("http://feeder", None) == []
+    assert export_points("http://feeder", {'stage2_stats': {'planes': 1}}) == []
+    assert export_points("http://feeder", {'timestamp': 1, 'stage2_stats': {'mps': float('inf')}}) == []
+
+
+def test_line_protocol():
+    points = [(1700000000.5, "http://a b,c=d", {'planes': 12.0, 'mps': 250.5})]
+    assert format_line_protocol(points) == (
+        "adsb_feeder,feeder=http://a\\ b\\,c\\=d planes=12.0,mps=250.5 1700000000500000000\n")
+    assert format_line_protocol([]) == ""
+
+
+def test_csv():
+    points = [(1700000000.5, "http://feeder", {'planes': 12.0, 'mps': 250.5})]
+    assert format_csv(points) == ("1700000000.500,http://feeder,planes,12.0\n"
+                                  "1700000000.500,http://feeder,mps,250.5\n")
+
+
+class Poller:
+    feeder_url = "http://feeder"
+
+
+def serve_influx(**settings):
+    influx = FakeInflux(seed=1, **settings)
+    server = make_server(influx)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    return influx, server, f"http://127.0.0.1:{server.server_address[1]}/api/v2/write?org=o&bucket=b"
+
+
+def feed(exporter, timestamps):
+    for timestamp in timestamps:
+        exporter.update(Poller(), timestamp, {'timestamp': timestamp, 'stage2_stats': {'planes': timestamp}}, None)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def received_timestamps(influx):
+    return [int(line.rsplit(' ', 1)[1]) // 10**9 for line in influx.lines]
+
+
+def test_full_batches_are_written_at_once():
+    influx, server, url = serve_influx()
+    exporter = MetricsExporter(InfluxSink(url), batch_size=5, flush_interval=60)
+    feed(exporter, range(12))
+    wait_for(lambda: influx.received == 10)
+    time.sleep(0.1)
+    assert influx.requests == 2
+    # The rest is written on close
+    exporter.close()
+    server.shutdown()
+    assert influx.requests == 3
+    assert received_timestamps(influx) == list(range(12))
+    assert (exporter.written, exporter.dropped) == (12, 0)
+
+
+def test_partial_batches_wait_for_the_flush_interval():
+    influx, server, url = serve_influx()
+    exporter = MetricsExporter(InfluxSink(url), batch_size=100, flush_interval=0.3)
+    started = time.monotonic()
+    feed(exporter, range(3))
+    wait_for(lambda: influx.received == 3)
+    elapsed = time.monotonic() - started
+    exporter.close()
+    server.shutdown()
+    assert 0.25 < elapsed < 2
+    assert influx.requests == 1
+
+
+def test_failed_writes_are_retried():
+    influx, server, url = serve_influx(error_rate=1.0)
+    exporter = MetricsExporter(InfluxSink(url), batch_size=5, flush_interval=0, retry_delay=0.2)
+    feed(exporter, range(5))
+    wait_for(lambda: influx.errors >= 1)
+    assert exporter.error == "HTTP 503"
+    influx.error_rate = 0.0
+    wait_for(lambda: influx.received == 5)
+    exporter.close()
+    server.shutdown()
+    assert received_timestamps(influx) == list(range(5))
+    assert (exporter.written, exporter.dropped, exporter.error) == (5, 0, None)
+
+
+def test_slow_sink_drops_the_oldest_points():
+    influx, server, url = serve_influx(latency=0.3)
+    exporter = MetricsExporter(InfluxSink(url), batch_size=5, flush_interval=0, queue_size=5)
+    feed(exporter, [0])
+    # The first point is on its way while the rest pile up
+    wait_for(lambda: influx.requests == 1)
+    feed(exporter, range(1, 21))
+    exporter.close()
+    server.shutdown()
+    assert exporter.dropped == 15
+    assert received_timestamps(influx) == [0, 16, 17, 18, 19, 20]
+
+
+def test_rejected_points_are_dropped():
+    influx, server, url = serve_influx()
+    exporter = MetricsExporter(InfluxSink(url.replace('/api/v2/write', '/nowhere')), flush_interval=0)
+    feed(exporter, range(3))
+    wait_for(lambda: exporter.dropped == 3)
+    exporter.close()
+    server.shutdown()
+    assert exporter.error.startswith("rejected with HTTP 404")
+    assert influx.received == 0
@@ -0,0 +1,85 @@
+import socket
+
+from adsbmon.health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from adsbmon.poller import FeederPoller
+
+
+def closed_port_url():
+    """A local URL nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def test_opens_after_threshold():
+    breaker = CircuitBreaker(threshold=2, retry_delay=5, jitter=0)
+    assert not breaker.failure(100)
+    assert breaker.state == CLOSED
+    # One refresh without an answer is followed by a probe
+    assert breaker.needs_probe()
+    assert breaker.failure(100)
+    assert breaker.state == OPEN
+    assert breaker.retry_in(102) == 3
+    assert breaker.retry_in(110) == 0
+
+
+def test_backoff_doubles_up_to_the_limit():
+    breaker = CircuitBreaker(threshold=1, retry_delay=5, max_retry_delay=30, jitter=0)
+    delays = []
+    for _ in range(5):
+        breaker.trial()
+        breaker.failure(0)
+        delays.append(breaker.retry_in(0))
+    assert delays == [5, 10, 20, 30, 30]
+
+
+def test_probe_lets_one_refresh_through():
+    breaker = CircuitBreaker(threshold=2, retry_delay=5, jitter=0)
+    breaker.failure(0)
+    breaker.trial()
+    assert breaker.state == HALF_OPEN
+    breaker.probe_succeeded()
+    assert breaker.state == CLOSED and not breaker.needs_probe()
+    # The refresh after the probe gets no answer either: open again at once
+    assert breaker.failure(0)
+    assert breaker.state == OPEN
+
+
+def test_success_resets():
+    breaker = CircuitBreaker(threshold=1, retry_delay=5, jitter=0)
+    breaker.failure(0)
+    breaker.trial()
+    breaker.failure(0)
+    breaker.success()
+    assert (breaker.state, breaker.failures, breaker.opened) == (CLOSED, 0, 0)
+    assert breaker.retry_in(0) is None
+    assert not breaker.needs_probe()
+
+
+def test_poller_probes_a_feeder_that_is_down(discovery, refresh):
+    poller = FeederPoller(closed_port_url(), discovery)
+    data, error = refresh(poller)
+    assert data == {}
+    assert error.startswith("No answer from the feeder")
+    
+    jobs, context = poller.plan()
+    assert list(jobs) == ['probe']
+    data, error = poller.assemble(context, {key: func(*args) for key, (func, *args) in jobs.items()})
+    assert poller.breaker.state == OPEN
+    assert "next retry at" in error
+    assert poller.retry_delay() > 0
+
+
+def test_poller_recovers_after_a_probe(serve_feeder, discovery, refresh):
+    feeder, url = serve_feeder()
+    poller = FeederPoller(url, discovery)
+    poller.breaker.failure(0)
+    
+    # The probe connects: nothing to show, and a full refresh right away
+    assert refresh(poller) == (None, None)
+    assert feeder.requests == 0
+    assert poller.retry_delay() == 0
+    data, error = refresh(poller)
+    assert error is None and data['stage2_stats']
+    assert poller.breaker.state == CLOSED and poller.breaker.failures == 0
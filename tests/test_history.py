@@ -0,0 +1,67 @@
+import sqlite3
+import time
+
+from adsbmon.history import HistoryStore
+
+FEEDER = "http://feeder"
+
+
+def stats(planes, mps):
+    return {'stage2_stats': {'planes': planes, 'mps': mps}}
+
+
+def rollups(path, name):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(
+            """SELECT minute, min, max, sum, count FROM rollup_1m
+               JOIN series ON series.id = series_id WHERE name = ? ORDER BY minute""", (name,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def test_rollups_match_the_samples(tmp_path):
+    path = str(tmp_path / 'history.sqlite3')
+    store = HistoryStore(path)
+    minute = int(time.time()) // 60 * 60 - 600
+    store.record(FEEDER, minute + 5, stats(10, 100.0))
+    store.record(FEEDER, minute + 20, stats(30, 300.0))
+    # A second sample in the same second is dropped, from the rollup too
+    store.record(FEEDER, minute + 20.5, stats(99, 999.0))
+    store.record(FEEDER, minute + 65, stats(20, 200.0))
+    store.close()
+    
+    assert rollups(path, 'planes') == [(minute, 10, 30, 40, 2), (minute + 60, 20, 20, 20, 1)]
+    raw, minutes = store.load(FEEDER, ['planes', 'mps'])['planes']
+    assert raw == [(minute + 5, 10), (minute + 20, 30), (minute + 65, 20)]
+    assert minutes == [(minute, 20), (minute + 60, 20)]
+
+
+def test_rollups_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'history.sqlite3')
+    minute = int(time.time()) // 60 * 60 - 600
+    store = HistoryStore(path)
+    store.record(FEEDER, minute + 5, stats(10, 100.0))
+    store.close()
+    # The same sample again, as after a restart within the same second
+    store = HistoryStore(path)
+    store.record(FEEDER, minute + 5, stats(10, 100.0))
+    store.record(FEEDER, minute + 6, stats(40, 100.0))
+    store.close()
+    assert rollups(path, 'planes') == [(minute, 10, 40, 50, 2)]
+
+
+def test_aggregator_states_stored_on_change(tmp_path):
+    path = str(tmp_path / 'history.sqlite3')
+    store = HistoryStore(path)
+    now = int(time.time())
+    for offset, beast in enumerate(['good', 'good', 'disconnected', 'disconnected', 'good']):
+        store.record(FEEDER, now + offset, {'aggregators': [{'id': 'adsblol', 'beast': beast, 'mlat': 'good'}]})
+    store.close()
+    
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT ts, beast FROM aggregator_status ORDER BY ts").fetchall()
+    conn.close()
+    assert rows == [(now, 'good'), (now + 2, 'disconnected'), (now + 4, 'good')]
+
@@ -0,0 +1,57 @@
+import io
+
+from adsbmon import icaodb
+from adsbmon.icaodb import AircraftDatabase
+
+
+def test_build_and_lookup(tmp_path):
+    path = str(tmp_path / 'aircraft-db.bin')
+    rows = [
+        ('4840d6', 'PH-BXA', 'B738', 'KLM'),
+        ('A0B1C2', 'N123AB', 'C172', ''),
+        # Non-ICAO, invalid, out of range and empty rows are left out
+        ('~4840d6', 'TISB', 'XXXX', 'Nobody'),
+        ('zzzzzz', 'X', 'X', 'X'),
+        ('1000000', 'X', 'X', 'X'),
+        ('abcdef', '', '', ''),
+    ]
+    assert icaodb.build(rows, path) == 2
+    
+    database = AircraftDatabase(path)
+    assert len(database) == 2
+    assert database.lookup('4840d6') == ('PH-BXA', 'B738', 'KLM')
+    assert database.lookup('a0b1c2') == ('N123AB', 'C172', None)
+    assert database.lookup('~4840d6') is None
+    assert database.lookup('abcdef') is None
+    database.close()
+
+
+def test_fields_are_cut_to_width(tmp_path):
+    path = str(tmp_path / 'aircraft-db.bin')
+    icaodb.build([('000001', 'ABCDEFGHIJKLMNOP', 'B7378', 'é' * 30)], path)
+    registration, aircraft_type, operator = AircraftDatabase(path).lookup('000001')
+    assert registration == 'ABCDEFGHIJKL'
+    assert aircraft_type == 'B737'
+    assert operator == 'é' * 20
+
+
+def test_missing_database(tmp_path):
+    database = AircraftDatabase(str(tmp_path / 'missing.bin'))
+    assert len(database) == 0
+    assert database.lookup('4840d6') is None
+
+
+def test_read_csv_formats():
+    opensky = io.StringIO("icao24,registration,typecode,operator,owner\n"
+                          "4840d6,PH-BXA,B738,KLM,\n"
+                          "a0b1c2,N123AB,C172,,John Doe\n")
+    assert list(icaodb.read_csv(opensky)) == [
+        ('4840d6', 'PH-BXA', 'B738', 'KLM'),
+        ('a0b1c2', 'N123AB', 'C172', 'John Doe'),
+    ]
+    tar1090 = io.StringIO("4840d6;PH-BXA;B738;00;BOEING 737-800;1999;KLM\n"
+                          "a0b1c2;N123AB\n")
+    assert list(icaodb.read_csv(tar1090)) == [
+        ('4840d6', 'PH-BXA', 'B738', 'KLM'),
+        ('a0b1c2', 'N123AB', '', ''),
+    ]
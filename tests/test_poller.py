@@ -0,0 +1,34 @@
+import io
+
+import pytest
+
+from adsbmon.poller import FeederPoller
+
+
+class Page:
+    """A homepage read in small chunks"""
+    def __init__(self, html, chunk=7):
+        self._body = io.BytesIO(html.encode())
+        self._chunk = chunk
+    
+    def read(self, amt):
+        return self._body.read(min(amt, self._chunk))
+
+
+@pytest.mark.parametrize('html, name', [
+    ("<title>Homepage for fakefeeder</title>", "fakefeeder"),
+    ("<title>Homepage for Zürich_Nord</title>", "Zürich_Nord"),
+    ("<title>Homepage for 東京</title>", "東京"),
+    ("<title>Homepage for Kraków — home</title>", "Kraków"),
+    ("<title>Homepage for</title>", None),
+    ("<title>Welcome</title>", None),
+])
+def test_scan_feeder_name(html, name):
+    assert FeederPoller._scan_feeder_name(Page(html)) == name
+    assert FeederPoller._scan_feeder_name(Page(html, chunk=4096)) == name
+
+
+def test_feeder_name_from_a_fake_feeder(serve_feeder, discovery, refresh):
+    feeder, url = serve_feeder(name="Müggelsee")
+    data, error = refresh(FeederPoller(url, discovery))
+    assert data['feeder_name'] == "Müggelsee"
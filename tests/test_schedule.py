@@ -0,0 +1,60 @@
+import random
+
+from adsbmon.engine import (ADAPTIVE_BACKOFF, ADAPTIVE_MAX_CREDIT, ADAPTIVE_MAX_FACTOR, ADAPTIVE_MIN_FACTOR,
+                            AdaptiveSchedule, FixedSchedule, PollingEngine)
+
+
+class IdlePoller:
+    max_concurrency = 1
+
+
+def test_fixed():
+    schedule = FixedSchedule(5)
+    assert [schedule.next_delay(changed) for changed in (True, False, False, True)] == [5] * 4
+
+
+def test_backs_off_while_nothing_changes():
+    schedule = AdaptiveSchedule(10)
+    delays = [schedule.next_delay(False) for _ in range(6)]
+    assert delays[0] == 10 * ADAPTIVE_BACKOFF
+    assert delays == sorted(delays)
+    assert delays[-1] == 10 * ADAPTIVE_MAX_FACTOR
+    assert schedule.credit == 10 * ADAPTIVE_MAX_CREDIT
+
+
+def test_speeds_up_on_credit_only():
+    schedule = AdaptiveSchedule(10)
+    # Nothing banked: no quicker than the interval
+    assert schedule.next_delay(True) == 10
+    schedule.next_delay(False)
+    delays = [schedule.next_delay(True) for _ in range(4)]
+    assert delays[0] == 5
+    assert min(delays) >= 10 * ADAPTIVE_MIN_FACTOR
+    # Once the credit is spent it is back to the interval
+    assert delays[-1] == 10
+
+
+def test_never_polls_more_than_fixed():
+    rng = random.Random(1)
+    schedule = AdaptiveSchedule(5)
+    steps = 1000
+    total = sum(schedule.next_delay(rng.random() < 0.5) for _ in range(steps))
+    assert total >= steps * 5
+
+
+def test_set_interval_keeps_the_backoff():
+    engine = PollingEngine()
+    poller = IdlePoller()
+    engine.add(poller, 10, start_delay=3600, mode='adaptive')
+    schedule = engine._feeds[poller].schedule
+    for _ in range(3):
+        schedule.next_delay(False)
+    credit = schedule.credit
+    engine.set_interval(poller, 20)
+    engine.shutdown()
+    
+    assert engine._feeds[poller].schedule is schedule
+    assert engine.get_interval(poller) == 20
+    assert schedule.credit == credit
+    # The backoff carries on from where it was rather than starting over
+    assert schedule.next_delay(False) == 30 * ADAPTIVE_BACKOFF > AdaptiveSchedule(20).next_delay(False)
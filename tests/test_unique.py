@@ -0,0 +1,80 @@
+import os
+
+from adsbmon.unique import BITSET_BYTES, UniqueAircraft, _Bitset, _popcount, _read_bits
+
+FEEDER = "http://feeder"
+# The start of a UTC day
+DAY = 19675 * 86400
+
+
+def test_bitset():
+    bitset = _Bitset(bytearray(BITSET_BYTES), 0)
+    assert bitset.add(0)
+    assert bitset.add(0xFFFFFF)
+    assert not bitset.add(0)
+    assert bitset.count == 2
+    assert _popcount(bitset.value()) == 2
+    assert bitset.value() == 1 | 1 << 0xFFFFFF
+
+
+def test_counts_by_window(tmp_path):
+    unique = UniqueAircraft(FEEDER, str(tmp_path))
+    # Three hours ago, then in the current hour, which is the fourth of the day
+    unique.add(FEEDER, {'000001': None, '000002': None}, now=DAY + 3600 + 10)
+    now = DAY + 4 * 3600 + 10
+    unique.add(FEEDER, {'000002': None, '000003': None, '~000004': None, 'bogus': None}, now=now)
+    
+    counts = unique.counts(FEEDER, now, wait=True)
+    assert counts['1h'] == (2, DAY + 4 * 3600)
+    assert counts['6h'] == (3, DAY - 3600)
+    assert counts['24h'] == (3, DAY - 19 * 3600)
+    assert counts['today'] == (3, DAY)
+    assert counts['7d'][0] == counts['30d'][0] == 3
+    
+    # An aircraft new to the hour and not to the window leaves the window's count alone
+    unique.add(FEEDER, {'000001': None, '000005': None}, now=now + 60)
+    counts = unique.counts(FEEDER, now + 60)
+    assert counts['1h'][0] == 4
+    assert counts['6h'][0] == 4
+    unique.close()
+
+
+def test_counts_without_waiting(tmp_path):
+    unique = UniqueAircraft(FEEDER, str(tmp_path))
+    unique.add(FEEDER, {'000001': None}, now=DAY)
+    unique.add(FEEDER, {'000002': None}, now=DAY + 3600)
+    counts = unique.counts(FEEDER, DAY + 3600)
+    # Windows with finished buckets are worked out in the background
+    assert counts['1h'][0] == 1
+    assert unique.counts(FEEDER, DAY + 3600, wait=True)['6h'][0] == 2
+    unique.close()
+
+
+def test_other_feeder(tmp_path):
+    unique = UniqueAircraft(FEEDER, str(tmp_path))
+    unique.add("http://other", {'000001': None}, now=DAY)
+    assert unique.counts("http://other", DAY) is None
+    assert unique.counts(FEEDER, DAY, wait=True)['1h'][0] == 0
+    
+    unique.set_feeder_url("http://other")
+    unique.add("http://other", {'000001': None}, now=DAY)
+    assert unique.counts("http://other", DAY, wait=True)['1h'][0] == 1
+    unique.close()
+
+
+def test_persists_and_expires(tmp_path):
+    unique = UniqueAircraft(FEEDER, str(tmp_path))
+    unique.add(FEEDER, {'000001': None, '000002': None}, now=DAY)
+    unique.close()
+    directory = unique.directory
+    assert _popcount(_read_bits(os.path.join(directory, f"h{DAY // 3600}.bits"))) == 2
+    
+    unique = UniqueAircraft(FEEDER, str(tmp_path))
+    assert unique.counts(FEEDER, DAY + 60, wait=True)['1h'][0] == 2
+    # Two days on, the hourly bucket is gone but the daily one is counted
+    later = DAY + 2 * 86400 + 60
+    counts = unique.counts(FEEDER, later, wait=True)
+    assert not os.path.exists(os.path.join(directory, f"h{DAY // 3600}.bits"))
+    assert counts['7d'] == (2, DAY - 5 * 86400)
+    assert counts['24h'][0] == 0
+    unique.close()
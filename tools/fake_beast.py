@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Serve a synthetic Beast stream, like readsb's port 30005
+
+Sends random but well-formed frames with a realistic mix of downlink
+formats and signal levels, escaping included, to every client that
+connects. Point the monitor at it with --beast:
+
+    python3 tools/fake_beast.py [--port 30005] [--rate 2000]
+    python3 adsb_monitor.py --beast 127.0.0.1:30005
+"""
+
+import argparse
+import os
+import random
+import socketserver
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from adsbmon.beast import ESCAPE, FRAME_MODE_AC, FRAME_MODE_S_LONG, FRAME_MODE_S_SHORT
+
+# (downlink format, frame type, share of the messages)
+MESSAGE_MIX = [
+    (17, FRAME_MODE_S_LONG, 0.45),
+    (11, FRAME_MODE_S_SHORT, 0.20),
+    (4, FRAME_MODE_S_SHORT, 0.10),
+    (5, FRAME_MODE_S_SHORT, 0.05),
+    (20, FRAME_MODE_S_LONG, 0.06),
+    (21, FRAME_MODE_S_LONG, 0.04),
+    (0, FRAME_MODE_S_SHORT, 0.04),
+    (18, FRAME_MODE_S_LONG, 0.02),
+    (None, FRAME_MODE_AC, 0.04),
+]
+MESSAGE_LENGTHS = {FRAME_MODE_AC: 2, FRAME_MODE_S_SHORT: 7, FRAME_MODE_S_LONG: 14}
+# Seconds between writes
+BATCH_INTERVAL = 0.01
+
+
+def encode_frame(kind, timestamp, signal, message):
+    """One Beast frame, with every 0x1A after the type byte doubled"""
+    body = timestamp.to_bytes(6, 'big') + bytes([signal]) + message
+    return bytes([ESCAPE, kind]) + body.replace(b'\x1a', b'\x1a\x1a')
+
+
+def random_frame(rng, timestamp):
+    df, kind, _ = rng.choices(MESSAGE_MIX, weights=[share for *_, share in MESSAGE_MIX])[0]
+    message = bytearray(rng.getrandbits(8) for _ in range(MESSAGE_LENGTHS[kind]))
+    if df is not None:
+        message[0] = (df << 3) | (message[0] & 7)
+    # Mostly weak signals with the odd strong one
+    signal = min(255, int(rng.lognormvariate(3.5, 0.6)))
+    return encode_frame(kind, timestamp, signal, bytes(message))
+
+
+def make_handler(rate, seed):
+    class BeastHandler(socketserver.BaseRequestHandler):
+        def handle(self):
+            rng = random.Random(seed)
+            # 12 MHz MLAT clock
+            clock = rng.randrange(1 << 40)
+            per_batch = rate * BATCH_INTERVAL
+            owed = 0.0
+            next_batch = time.monotonic()
+            while True:
+                owed += per_batch
+                count = int(owed)
+                owed -= count
+                frames = []
+                for _ in range(count):
+                    clock = (clock + rng.randrange(1, 24000)) % (1 << 48)
+                    frames.append(random_frame(rng, clock))
+                try:
+                    self.request.sendall(b''.join(frames))
+                except OSError:
+                    return
+                next_batch += BATCH_INTERVAL
+                time.sleep(max(0.0, next_batch - time.monotonic()))
+    return BeastHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=30005)
+    parser.add_argument("--rate", type=int, default=2000, help="messages per second")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    socketserver.ThreadingTCPServer.daemon_threads = True
+    with socketserver.ThreadingTCPServer((args.host, args.port), make_handler(args.rate, args.seed)) as server:
+        print(f"Beast stream on {args.host}:{args.port}, {args.rate} msg/sec", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Serve a stand-in for an adsb.im feeder's web interface
+
+Answers the requests the monitor makes (stats, temperatures, aggregator
+status, the homepage, tar1090's aircraft and receiver data) with plausible
+values, after a configurable latency and jitter, failing a configurable
+share of them with a 500, gzip-compressing bodies with --compress. Point the
+monitor or benchmarks/refresh.py at it:
+
+    python3 tools/fake_feeder.py [--port 8080] [--latency 30] [--error-rate 0.05]
+    python3 adsb_monitor.py --url http://127.0.0.1:8080
+"""
+
+import argparse
+import gzip
+import hashlib
+import http.server
+import json
+import random
+import sys
+import threading
+import time
+
+# Aggregators the fake feeder has configured unless told otherwise
+DEFAULT_AGGREGATORS = ("adsblol", "adsbfi", "flightradar", "opensky")
+# Bodies smaller than this are sent uncompressed even with --compress, as nginx does
+MIN_COMPRESS_SIZE = 256
+
+
+class FakeFeeder:
+    """Settings and request counters of a fake feeder"""
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, payload_size=16384,
+                 aggregators=DEFAULT_AGGREGATORS, aircraft=100, name="fakefeeder", compress=False, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.compress = compress
+        self.aggregators = set(aggregators)
+        self.aircraft = aircraft
+        self.rng = random.Random(seed)
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        # Body bytes sent, as they went out
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        
+        # The name appears early on, as in the real page's <title>
+        head = f"<html><head><title>Homepage for {name}</title></head><body>".encode()
+        tail = b"</body></html>"
+        filler = "".join(f"<p>line {i}</p>" for i in range(payload_size // 10)).encode()
+        self.homepage = head + filler[:max(0, payload_size - len(head) - len(tail))] + tail
+        self.homepage_etag = '"' + hashlib.sha1(self.homepage).hexdigest()[:16] + '"'
+    
+    def respond(self, path, headers):
+        """Return (status, content type, body, extra headers) for a GET"""
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+            failed = self.rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            planes = self.rng.randint(20, 60)
+        time.sleep(delay)
+        if failed:
+            return 500, 'text/plain', b"Internal Server Error", {}
+        
+        if path == '/':
+            if headers.get('If-None-Match') == self.homepage_etag:
+                return 304, 'text/html', b"", {'ETag': self.homepage_etag}
+            return 200, 'text/html', self.homepage, {'ETag': self.homepage_etag}
+        if path == '/api/stage2_stats':
+            stats = [{
+                'planes': planes,
+                'tplanes': 400 + int((time.time() - self.started) / 10),
+                'mps': round(planes * 18.3 + self.rng.uniform(-40, 40), 1),
+                'pps': round(planes * 1.7 + self.rng.uniform(-5, 5), 1),
+                'uptime': int(time.time() - self.started) + 86400,
+            }]
+            return 200, 'application/json', json.dumps(stats).encode(), {}
+        if path == '/api/get_temperatures.json':
+            temps = {'cpu': round(self.rng.uniform(45, 60), 1), 'ext': round(self.rng.uniform(20, 30), 1)}
+            return 200, 'application/json', json.dumps(temps).encode(), {}
+        if path.startswith('/api/status/'):
+            agg_id = path.rsplit('/', 1)[1]
+            status = {'0': {'beast': 'good', 'mlat': 'good'}} if agg_id in self.aggregators else {}
+            return 200, 'application/json', json.dumps(status).encode(), {}
+        if path == '/data/receiver.json':
+            return 200, 'application/json', json.dumps({'lat': 50.0, 'lon': 8.0, 'version': 'fake'}).encode(), {}
+        if path == '/data/aircraft.json':
+            return 200, 'application/json', json.dumps(self._aircraft()).encode(), {}
+        return 404, 'text/plain', b"Not Found", {}
+    
+    def _aircraft(self):
+        rng = random.Random(int(time.time()))
+        aircraft = []
+        for i in range(self.aircraft):
+            aircraft.append({
+                'hex': f"{0x3c0000 + i:06x}",
+                'flight': f"TST{i:<5}",
+                'alt_baro': rng.randrange(0, 1600) * 25,
+                'gs': round(rng.uniform(150, 480), 1),
+                'track': round(rng.uniform(0, 360), 1),
+                'lat': round(50 + rng.uniform(-3, 3), 6),
+                'lon': round(8 + rng.uniform(-4, 4), 6),
+                'rssi': round(rng.uniform(-30, -3), 1),
+            })
+        return {'now': time.time(), 'messages': 0, 'aircraft': aircraft}
+
+
+class FakeFeederHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; with Nagle on, every request
+    # on a reused connection would wait out the client's delayed ACK
+    disable_nagle_algorithm = True
+    
+    def do_GET(self):
+        feeder = self.server.feeder
+        status, content_type, body, extra = feeder.respond(self.path, self.headers)
+        accepted = [coding.split(';')[0].strip() for coding in self.headers.get('Accept-Encoding', '').split(',')]
+        if feeder.compress and 'gzip' in accepted and len(body) >= MIN_COMPRESS_SIZE:
+            body = gzip.compress(body, 6)
+            extra = {**extra, 'Content-Encoding': 'gzip'}
+        with feeder._lock:
+            feeder.bytes_sent += len(body)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in extra.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeFeederServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections are no news
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_server(feeder, host="127.0.0.1", port=0):
+    """A server for a FakeFeeder; port 0 picks a free one"""
+    server = FakeFeederServer((host, port), FakeFeederHandler)
+    server.feeder = feeder
+    return server
+
+
+def add_arguments(parser):
+    """Options shared with the benchmarks that start a fake feeder themselves"""
+    parser.add_argument("--latency", type=float, default=30, help="response latency in ms (default: 30)")
+    parser.add_argument("--jitter", type=float, default=10, help="latency jitter in ms, +/- (default: 10)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail (default: 0)")
+    parser.add_argument("--payload-size", type=int, default=16384, help="homepage size in bytes (default: 16384)")
+    parser.add_argument("--aggregators", default=",".join(DEFAULT_AGGREGATORS),
+                        help="comma separated aggregators the feeder has configured")
+    parser.add_argument("--aircraft", type=int, default=100, help="aircraft in aircraft.json (default: 100)")
+    parser.add_argument("--compress", action="store_true", help="gzip bodies for clients that accept it")
+
+
+def feeder_from_arguments(args, seed=None):
+    return FakeFeeder(latency=args.latency / 1000, jitter=args.jitter / 1000, error_rate=args.error_rate,
+                      payload_size=args.payload_size, aircraft=args.aircraft, compress=args.compress,
+                      aggregators=[agg_id for agg_id in args.aggregators.split(',') if agg_id], seed=seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_arguments(parser)
+    args = parser.parse_args()
+    
+    server = make_server(feeder_from_arguments(args), args.host, args.port)
+    print(f"Fake feeder on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Serve a stand-in for an InfluxDB write endpoint
+
+Accepts line protocol POSTed to /write (1.x) and /api/v2/write (2.x) and
+counts the requests and lines it received, after a configurable latency,
+failing a configurable share of writes with a 503. Point the monitor's
+metrics export at it:
+
+    python3 tools/fake_influx.py [--port 8086] [--latency 50] [--error-rate 0.2]
+    python3 adsb_monitor.py --headless --export-influx http://127.0.0.1:8086/api/v2/write
+"""
+
+import argparse
+import http.server
+import random
+import sys
+import threading
+import time
+
+WRITE_PATHS = ('/write', '/api/v2/write')
+
+
+class FakeInflux:
+    """Settings, counters and received lines of a fake InfluxDB"""
+    def __init__(self, latency=0.0, error_rate=0.0, keep=10000, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.keep = keep
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.lines = []
+        self.received = 0
+        self._lock = threading.Lock()
+    
+    def write(self, path, body):
+        """Return (status, body) for a POST"""
+        with self._lock:
+            self.requests += 1
+            failed = self.rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        time.sleep(self.latency)
+        if path.split('?', 1)[0] not in WRITE_PATHS:
+            return 404, b"Not Found"
+        if failed:
+            return 503, b"Service Unavailable"
+        try:
+            lines = [line for line in body.decode().split('\n') if line]
+        except UnicodeDecodeError:
+            return 400, b'{"code":"invalid","message":"body is not UTF-8"}'
+        if any(len(line.split(' ')) < 2 for line in lines):
+            return 400, b'{"code":"invalid","message":"unable to parse points"}'
+        with self._lock:
+            self.received += len(lines)
+            self.lines.extend(lines)
+            del self.lines[:-self.keep]
+        return 204, b""
+
+
+class FakeInfluxHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        status, reply = self.server.influx.write(self.path, body)
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeInfluxServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections are no news
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_server(influx, host="127.0.0.1", port=0):
+    """A server for a FakeInflux; port 0 picks a free one"""
+    server = FakeInfluxServer((host, port), FakeInfluxHandler)
+    server.influx = influx
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8086)
+    parser.add_argument("--latency", type=float, default=0, help="write latency in ms (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of writes that fail (default: 0)")
+    parser.add_argument("--print", action="store_true", help="print the lines received")
+    args = parser.parse_args()
+    
+    influx = FakeInflux(latency=args.latency / 1000, error_rate=args.error_rate)
+    server = make_server(influx, args.host, args.port)
+    print(f"Fake InfluxDB on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        printed = 0
+        while True:
+            time.sleep(1)
+            with influx._lock:
+                received, lines = influx.received, list(influx.lines)
+            if args.print:
+                for line in lines[len(lines) - (received - printed):]:
+                    print(line)
+            elif received != printed:
+                print(f"{influx.requests} writes, {influx.errors} failed, {received} lines", file=sys.stderr)
+            printed = received
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()